@@ -2,6 +2,8 @@ import requests
 from bs4 import BeautifulSoup
 import csv
 
+from columnar import output_formats, write_dataset
+
 # Fetch the webpage
 url = "https://profiles.health.ny.gov/directory/hospitals"
 response = requests.get(url)
@@ -30,14 +32,17 @@ for listing in listings:
             'Phone': phone
         })
 
-# Write to CSV
-output_file = 'ny_hospitals.csv'
+# Write to CSV: every other script reads the directory from it, so it's
+# written whatever --format says and Parquet is an extra output
+fieldnames = ['Hospital Name', 'Street Address', 'City, State, ZIP', 'Phone']
+output_file = 'collected-data/ny_hospitals.csv'
 with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
-    fieldnames = ['Hospital Name', 'Street Address', 'City, State, ZIP', 'Phone']
     writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
     
     writer.writeheader()
     for hospital in hospitals:
         writer.writerow(hospital)
 
-print(f"Successfully exported {len(hospitals)} hospitals to {output_file}")
\ No newline at end of file
+print(f"Successfully exported {len(hospitals)} hospitals to {output_file}")
+if 'parquet' in output_formats():
+    print(f"Parquet dataset written to {write_dataset(hospitals, 'ny_hospitals', fieldnames)}")
\ No newline at end of file
@@ -1,10 +1,81 @@
-import pandas as pd
+import argparse
+
+from columnar import output_formats, write_dataset
+
+POS_CSV = 'data/Hospital_and_other.DATA.Q4_2025.csv'
+OUTPUT_CSV = 'collected-data/hospitals_filtered.csv'
 
 cols_to_keep = ['PRVDR_CTGRY_SBTYP_CD', 'PRVDR_CTGRY_CD', 'CHOW_DT', 'ELGBLTY_SW', 'MDCD_VNDR_NUM', 'PRVDR_NUM', 'GNRL_CNTL_TYPE_CD', 'CBSA_URBN_RRL_IND', 'CBSA_CD', 'ACRDTN_TYPE_CD', 'TOT_AFLTD_AMBLNC_SRVC_CNT', 'TOT_AFLTD_HHA_CNT', 'CRTFD_BED_CNT', 'BED_CNT', 'MDCL_SCHL_AFLTN_CD', 'PGM_PRTCPTN_CD', 'LPN_LVN_CNT', 'RSDNT_PHYSN_CNT', 'RN_CNT']
 
-df = pd.read_csv('data/Hospital_and_other.DATA.Q4_2025.csv')
-df_filtered = df[df['PRVDR_CTGRY_SBTYP_CD']==1]
-df_filtered = df_filtered[cols_to_keep]
-df_filtered.to_csv('collected-data/hospitals_filtered.csv', index=False)
+# Compact dtypes for the columns we read: categoricals for codes, nullable
+# small ints for bed/affiliate counts, float32 for staff counts (they are
+# FTEs, e.g. 33.87), strings for identifiers and dates
+code_cols = ['PRVDR_CTGRY_CD', 'ELGBLTY_SW', 'GNRL_CNTL_TYPE_CD', 'CBSA_URBN_RRL_IND', 'CBSA_CD', 'ACRDTN_TYPE_CD', 'MDCL_SCHL_AFLTN_CD', 'PGM_PRTCPTN_CD', 'STATE_CD']
+pos_dtypes = {
+    'PRVDR_CTGRY_SBTYP_CD': 'Int8',
+    'CHOW_DT': 'string',
+    'MDCD_VNDR_NUM': 'string',
+    'PRVDR_NUM': 'string',
+    'TOT_AFLTD_AMBLNC_SRVC_CNT': 'Int16',
+    'TOT_AFLTD_HHA_CNT': 'Int16',
+    'CRTFD_BED_CNT': 'Int16',
+    'BED_CNT': 'Int16',
+    'LPN_LVN_CNT': 'float32',
+    'RSDNT_PHYSN_CNT': 'float32',
+    'RN_CNT': 'float32',
+    **{col: 'category' for col in code_cols},
+}
+
+
+def load_pos(path=POS_CSV, state=None, chunksize=100_000):
+    """
+    Hospitals (PRVDR_CTGRY_SBTYP_CD == 1) from the Provider of Services file.
+
+    Only cols_to_keep (plus STATE_CD when filtering by state) are parsed, and
+    the file is filtered chunk by chunk, so peak memory is one chunk of the
+    kept columns rather than the whole file.
+    """
+    import pandas as pd
+
+    usecols = cols_to_keep + (['STATE_CD'] if state else [])
+    dtypes = {col: pos_dtypes[col] for col in usecols}
+
+    chunks = []
+    for chunk in pd.read_csv(path, usecols=usecols, dtype=dtypes, chunksize=chunksize):
+        keep = chunk['PRVDR_CTGRY_SBTYP_CD'] == 1
+        if state:
+            keep &= chunk['STATE_CD'] == state
+        chunks.append(chunk.loc[keep.fillna(False), cols_to_keep])
+
+    if not chunks:
+        return pd.DataFrame({col: pd.Series(dtype=pos_dtypes[col]) for col in cols_to_keep})
+
+    df = pd.concat(chunks, ignore_index=True)
+    # Chunks can carry different category sets, which concat turns into plain
+    # objects; restore the categoricals on the (much smaller) filtered result
+    for col in code_cols:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Filter the Provider of Services file down to hospitals.")
+    parser.add_argument('--input', default=POS_CSV, help=f"POS CSV (default {POS_CSV})")
+    parser.add_argument('--output', default=OUTPUT_CSV, help=f"output CSV (default {OUTPUT_CSV})")
+    parser.add_argument('--state', help="only keep one state, e.g. NY")
+    parser.add_argument('--chunksize', type=int, default=100_000, help="rows parsed per chunk")
+    parser.add_argument('--format', choices=['csv', 'parquet', 'both'], default='csv', help="output format")
+    args = parser.parse_args()
+    formats = output_formats(['--format', args.format])
+
+    df_filtered = load_pos(args.input, state=args.state, chunksize=args.chunksize)
+    if 'csv' in formats:
+        df_filtered.to_csv(args.output, index=False)
+        print(f"Saved {len(df_filtered)} hospitals to {args.output}")
+    if 'parquet' in formats:
+        print(f"Parquet dataset written to {write_dataset(df_filtered, 'hospitals_filtered')}")
 
 
+if __name__ == "__main__":
+    main()
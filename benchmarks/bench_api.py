@@ -0,0 +1,209 @@
+"""
+Load Generator for the Local Query API
+======================================
+Starts hospital_api.py in its own process and sends it requests from
+`--concurrency` client threads, each on a keep-alive connection. The request
+mix is profile lookups by Facility ID and PFI (mostly), county listings and
+measure queries, drawn from the hospitals in the store.
+
+Two passes run: a cold one with an empty response cache, then a warm one
+with the same requests. Each reports requests/s and p50 / p90 / p99 latency
+per endpoint. With --baseline, the same profile lookups are also timed the
+old way, by scanning every dataset CSV for the facility.
+
+The hospital store and profiles are built first if they don't exist.
+
+Run (from anywhere):
+  python benchmarks/bench_api.py
+  python benchmarks/bench_api.py --requests 20000 --concurrency 16 --baseline
+  python benchmarks/bench_api.py --cache-size 0 --json api.json
+"""
+
+import argparse
+import csv
+import http.client
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import quote
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Measures every NY hospital reports, for the /measures/ requests
+MEASURES = ['HAI_1_SIR', 'H_STAR_RATING', 'MORT_30_AMI', 'OP_18b', 'READM-30-HF-HRRP']
+
+
+def _percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def build_requests(store_path, count, seed=0):
+    """`count` (kind, path) pairs: 70% profiles, 20% counties, 10% measures."""
+    conn = sqlite3.connect(store_path)
+    facility_ids = [r[0] for r in conn.execute("SELECT facility_id FROM hospitals WHERE facility_id IS NOT NULL")]
+    pfis = [r[0] for r in conn.execute("SELECT pfi FROM hospitals WHERE pfi IS NOT NULL")]
+    counties = [r[0] for r in conn.execute("SELECT DISTINCT county FROM hospitals WHERE county IS NOT NULL")]
+    conn.close()
+
+    rng = random.Random(seed)
+    requests = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.45:
+            requests.append(('facility', f"/facility/{rng.choice(facility_ids)}"))
+        elif roll < 0.7:
+            requests.append(('pfi', f"/pfi/{rng.choice(pfis)}"))
+        elif roll < 0.9:
+            requests.append(('county', f"/counties/{quote(rng.choice(counties))}"))
+        else:
+            requests.append(('measure', f"/measures/{rng.choice(MEASURES)}"))
+    return requests
+
+
+def start_server(cache_size):
+    """hospital_api.py on a free port; returns (process, port)."""
+    process = subprocess.Popen(
+        [sys.executable, 'hospital_api.py', '--port', '0', '--cache-size', str(cache_size)],
+        cwd=REPO_ROOT, stdout=subprocess.PIPE, text=True,
+    )
+    line = process.stdout.readline()
+    if not line.startswith('Serving on'):
+        process.kill()
+        raise SystemExit(f"hospital_api.py did not start: {line!r}")
+    return process, int(line.split(':')[2].split()[0])
+
+
+def run_pass(port, requests, concurrency):
+    """Send `requests` from `concurrency` threads; returns ({kind: [ms]}, seconds, errors)."""
+    latencies = {}
+    errors = []
+    lock = threading.Lock()
+    chunks = [requests[i::concurrency] for i in range(concurrency)]
+
+    def client(chunk):
+        conn = http.client.HTTPConnection('127.0.0.1', port)
+        mine = {}
+        for kind, path in chunk:
+            start = time.perf_counter()
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            mine.setdefault(kind, []).append((time.perf_counter() - start) * 1000)
+            if response.status != 200:
+                with lock:
+                    errors.append((response.status, path))
+        conn.close()
+        with lock:
+            for kind, values in mine.items():
+                latencies.setdefault(kind, []).extend(values)
+
+    threads = [threading.Thread(target=client, args=(chunk,)) for chunk in chunks]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, time.perf_counter() - start, errors
+
+
+def summarize(latencies):
+    summary = {}
+    for kind in sorted(latencies) + ['all']:
+        values = sum(latencies.values(), []) if kind == 'all' else latencies[kind]
+        summary[kind] = {
+            'requests': len(values),
+            'p50_ms': _percentile(values, 50),
+            'p90_ms': _percentile(values, 90),
+            'p99_ms': _percentile(values, 99),
+        }
+    return summary
+
+
+def print_summary(title, summary, seconds):
+    total = summary['all']['requests']
+    print(f"\n{title}: {total} requests in {seconds:.2f}s ({total / seconds:,.0f} req/s)")
+    print(f"  {'endpoint':<10} {'requests':>9} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8}")
+    for kind, row in summary.items():
+        print(f"  {kind:<10} {row['requests']:>9} {row['p50_ms']:>8.2f} {row['p90_ms']:>8.2f} {row['p99_ms']:>8.2f}")
+
+
+def baseline(requests, lookups):
+    """A profile the old way: scan every dataset CSV for the facility's rows."""
+    from hospital_store import FACT_TABLES
+
+    times = []
+    for kind, path in [r for r in requests if r[0] in ('facility', 'pfi')][:lookups]:
+        value = path.rsplit('/', 1)[1]
+        kind = 'facility_id' if kind == 'facility' else kind
+        start = time.perf_counter()
+        profile = {}
+        for table, (source, key_column, key_kind) in FACT_TABLES.items():
+            if key_kind != kind or not os.path.exists(source):
+                continue
+            with open(source, newline='', encoding='utf-8') as f:
+                profile[table] = [row for row in csv.DictReader(f) if row.get(key_column) == value]
+        times.append((time.perf_counter() - start) * 1000)
+    return {
+        'requests': len(times),
+        'p50_ms': _percentile(times, 50),
+        'p90_ms': _percentile(times, 90),
+        'p99_ms': _percentile(times, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the local query API.")
+    parser.add_argument('--requests', type=int, default=5000, help="requests per pass (default 5000)")
+    parser.add_argument('--concurrency', type=int, default=8, help="client threads (default 8)")
+    parser.add_argument('--cache-size', type=int, default=1024, help="the server's LRU size (default 1024)")
+    parser.add_argument('--baseline', type=int, nargs='?', const=50, default=0, metavar='N',
+                        help="also time N profile lookups by scanning the CSVs (default 50)")
+    parser.add_argument('--json', help="also write the results to this JSON file")
+    args = parser.parse_args()
+    if args.json:
+        args.json = os.path.abspath(args.json)
+
+    sys.path.insert(0, REPO_ROOT)
+    os.chdir(REPO_ROOT)
+    from hospital_profiles import PROFILES_PATH
+    from hospital_store import STORE_PATH
+
+    if not os.path.exists(STORE_PATH) or not os.path.exists(PROFILES_PATH):
+        print("Building the hospital store and profiles first")
+        subprocess.run([sys.executable, 'hospital_profiles.py'], check=True)
+
+    requests = build_requests(STORE_PATH, args.requests)
+    process, port = start_server(args.cache_size)
+    results = {'requests': args.requests, 'concurrency': args.concurrency, 'cache_size': args.cache_size}
+    try:
+        for name in ('cold', 'warm'):
+            latencies, seconds, errors = run_pass(port, requests, args.concurrency)
+            summary = summarize(latencies)
+            print_summary(f"{name.capitalize()} cache", summary, seconds)
+            if errors:
+                print(f"  {len(errors)} non-200 responses, e.g. {errors[0]}")
+            results[name] = {'seconds': seconds, 'requests_per_second': len(requests) / seconds,
+                             'errors': len(errors), 'endpoints': summary}
+    finally:
+        process.terminate()
+        process.wait()
+
+    if args.baseline:
+        row = baseline(requests, args.baseline)
+        results['baseline'] = row
+        print(f"\nCSV scan per profile: {row['requests']} lookups, p50 {row['p50_ms']:.1f} ms, "
+              f"p99 {row['p99_ms']:.1f} ms")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+"""
+Hot-Path Benchmarks
+===================
+Offline throughput benchmarks for the code every refresh spends its time in:
+
+  parse      parse_rn_shifts (official_parser.py) and the one-pass
+             parse_staffing (staffing_extractor.py) over fixture staffing-plan
+             PDFs, parse memo off: PDFs/s and unit rows/s
+  memo       the same PDFs parsed again through a warm parse memo
+  state      state_filter.iter_state_rows streaming the NY rows out of the
+             national CMS files at 1x, 10x and 100x their size in data/: rows/s
+  matching   hospital_linkage.build_match_index + find_match for every
+             directory hospital against the NY facilities of those files, so
+             the candidate count grows with the scale: seconds and matches/s
+  batch      the same matching as one hospital_similarity.BatchMatcher pass
+             (best_matches, then top_k with k=5): seconds and matches/s
+  pos        POS_parser.load_pos over a synthetic Provider of Services file
+             (POS_BASE_ROWS providers at 1x): rows/s
+
+Every case runs in a fresh interpreter so its peak RSS is its own, and each
+reports seconds, throughput and peak RSS (MB). Fixtures are generated into
+benchmarks/fixture_data/ on first use and reused after that.
+
+Results are saved as benchmarks/results/<timestamp>.json with the git commit
+they were measured at, and every run is compared against the previous saved
+result (or --compare FILE), so a change to a hot path shows up as a
+percentage.
+
+Install:
+  pip install pdfplumber pypdfium2 pandas numpy
+
+Run (from anywhere):
+  python benchmarks/bench_hotpaths.py
+  python benchmarks/bench_hotpaths.py --cases parse matching --scales 1 10
+  python benchmarks/bench_hotpaths.py --compare benchmarks/results/20261017-120000.json
+"""
+
+import argparse
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+FIXTURE_DIR = os.path.join(BENCH_DIR, 'fixture_data')
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+# National files that get scaled, relative to the repo root
+NATIONAL_CSVS = [
+    'data/hvbp_clinical_outcomes.csv',
+    'data/FY_2025_HAC_Reduction_Program_Hospital.csv',
+    'data/FY_2025_Hospital_Readmissions_Reduction_Program_Hospital.csv',
+]
+
+POS_BASE_ROWS = 20_000
+
+CASES = ['parse', 'memo', 'state', 'matching', 'batch', 'pos']
+SCALED_CASES = {'state', 'matching', 'batch', 'pos'}
+
+# Metric shown (and compared) for each case; lower is better for seconds
+HEADLINE = {
+    'parse': 'pdfs_per_s',
+    'memo': 'pdfs_per_s',
+    'state': 'rows_per_s',
+    'matching': 'seconds',
+    'batch': 'seconds',
+    'pos': 'rows_per_s',
+}
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+# ── Fixtures ─────────────────────────────────────────────────────────────────
+
+def fixture_pdfs(count):
+    """Paths of `count` fixture staffing-plan PDFs, generated on first use."""
+    from fixtures import staffing_plan_pdf
+
+    folder = os.path.join(FIXTURE_DIR, 'pdfs')
+    os.makedirs(folder, exist_ok=True)
+    paths = []
+    for n in range(1, count + 1):
+        path = os.path.join(folder, f"{n:04d}.pdf")
+        if not os.path.exists(path):
+            with open(path, 'wb') as f:
+                f.write(staffing_plan_pdf(f"{n:04d}"))
+        paths.append(path)
+    return paths
+
+
+def fixture_national(scale):
+    """The national CSVs at `scale`x, generated on first use."""
+    from fixtures import scaled_csv
+
+    paths = []
+    for source in NATIONAL_CSVS:
+        dest = os.path.join(FIXTURE_DIR, f"x{scale}", os.path.basename(source))
+        if not os.path.exists(dest):
+            scaled_csv(os.path.join(REPO_ROOT, source), dest + '.tmp', scale)
+            os.replace(dest + '.tmp', dest)
+        paths.append(dest)
+    return paths
+
+
+def fixture_pos(scale):
+    from fixtures import synthetic_pos
+
+    dest = os.path.join(FIXTURE_DIR, f"x{scale}", 'pos.csv')
+    if not os.path.exists(dest):
+        synthetic_pos(dest + '.tmp', POS_BASE_ROWS * scale)
+        os.replace(dest + '.tmp', dest)
+    return dest
+
+
+# ── Cases (run in the child process) ─────────────────────────────────────────
+
+def _parse_pdfs(parsers, paths):
+    documents = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            documents.append(f.read())
+    result = {'pdfs': len(documents)}
+    for label, parse, count_rows in parsers:
+        start = time.perf_counter()
+        rows = sum(count_rows(parse(pdf_bytes)) for pdf_bytes in documents)
+        seconds = time.perf_counter() - start
+        result[label] = {
+            'seconds': round(seconds, 4),
+            'rows': rows,
+            'pdfs_per_s': round(len(documents) / seconds, 2),
+            'rows_per_s': round(rows / seconds, 1),
+        }
+    return result
+
+
+def _parsers():
+    from official_parser import parse_rn_shifts
+    from staffing_extractor import parse_staffing
+
+    return [
+        ('parse_rn_shifts', parse_rn_shifts, lambda result: len(result[1])),
+        ('parse_staffing', parse_staffing, lambda result: sum(len(units) for units in result[1].values())),
+    ]
+
+
+def case_parse(args):
+    import staffing_memo
+
+    staffing_memo.configure(None)
+    result = _parse_pdfs(_parsers(), fixture_pdfs(args.pdfs))
+    # Headline numbers: the one-pass extractor
+    result.update({k: result['parse_staffing'][k] for k in ('seconds', 'pdfs_per_s', 'rows_per_s')})
+    return result
+
+
+def case_memo(args):
+    import staffing_memo
+    from staffing_memo import memoized
+
+    paths = fixture_pdfs(args.pdfs)
+    with tempfile.TemporaryDirectory() as scratch:
+        staffing_memo.configure(os.path.join(scratch, 'memo.sqlite'))
+        parsers = [(label, memoized(parse), count_rows) for label, parse, count_rows in _parsers()]
+        cold = _parse_pdfs(parsers, paths)
+        warm = _parse_pdfs(parsers, paths)
+        staffing_memo.current_memo().close()
+    result = {'pdfs': warm['pdfs'], 'cold': cold, 'warm': warm}
+    result.update({k: warm['parse_staffing'][k] for k in ('seconds', 'pdfs_per_s', 'rows_per_s')})
+    return result
+
+
+def case_state(args):
+    from state_filter import iter_state_rows
+
+    paths = fixture_national(args.scale)
+    start = time.perf_counter()
+    ny_rows = 0
+    for path in paths:
+        for _ in iter_state_rows(path, 'NY'):
+            ny_rows += 1
+    seconds = time.perf_counter() - start
+    total_bytes = sum(os.path.getsize(path) for path in paths)
+    rows = 0
+    for path in paths:
+        with open(path, 'rb') as f:
+            rows += sum(1 for _ in f) - 1
+    return {
+        'seconds': round(seconds, 4),
+        'rows': rows,
+        'ny_rows': ny_rows,
+        'mb': round(total_bytes / 1e6, 1),
+        'rows_per_s': round(rows / seconds, 1),
+        'mb_per_s': round(total_bytes / 1e6 / seconds, 1),
+    }
+
+
+def case_matching(args):
+    from hospital_linkage import build_match_index, find_match, load_cms_facilities, load_directory
+
+    hospitals = load_directory(os.path.join(REPO_ROOT, 'collected-data', 'ny_hospitals.csv'))
+    facilities = load_cms_facilities(fixture_national(args.scale))
+    candidates = {}
+    for facility in facilities.values():
+        candidates.setdefault(facility['name'], facility)
+
+    start = time.perf_counter()
+    index = build_match_index(candidates, 'full')
+    built = time.perf_counter()
+    matched = sum(1 for hospital in hospitals if find_match(hospital, index)[0])
+    done = time.perf_counter()
+    return {
+        'candidates': len(candidates),
+        'hospitals': len(hospitals),
+        'matched': matched,
+        'index_seconds': round(built - start, 4),
+        'match_seconds': round(done - built, 4),
+        'seconds': round(done - start, 4),
+        'matches_per_s': round(len(hospitals) / (done - built), 1),
+    }
+
+
+def case_batch(args):
+    from hospital_linkage import load_cms_facilities, load_directory
+    from hospital_similarity import BatchMatcher
+
+    hospitals = load_directory(os.path.join(REPO_ROOT, 'collected-data', 'ny_hospitals.csv'))
+    facilities = load_cms_facilities(fixture_national(args.scale))
+    candidates = {}
+    for facility in facilities.values():
+        candidates.setdefault(facility['name'], facility)
+
+    start = time.perf_counter()
+    matcher = BatchMatcher(candidates, 'full')
+    built = time.perf_counter()
+    matched = sum(1 for name, _ in matcher.best_matches(hospitals) if name)
+    done = time.perf_counter()
+    matcher.top_k(hospitals, k=5)
+    ranked = time.perf_counter()
+    return {
+        'candidates': len(candidates),
+        'hospitals': len(hospitals),
+        'matched': matched,
+        'index_seconds': round(built - start, 4),
+        'match_seconds': round(done - built, 4),
+        'top_k_seconds': round(ranked - done, 4),
+        'seconds': round(done - start, 4),
+        'matches_per_s': round(len(hospitals) / (done - built), 1),
+    }
+
+
+def case_pos(args):
+    from POS_parser import load_pos
+
+    path = fixture_pos(args.scale)
+    start = time.perf_counter()
+    df = load_pos(path)
+    seconds = time.perf_counter() - start
+    rows = POS_BASE_ROWS * args.scale
+    return {
+        'seconds': round(seconds, 4),
+        'rows': rows,
+        'hospitals': len(df),
+        'rows_per_s': round(rows / seconds, 1),
+    }
+
+
+def run_case(args):
+    """Child process: run one case and print its result as JSON."""
+    sys.path[:0] = [REPO_ROOT, BENCH_DIR]
+    os.chdir(REPO_ROOT)
+    result = globals()[f"case_{args.case}"](args)
+    result['peak_rss_mb'] = round(_peak_rss_mb(), 1)
+    print(json.dumps(result))
+
+
+# ── Runner ───────────────────────────────────────────────────────────────────
+
+def _git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _label(case, scale):
+    return f"{case} x{scale}" if case in SCALED_CASES else case
+
+
+def _previous_results(path=None):
+    if path:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f), path
+    saved = sorted(glob.glob(os.path.join(RESULTS_DIR, '*.json')))
+    if not saved:
+        return None, None
+    with open(saved[-1], encoding='utf-8') as f:
+        return json.load(f), saved[-1]
+
+
+def _change(case, new, old):
+    if old in (None, 0) or new is None:
+        return ''
+    change = (new - old) / old * 100
+    # For seconds, negative is an improvement; show it the same way as throughput
+    better = -change if HEADLINE[case] == 'seconds' else change
+    return f"{change:+.1f}% ({'better' if better > 0 else 'worse'})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline throughput benchmarks for the parsing, filtering and matching hot paths.")
+    parser.add_argument('--cases', nargs='+', choices=CASES, default=CASES, help="cases to run (default all)")
+    parser.add_argument('--scales', nargs='+', type=int, default=[1, 10, 100],
+                        help="size multipliers for the national and POS files (default 1 10 100)")
+    parser.add_argument('--pdfs', type=int, default=20, help="fixture PDFs to parse (default 20)")
+    parser.add_argument('--compare', help="results file to compare against (default: the latest saved)")
+    parser.add_argument('--no-save', action='store_true', help="don't save this run under benchmarks/results/")
+    # Internal: run a single case in this process
+    parser.add_argument('--case', help=argparse.SUPPRESS)
+    parser.add_argument('--scale', type=int, default=1, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        run_case(args)
+        return
+
+    previous, previous_path = _previous_results(args.compare)
+    if previous_path:
+        print(f"Comparing with {os.path.relpath(previous_path, REPO_ROOT)} ({previous.get('commit')})")
+
+    results = {}
+    print(f"{'case':<14} {'metric':<14} {'value':>12} {'peak RSS MB':>12}  change")
+    for case in args.cases:
+        for scale in (args.scales if case in SCALED_CASES else [1]):
+            label = _label(case, scale)
+            command = [sys.executable, os.path.abspath(__file__), '--case', case,
+                       '--scale', str(scale), '--pdfs', str(args.pdfs)]
+            out = subprocess.run(command, capture_output=True, text=True)
+            if out.returncode != 0:
+                print(f"{label:<14} failed:\n{out.stderr.strip()}")
+                continue
+            result = json.loads(out.stdout.strip().splitlines()[-1])
+            results[label] = result
+            metric = HEADLINE[case]
+            old = ((previous or {}).get('results', {}).get(label) or {}).get(metric)
+            print(f"{label:<14} {metric:<14} {result[metric]:>12,.2f} {result['peak_rss_mb']:>12.1f}  "
+                  f"{_change(case, result[metric], old)}")
+
+    if not args.no_save and results:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, time.strftime('%Y%m%d-%H%M%S') + '.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'commit': _git_commit(),
+                'python': sys.version.split()[0],
+                'cpus': os.cpu_count(),
+                'pdfs': args.pdfs,
+                'results': results,
+            }, f, indent=2)
+        print(f"Results saved to {os.path.relpath(path, REPO_ROOT)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Startup-Time Benchmark for the Pipeline Entry Points
+====================================================
+Times cold starts of nys_profiles.py against what the heavy dependencies cost
+to import, so regressions in lazy importing show up as numbers.
+
+Each command runs in a fresh interpreter, `--repeat` times; the median and
+fastest wall-clock times are reported.
+
+Run (from anywhere):
+  python benchmarks/bench_startup.py
+  python benchmarks/bench_startup.py --repeat 20 --json startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# label -> command, run from the repo root
+COMMANDS = {
+    'python (no imports)':         [sys.executable, '-c', 'pass'],
+    'nys_profiles --help':         [sys.executable, 'nys_profiles.py', '--help'],
+    'nys_profiles staffing --help': [sys.executable, 'nys_profiles.py', 'staffing', '--help'],
+    'nys_profiles pos --help':     [sys.executable, 'nys_profiles.py', 'pos', '--help'],
+    'import requests':             [sys.executable, '-c', 'import requests'],
+    'import bs4':                  [sys.executable, '-c', 'import bs4'],
+    'import pdfplumber':           [sys.executable, '-c', 'import pdfplumber'],
+    'import pandas':               [sys.executable, '-c', 'import pandas'],
+    'eager (all of the above)':    [sys.executable, '-c', 'import requests, bs4, pdfplumber, pandas'],
+}
+
+
+def time_command(command, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=REPO_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start)
+    return {'median_ms': statistics.median(times) * 1000, 'min_ms': min(times) * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold-start time of the pipeline entry points.")
+    parser.add_argument('--repeat', type=int, default=10, help="runs per command (default 10)")
+    parser.add_argument('--json', help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    # One untimed run each so the timings don't include filling the OS file cache
+    for command in COMMANDS.values():
+        subprocess.run(command, cwd=REPO_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    results = {}
+    print(f"{'command':<32} {'median ms':>10} {'min ms':>8}")
+    for label, command in COMMANDS.items():
+        results[label] = time_command(command, args.repeat)
+        print(f"{label:<32} {results[label]['median_ms']:>10.1f} {results[label]['min_ms']:>8.1f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version.split()[0], 'repeat': args.repeat, 'results': results}, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
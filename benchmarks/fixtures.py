@@ -0,0 +1,213 @@
+"""
+Benchmark Fixtures
+==================
+Offline inputs for the benchmark suite (bench_hotpaths.py):
+
+  staffing_plan_pdf()   a staffing-plan PDF shaped like the real ones: a
+                        HOSPITAL INFORMATION page, then one table page per role
+                        and shift (RN DAY SHIFT, DAY SHIFT LPN, ...) whose rows
+                        match rn_shifts_test.csv / rn_day_shift_test.csv, plus
+                        pages no parser reads
+  scaled_csv()          a national CMS file from data/ repeated `scale` times;
+                        each copy gets its own Facility IDs and names, so the
+                        number of distinct facilities (match candidates) grows
+                        with the scale
+  synthetic_pos()       a Provider of Services style file (data/ doesn't ship
+                        the real one) with the columns POS_parser.py reads
+
+The PDF writer draws ruled tables with Helvetica text, which is all
+pdfplumber's table finder and pdfium's text extraction need.
+"""
+
+import csv
+import os
+import random
+
+# unit name, description, count, hours per patient, avg patients, patients per nurse
+UNITS = [
+    ("Critical Care", "Medical ICU", 12, 12.0, 10.5, 1.9),
+    ("Critical Care", "Surgical ICU", 10, 12.4, 9.2, 2.0),
+    ("Intensive Care", "Neuro ICU", 8, 11.8, 8.1, 2.0),
+    ("Medical/Surgical", "Med Surg 4 North", 9, 5.6, 30.2, 4.8),
+    ("Medical/Surgical", "Med Surg 5 South", 8, 5.1, 28.7, 5.1),
+    ("Emergency Department", "Adult Emergency Department", 18, 2.84, 51.06, 2.82),
+    ("Emergency Department", "Pediatric Emergency Department", 5, 2.08, 19.2, 3.84),
+    ("Cardiac Catheterization/EP", "Cardiac Catheterization Lab (M7)", 15, 11.29, 10.63, 0.71),
+    ("Pediatrics", "Pediatric Unit", 6, 6.2, 14.0, 3.1),
+    ("Maternity", "Labor and Delivery", 7, 8.4, 9.9, 2.2),
+    ("Behavioral Health", "Adult Psychiatry", 5, 4.4, 20.3, 5.6),
+    ("Rehabilitation", "Acute Rehab", 4, 4.9, 16.1, 6.0),
+]
+
+SHIFTS = ["DAY", "EVENING", "NIGHT"]
+
+# Page title per role; {shift} is DAY / EVENING / NIGHT
+ROLE_TITLES = ["RN {shift} SHIFT", "{shift} SHIFT LPN", "{shift} SHIFT UNLICENSED"]
+
+HEADER = ["Clinical Unit", "Unit Description", "Staff Count", "Hours Per Patient", "Avg Patients", "Patients Per Nurse"]
+WIDTHS = [150, 170, 80, 90, 80, 90]
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _page_stream(title, rows, widths, height):
+    """Content stream of one page: a title row spanning the table, then ruled cells."""
+    ops = []
+    x0, y, row_height = 30, height - 40, 18
+    total = sum(widths)
+    for r, row in enumerate([[title]] + rows):
+        y_next = y - row_height
+        ops.append(f"{x0} {y} m {x0 + total} {y} l S")
+        if r == 0:
+            ops.append(f"BT /F1 9 Tf {x0 + 4} {y - 12} Td ({_escape(title)}) Tj ET")
+            ops.append(f"{x0} {y} m {x0} {y_next} l S")
+            ops.append(f"{x0 + total} {y} m {x0 + total} {y_next} l S")
+        else:
+            x = x0
+            for c, width in enumerate(widths):
+                ops.append(f"{x} {y} m {x} {y_next} l S")
+                text = row[c] if c < len(row) else ""
+                if text:
+                    ops.append(f"BT /F1 8 Tf {x + 3} {y - 12} Td ({_escape(text)}) Tj ET")
+                x += width
+            ops.append(f"{x} {y} m {x} {y_next} l S")
+        y = y_next
+    ops.append(f"{x0} {y} m {x0 + total} {y} l S")
+    return "\n".join(ops).encode("latin-1")
+
+
+def build_pdf(pages, width=792, height=612):
+    """A PDF with one ruled table per page. pages: list of (title, rows, column widths)."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for title, rows, widths in pages:
+        stream = _page_stream(title, rows, widths, height)
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % (width, height, len(objects))
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % k for k in kids) + b"] /Count %d >>" % len(kids)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def staffing_plan_pdf(pfi, seed=0):
+    """Staffing-plan PDF of one made-up facility; the same pfi and seed give the same bytes."""
+    rng = random.Random(f"{pfi}:{seed}")
+    info = [
+        ["Field", "Value"],
+        ["Reporting Organization ID", pfi],
+        ["Reporting Organization", f"Benchmark Hospital {pfi}"],
+        ["County", rng.choice(["Albany", "Kings", "Erie", "Monroe", "Suffolk"])],
+        ["Region", rng.choice(["Capital District Regional Office", "Metropolitan Area Regional Office",
+                               "Western Regional Office", "Central New York Regional Office"])],
+    ]
+    pages = [("HOSPITAL INFORMATION", info, [200, 250])]
+    for title in ROLE_TITLES:
+        for shift in SHIFTS:
+            rows = [HEADER]
+            for name, description, count, hours, patients, ratio in UNITS:
+                scale = rng.uniform(0.7, 1.3)
+                rows.append([
+                    name, description, str(max(1, round(count * scale))), f"{hours * scale:.2f}",
+                    f"{patients * rng.uniform(0.8, 1.2):.2f}", f"{ratio * scale:.2f}",
+                ])
+            pages.append((title.format(shift=shift), rows, WIDTHS))
+    # Pages every parser skips (the real plans have narrative and sign-off pages)
+    for title in ["STAFFING PLAN NARRATIVE", "CLINICAL STAFF COMMITTEE", "ATTESTATION"]:
+        pages.append((title, [["Item", "Response"], ["Notes", "See attached"]], [200, 250]))
+    return build_pdf(pages)
+
+
+def scaled_csv(source, dest, scale):
+    """
+    source repeated `scale` times into dest. Copy k > 0 of every row gets the
+    Facility ID suffixed with -k and " k" appended to its name (and address),
+    so each copy is a distinct facility; states are kept, so the share of NY
+    rows stays the same. Returns the number of data rows written.
+    """
+    if os.path.dirname(dest):
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+    with open(source, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = list(reader)
+    id_col = header.index("Facility ID") if "Facility ID" in header else None
+    name_col = header.index("Facility Name") if "Facility Name" in header else None
+    address_col = header.index("Address") if "Address" in header else None
+
+    with open(dest, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(header)
+        for copy in range(scale):
+            for row in rows:
+                if copy:
+                    row = list(row)
+                    if id_col is not None:
+                        row[id_col] = f"{row[id_col]}-{copy}"
+                    if name_col is not None:
+                        row[name_col] = f"{row[name_col]} {copy}"
+                    if address_col is not None:
+                        row[address_col] = f"{copy} {row[address_col]}"
+                writer.writerow(row)
+    return len(rows) * scale
+
+
+# Provider of Services columns beyond the ones POS_parser.py keeps, so rows
+# are about as wide as the real file's
+POS_FILLER_COLUMNS = [f"FILLER_{i:02d}" for i in range(40)]
+
+POS_STATES = ["NY", "CA", "TX", "FL", "PA", "OH", "IL", "MI", "GA", "NC"]
+
+
+def synthetic_pos(dest, rows, seed=0):
+    """A Provider of Services style CSV with `rows` providers, a third of them hospitals."""
+    # Imported here: POS_parser lives in the repo root
+    from POS_parser import cols_to_keep
+
+    if os.path.dirname(dest):
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+    rng = random.Random(seed)
+    header = cols_to_keep + ["STATE_CD"] + POS_FILLER_COLUMNS
+    with open(dest, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for n in range(rows):
+            values = {
+                "PRVDR_CTGRY_SBTYP_CD": rng.choice(["1", "1", "2", "3", "4", "5"]),
+                "PRVDR_CTGRY_CD": rng.choice(["01", "02", "03"]),
+                "CHOW_DT": f"{rng.randint(1990, 2025)}{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}",
+                "ELGBLTY_SW": rng.choice(["Y", "N"]),
+                "MDCD_VNDR_NUM": f"{rng.randint(0, 99999999):08d}",
+                "PRVDR_NUM": f"{n:06d}",
+                "GNRL_CNTL_TYPE_CD": rng.choice(["01", "02", "04", "06"]),
+                "CBSA_URBN_RRL_IND": rng.choice(["U", "R"]),
+                "CBSA_CD": str(rng.randint(10000, 49999)),
+                "ACRDTN_TYPE_CD": rng.choice(["1", "2", "3", ""]),
+                "TOT_AFLTD_AMBLNC_SRVC_CNT": str(rng.randint(0, 20)),
+                "TOT_AFLTD_HHA_CNT": str(rng.randint(0, 10)),
+                "CRTFD_BED_CNT": str(rng.randint(0, 900)),
+                "BED_CNT": str(rng.randint(0, 1000)),
+                "MDCL_SCHL_AFLTN_CD": rng.choice(["1", "2", "3", "4"]),
+                "PGM_PRTCPTN_CD": rng.choice(["1", "2"]),
+                "LPN_LVN_CNT": f"{rng.uniform(0, 80):.2f}",
+                "RSDNT_PHYSN_CNT": f"{rng.uniform(0, 200):.2f}",
+                "RN_CNT": f"{rng.uniform(0, 900):.2f}",
+                "STATE_CD": rng.choice(POS_STATES),
+            }
+            writer.writerow([values.get(column, f"X{rng.randint(0, 999)}") for column in header])
+    return rows
@@ -0,0 +1,183 @@
+"""
+Columnar Outputs for collected-data
+===================================
+Writes pipeline outputs as typed Parquet datasets next to (or instead of) the
+CSVs, partitioned by measure family and fiscal year:
+
+  collected-data/parquet/<name>/measure_family=<family>/fiscal_year=<year>/*.parquet
+
+Numeric, date and text columns are typed once at write time, so readers get
+real types back, can load only the columns they need, and can skip whole
+partitions with filters. CMS placeholders for a missing value ("Not
+Available", "Too Few to Report", ...) don't make a column text; in numeric
+and date columns they're null, like blanks.
+
+Every pipeline script takes --format csv|parquet|both (default csv). The
+directory (NYS_downloader.py) always writes ny_hospitals.csv too, since the
+other scripts read it.
+
+Install:
+  pip install pandas pyarrow
+
+Read:
+  from columnar import read_dataset
+  df = read_dataset('nys_hai', columns=['Facility ID', 'Score'],
+                    filters=[('measure_family', '=', 'HAI_1')])
+"""
+
+import argparse
+import os
+import re
+import shutil
+
+PARQUET_ROOT = 'collected-data/parquet'
+
+# Columns that hold a measure ID, in order of preference
+MEASURE_COLUMNS = ['Measure ID', 'HCAHPS Measure ID', 'Measure Name']
+
+# Identifier-like columns that must stay text even when they look numeric
+TEXT_COLUMNS = {'Facility ID', 'ZIP Code', 'Telephone Number', 'pfi', 'PRVDR_NUM', 'MDCD_VNDR_NUM', 'Phone', 'PFI'}
+
+DATE_PATTERN = re.compile(r'^\d{2}/\d{2}/\d{4}$')
+NUMBER_PATTERN = re.compile(r'^-?(\d+\.?\d*|\.\d+)$')
+
+# CMS placeholders for a missing value (the footnote columns next to them
+# say why)
+NOT_AVAILABLE = frozenset({'Not Available', 'Not Applicable', 'N/A', 'Too Few to Report'})
+
+
+def output_formats(argv=None):
+    """The --format option shared by the pipeline scripts, as a set."""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--format', choices=['csv', 'parquet', 'both'], default='csv')
+    args, _ = parser.parse_known_args(argv)
+    return {'csv', 'parquet'} if args.format == 'both' else {args.format}
+
+
+def measure_family(measure_id):
+    """
+    Leading part of a measure ID up to its first numbered token, e.g.
+    HAI_1_CILOWER -> HAI_1, H_COMP_1_A_P -> H_COMP_1, READM-30-AMI-HRRP ->
+    READM_30. IDs without a number keep their first two tokens.
+    """
+    tokens = [t for t in re.split(r'[_\-\s]+', measure_id.strip()) if t]
+    if not tokens:
+        return None
+    for i, token in enumerate(tokens):
+        if any(ch.isdigit() for ch in token):
+            return '_'.join(tokens[:i + 1])
+    return '_'.join(tokens[:2])
+
+
+def _fiscal_year(row):
+    year = (row.get('Fiscal Year') or '').strip()
+    if year.isdigit():
+        return int(year)
+    end_date = (row.get('End Date') or '').strip()
+    if DATE_PATTERN.match(end_date):
+        return int(end_date[-4:])
+    return None
+
+
+def cell_value(value):
+    """A CSV cell, stripped; None when it's blank or a CMS placeholder for a missing value."""
+    value = (value or '').strip()
+    return None if not value or value in NOT_AVAILABLE else value
+
+
+def column_kind(name, values):
+    """'int', 'float', 'date' or 'text' for a column of CSV strings, ignoring missing values."""
+    present = [v for v in map(cell_value, values) if v is not None]
+    if name in TEXT_COLUMNS or not present:
+        return 'text'
+    if all(DATE_PATTERN.match(v) for v in present):
+        return 'date'
+    if not all(NUMBER_PATTERN.match(v) for v in present):
+        return 'text'
+    # Leading zeros mean a code, not a number
+    if any(re.match(r'^-?0\d', v) for v in present):
+        return 'text'
+    if all(float(v).is_integer() for v in present):
+        return 'int'
+    return 'float'
+
+
+def _typed_column(name, values):
+    """Convert one column of CSV strings to the tightest faithful type."""
+    import pandas as pd
+
+    kind = column_kind(name, values)
+    if kind == 'text':
+        return pd.Series(values, dtype='string').str.strip().replace('', pd.NA)
+    series = pd.Series([cell_value(v) for v in values], dtype='string')
+    if kind == 'date':
+        return pd.to_datetime(series, format='%m/%d/%Y').dt.date
+    return pd.to_numeric(series).astype('Int64' if kind == 'int' else 'float64')
+
+
+def to_frame(rows, fieldnames=None, family=None):
+    """
+    Typed DataFrame with measure_family / fiscal_year partition columns.
+
+    rows: list of dicts (as written by csv.DictWriter) or a DataFrame.
+    family: partition value for files without a measure ID column.
+    """
+    import pandas as pd
+
+    if isinstance(rows, pd.DataFrame):
+        fieldnames = list(rows.columns)
+        rows = rows.astype('string').fillna('').to_dict('records')
+    fieldnames = list(fieldnames or (rows[0].keys() if rows else []))
+
+    measure_column = next((c for c in MEASURE_COLUMNS if c in fieldnames), None)
+    columns = {name: _typed_column(name, [row.get(name, '') or '' for row in rows]) for name in fieldnames}
+    columns['measure_family'] = pd.Series(
+        [measure_family(row.get(measure_column) or '') if measure_column else family for row in rows],
+        dtype='string',
+    )
+    columns['fiscal_year'] = pd.Series([_fiscal_year(row) for row in rows], dtype='Int64')
+    return pd.DataFrame(columns)
+
+
+def _partitioning():
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    # Explicit partition types, so years come back as ints and rows without a
+    # measure or year land in the default (null) partition
+    return ds.partitioning(
+        pa.schema([('measure_family', pa.string()), ('fiscal_year', pa.int64())]),
+        flavor='hive',
+    )
+
+
+def write_dataset(rows, name, fieldnames=None, family=None, root=PARQUET_ROOT):
+    """Write rows as <root>/<name>, replacing any previous copy. Returns the path."""
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    df = to_frame(rows, fieldnames, family=family or name)
+    path = os.path.join(root, name)
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    ds.write_dataset(table, path, format='parquet', partitioning=_partitioning())
+    return path
+
+
+def read_dataset(name, columns=None, filters=None, root=PARQUET_ROOT):
+    """
+    Load a dataset written by write_dataset as a DataFrame.
+
+    columns: only these columns are read from disk.
+    filters: pyarrow filters, e.g. [('fiscal_year', '=', 2025)], or a
+    pyarrow.dataset expression; filters on measure_family / fiscal_year skip
+    whole partitions.
+    """
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    dataset = ds.dataset(os.path.join(root, name), format='parquet', partitioning=_partitioning())
+    if filters is not None and not isinstance(filters, ds.Expression):
+        filters = pq.filters_to_expression(filters)
+    return dataset.to_table(columns=columns, filter=filters).to_pandas()
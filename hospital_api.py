@@ -0,0 +1,295 @@
+"""
+NY Hospital Profiles - Local Query API
+======================================
+A small read-only HTTP/JSON service over the hospital store
+(hospital_store.py) and the materialized profiles (hospital_profiles.py), for
+internal tools that would otherwise re-read the CSVs in collected-data/ on
+every request.
+
+  GET /hospitals                    all hospitals (?county=, ?region=, ?name=)
+  GET /hospitals/<hospital_id>      one profile
+  GET /facility/<facility_id>       profiles with this CMS Facility ID (CCN)
+  GET /pfi/<pfi>                    profiles with this NYS PFI
+  GET /counties/<county>            hospitals in a county
+  GET /regions/<region>             hospitals in a region
+  GET /measures/<measure_id>        every hospital's rows for one measure, per
+                                    dataset (HAI_1_SIR, H_STAR_RATING,
+                                    READM-30-AMI-HRRP, ...)
+  GET /health                       data files and cache statistics
+
+Both databases are opened read-only, with SQLite's memory-mapped I/O, one
+connection per server thread. Encoded responses are kept in an LRU cache
+(--cache-size entries, default 1024). Before each request the database
+files are checked; when the pipeline rebuilds either one, the cache is
+cleared and connections are reopened on the new files.
+
+Build the data first:
+  python hospital_store.py && python hospital_profiles.py
+
+Run:
+  python hospital_api.py                 # http://127.0.0.1:8750
+  python hospital_api.py --port 9000 --cache-size 4096
+
+Load test:
+  python benchmarks/bench_api.py
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from hospital_profiles import PROFILE_ORDER, PROFILES_PATH
+from hospital_store import STORE_PATH
+
+DEFAULT_PORT = 8750
+DEFAULT_CACHE_SIZE = 1024
+MMAP_BYTES = 256 * 1024 * 1024
+
+# Columns that identify a measure, in the order they're tried per table
+MEASURE_COLUMNS = ['measure_id', 'hcahps_measure_id', 'measure_name']
+
+# Hospital columns returned in listings
+SUMMARY_COLUMNS = 'hospital_id, in_directory, name, city, county, region, facility_id, pfi'
+
+
+class NotFound(Exception):
+    pass
+
+
+class ResponseCache:
+    """Thread-safe LRU of encoded responses, emptied whenever the data version changes."""
+
+    def __init__(self, size=DEFAULT_CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+        self.version = None
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version):
+        with self.lock:
+            if version != self.version:
+                self.entries.clear()
+                self.version = version
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, version, entry):
+        if self.size <= 0:
+            return
+        with self.lock:
+            if version != self.version:
+                return
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+
+def _connect(path):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA mmap_size={MMAP_BYTES}")
+    return conn
+
+
+class HospitalData:
+    """The store and profile databases, reopened per thread whenever either file changes."""
+
+    def __init__(self, store_path=STORE_PATH, profiles_path=PROFILES_PATH):
+        self.store_path = store_path
+        self.profiles_path = profiles_path
+        self.local = threading.local()
+
+    def version(self):
+        """Identity of the current files; changes when the pipeline rewrites either one."""
+        version = []
+        for path in (self.store_path, self.profiles_path):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                raise NotFound(f"{path} not found; run hospital_store.py and hospital_profiles.py") from None
+            version.append((stat.st_ino, stat.st_size, stat.st_mtime_ns))
+            # Writes to a WAL-mode database land in the -wal file until a checkpoint
+            try:
+                wal = os.stat(path + '-wal')
+                version.append((wal.st_size, wal.st_mtime_ns))
+            except FileNotFoundError:
+                version.append(None)
+        return tuple(version)
+
+    def connections(self, version):
+        local = self.local
+        if getattr(local, 'version', None) != version:
+            for conn in getattr(local, 'conns', ()):
+                conn.close()
+            local.conns = (_connect(self.store_path), _connect(self.profiles_path))
+            local.version = version
+        return local.conns
+
+    # ── Queries ──────────────────────────────────────────────────────────────
+
+    def hospitals(self, store, county=None, region=None, name=None):
+        where, params = [], []
+        if county:
+            where.append("county = ? COLLATE NOCASE")
+            params.append(county)
+        if region:
+            where.append("region = ? COLLATE NOCASE")
+            params.append(region)
+        if name:
+            where.append("name LIKE ? COLLATE NOCASE")
+            params.append(f"%{name}%")
+        sql = f"SELECT {SUMMARY_COLUMNS} FROM hospitals"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        return [dict(row) for row in store.execute(sql + " ORDER BY rowid", params)]
+
+    def profiles(self, profiles, column, value):
+        rows = profiles.execute(f"SELECT profile FROM profiles WHERE {column} = ? ORDER BY {PROFILE_ORDER}", (value,))
+        return [json.loads(zlib.decompress(row[0])) for row in rows]
+
+    def measure(self, store, measure_id):
+        result = {}
+        for (table,) in store.execute("SELECT name FROM datasets ORDER BY rowid").fetchall():
+            columns = [row[1] for row in store.execute(f"PRAGMA table_info({table})")]
+            column = next((c for c in MEASURE_COLUMNS if c in columns), None)
+            if column is None:
+                continue
+            rows = store.execute(f"SELECT * FROM {table} WHERE {column} = ? ORDER BY rowid", (measure_id,)).fetchall()
+            if rows:
+                result[table] = [{k: v for k, v in dict(row).items() if v is not None} for row in rows]
+        return result
+
+    def route(self, path, query, version):
+        """JSON-able result for a request path against the files of `version`, or NotFound."""
+        store, profiles = self.connections(version)
+        parts = [unquote(part) for part in path.strip('/').split('/') if part]
+        first = lambda name: (query.get(name) or [None])[0]
+
+        if parts == ['hospitals']:
+            return self.hospitals(store, first('county'), first('region'), first('name'))
+        if len(parts) == 2:
+            kind, value = parts
+            if kind == 'hospitals':
+                found = self.profiles(profiles, 'hospital_id', value)
+                if found:
+                    return found[0]
+            elif kind == 'facility':
+                found = self.profiles(profiles, 'facility_id', value)
+                if found:
+                    return found
+            elif kind == 'pfi':
+                found = self.profiles(profiles, 'pfi', value)
+                if found:
+                    return found
+            elif kind == 'counties':
+                return self.hospitals(store, county=value)
+            elif kind == 'regions':
+                return self.hospitals(store, region=value)
+            elif kind == 'measures':
+                found = self.measure(store, value)
+                if found:
+                    return found
+            raise NotFound(f"nothing found for /{kind}/{value}")
+        raise NotFound(f"unknown path {path}")
+
+
+class Handler(BaseHTTPRequestHandler):
+    # Keep-alive, so clients don't pay for a new connection per request;
+    # without TCP_NODELAY the body waits ~40ms on the client's delayed ACK
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    server_version = 'HospitalAPI/1.0'
+
+    def do_GET(self):
+        data, cache = self.server.data, self.server.cache
+        url = urlsplit(self.path)
+        if url.path.rstrip('/') == '/health':
+            return self._send(200, json.dumps(self._health()).encode('utf-8'), 'none')
+        try:
+            version = data.version()
+            key = f"{url.path}?{url.query}"
+            entry = cache.get(key, version)
+            if entry is not None:
+                return self._send(*entry, 'hit')
+            try:
+                status, body = 200, data.route(url.path, parse_qs(url.query), version)
+            except NotFound as e:
+                status, body = 404, {'error': str(e)}
+            entry = (status, json.dumps(body, separators=(',', ':'), default=str).encode('utf-8'))
+            cache.put(key, version, entry)
+            self._send(*entry, 'miss')
+        except NotFound as e:
+            self._send(503, json.dumps({'error': str(e)}).encode('utf-8'), 'none')
+
+    def _health(self):
+        cache, data = self.server.cache, self.server.data
+        files = {}
+        for path in (data.store_path, data.profiles_path):
+            files[path] = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(os.path.getmtime(path))) \
+                if os.path.exists(path) else None
+        return {
+            'files': files,
+            'cache': {'entries': len(cache.entries), 'size': cache.size, 'hits': cache.hits, 'misses': cache.misses},
+        }
+
+    def _send(self, status, body, cache_status):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('X-Cache', cache_status)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def make_server(host='127.0.0.1', port=DEFAULT_PORT, cache_size=DEFAULT_CACHE_SIZE,
+                store_path=STORE_PATH, profiles_path=PROFILES_PATH, verbose=False):
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.data = HospitalData(store_path, profiles_path)
+    server.cache = ResponseCache(cache_size)
+    server.verbose = verbose
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve hospital profiles and datasets as JSON.")
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on (default 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"port (default {DEFAULT_PORT})")
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE,
+                        help=f"responses kept in the LRU cache (default {DEFAULT_CACHE_SIZE}, 0 disables it)")
+    parser.add_argument('--store', default=STORE_PATH, help=f"hospital store (default {STORE_PATH})")
+    parser.add_argument('--profiles', default=PROFILES_PATH, help=f"profile database (default {PROFILES_PATH})")
+    parser.add_argument('--verbose', action='store_true', help="log every request")
+    args, _ = parser.parse_known_args()
+
+    server = make_server(args.host, args.port, args.cache_size, args.store, args.profiles, args.verbose)
+    print(f"Serving on http://{args.host}:{server.server_port} (Ctrl+C to stop)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
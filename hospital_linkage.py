@@ -0,0 +1,747 @@
+"""
+NY Hospital Linkage
+===================
+Shared matching engine that links the hospitals in the NYS directory
+(collected-data/ny_hospitals.csv) to CMS facilities and NYS PFIs.
+
+Every name, address, city and phone goes through one cached normalization
+layer, candidates are found through blocking indexes instead of a full scan,
+and each indicator script picks a scoring profile that reproduces its
+original weights.
+
+The confident links are written to collected-data/hospital_crosswalk.csv
+(directory hospital -> CMS Facility ID and PFI), which the hospital store
+joins on. The nys_*.py scripts keep their own matches against the file they
+read (link_hospitals), so their outputs don't change with the crosswalk.
+
+Resolved matches are cached per dataset and matching profile in
+collected-data/linkage_cache.sqlite, keyed by content hashes of the directory
+and the dataset. When either file changes, only the hospitals whose
+directory row changed (or whose match may have been displaced by a changed
+facility) are re-matched.
+
+Run:
+  python hospital_linkage.py
+"""
+
+import csv
+import hashlib
+import os
+import re
+import sqlite3
+from functools import lru_cache
+
+from state_filter import iter_state_rows, read_fieldnames
+
+DIRECTORY_CSV = 'collected-data/ny_hospitals.csv'
+CROSSWALK_CSV = 'collected-data/hospital_crosswalk.csv'
+LINKAGE_CACHE = 'collected-data/linkage_cache.sqlite'
+# Bumped when the cache tables change shape or the scoring rules change;
+# older tables are dropped, which also makes load_crosswalk rebuild
+CACHE_VERSION = 3
+
+# National CMS files the crosswalk links against, each with the profile its
+# columns allow ('name_only' when it has no Address). Files that carry
+# address/phone come first, so their links win over name-only ones.
+CMS_SOURCES = [
+    'data/HCAHPS-Hospital.csv',
+    'data/hvbp_clinical_outcomes.csv',
+    'data/FY_2025_HAC_Reduction_Program_Hospital.csv',
+    'data/FY_2025_Hospital_Readmissions_Reduction_Program_Hospital.csv',
+]
+
+# Staffing scraper outputs that carry the NYS PFI
+PFI_SOURCES = ['rn_shifts_all.csv', 'lpn_shifts_all.csv', 'UNLICENSED_shifts_all.csv']
+
+CROSSWALK_FIELDS = [
+    'Hospital Name', 'Street Address', 'City', 'Phone',
+    'Facility ID', 'CMS Facility Name', 'CMS Match Score',
+    'PFI', 'PFI Facility Name', 'PFI Match Score',
+]
+
+# Scoring profiles, one per family of indicator scripts
+PROFILES = {
+    # nys_national.py and nys_survey.py: name, address, city and phone
+    'full': {
+        'phone_exact': 15,
+        'phone_last7': 10,
+        'name_exact': 10,
+        'name_partial': 5,
+        'name_words_2': 4,
+        'name_words_1': 2,
+        # A single shared word only counts if it isn't one of these
+        'generic_words': frozenset({'HOSPITAL', 'MEDICAL', 'CENTER'}),
+        # Generic words still count towards the two-word bonus
+        'generic_word_pairs': True,
+        'address_exact': 10,
+        'street': 7,
+        'address_partial': 5,
+        'city': 5,
+        'street_city': 3,
+        'min_score': 8,
+    },
+    # nys_limited_indicators.py: the LQTP files only carry the facility name
+    'name_only': {
+        'phone_exact': 0,
+        'phone_last7': 0,
+        'name_exact': 10,
+        'name_partial': 7,
+        'name_words_2': 5,
+        'name_words_1': 3,
+        'generic_words': frozenset({'HOSPITAL', 'MEDICAL', 'CENTER', 'HEALTH', 'SYSTEM', 'THE'}),
+        'generic_word_pairs': False,
+        'address_exact': 0,
+        'street': 0,
+        'address_partial': 0,
+        'city': 0,
+        'street_city': 0,
+        'min_score': 5,
+    },
+}
+
+# Lowest score a link needs to go into the crosswalk, which the store joins
+# on. 'full' needs the name backed by the phone or the street (a partial name
+# and the city alone would link campuses to their parent's CCN), 'name_only'
+# the exact name.
+CROSSWALK_MIN_SCORE = {'full': 12, 'name_only': 10}
+
+# A PFI linked on a partial name (one name contains the other) is kept when
+# its staffing county is the County/Parish CMS gives the hospital's facility
+PFI_CORROBORATED_SCORE = 7
+
+# Hospitals re-matched at once before match_all switches to batch scoring
+BATCH_MIN = 50
+
+# Words too common in hospital names to be useful as blocking keys. Only the
+# ones a profile also treats as generic are left out of its blocks: any other
+# shared word can score on its own, so it has to bring the candidates in.
+BLOCKING_STOP_WORDS = {'HOSPITAL', 'MEDICAL', 'CENTER', 'HEALTH', 'SYSTEM', 'THE', 'OF', 'AND', 'INC'}
+
+
+def blocking_stop_words(profile):
+    return BLOCKING_STOP_WORDS & profile['generic_words']
+
+
+ADDRESS_REPLACEMENTS = {
+    'STREET': 'ST', 'AVENUE': 'AVE', 'ROAD': 'RD', 'DRIVE': 'DR',
+    'BOULEVARD': 'BLVD', 'LANE': 'LN', 'COURT': 'CT', 'PLACE': 'PL',
+    'NORTH': 'N', 'SOUTH': 'S', 'EAST': 'E', 'WEST': 'W',
+    'PARKWAY': 'PKWY', 'HIGHWAY': 'HWY', 'CIRCLE': 'CIR'
+}
+
+
+# ── Normalization ─────────────────────────────────────────────────────────────
+
+@lru_cache(maxsize=None)
+def normalize(text):
+    # Remove punctuation, extra spaces, convert to uppercase
+    text = re.sub(r'[^\w\s]', '', text.upper())
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+@lru_cache(maxsize=None)
+def normalize_phone(phone):
+    # Keep the last 10 digits (drops a country code if present)
+    digits = re.sub(r'\D', '', phone)
+    return digits[-10:] if len(digits) >= 10 else digits
+
+
+@lru_cache(maxsize=None)
+def normalize_address(address):
+    norm = normalize(address)
+    for long_form, short_form in ADDRESS_REPLACEMENTS.items():
+        norm = norm.replace(long_form, short_form)
+    return norm
+
+
+@lru_cache(maxsize=None)
+def extract_street_name(address):
+    # Street name without the leading house number
+    return re.sub(r'^\d+\s*', '', normalize_address(address))
+
+
+def prepare_hospital(name, address='', city='', phone=''):
+    name_norm = normalize(name)
+    return {
+        'name': name_norm,
+        'words': frozenset(name_norm.split()),
+        'address': normalize_address(address),
+        'street': extract_street_name(address),
+        'city': normalize(city),
+        'phone': normalize_phone(phone),
+    }
+
+
+# ── Scoring ───────────────────────────────────────────────────────────────────
+
+def score_match(ny, nat, profile):
+    score = 0
+
+    # Phone match is strong evidence; the last 7 digits allow an area code change
+    if ny['phone'] and nat['phone'] and ny['phone'] == nat['phone']:
+        score += profile['phone_exact']
+    elif ny['phone'] and nat['phone'] and len(ny['phone']) >= 7 and len(nat['phone']) >= 7:
+        if ny['phone'][-7:] == nat['phone'][-7:]:
+            score += profile['phone_last7']
+
+    if ny['name'] == nat['name']:
+        score += profile['name_exact']
+    elif ny['name'] and nat['name'] and (ny['name'] in nat['name'] or nat['name'] in ny['name']):
+        score += profile['name_partial']
+    else:
+        # Shared words handle abbreviations like SJRH
+        common_words = ny['words'] & nat['words']
+        significant_words = common_words - profile['generic_words']
+        if len(common_words if profile['generic_word_pairs'] else significant_words) >= 2:
+            score += profile['name_words_2']
+        elif significant_words:
+            score += profile['name_words_1']
+
+    # A blank address or city (the name-only CMS files) says nothing: an
+    # empty string is "in" every address and equal to every other blank
+    if ny['address'] and nat['address']:
+        if ny['address'] == nat['address']:
+            score += profile['address_exact']
+        elif ny['street'] and nat['street'] and ny['street'] == nat['street']:
+            score += profile['street']  # Same street name (different numbers OK)
+        elif ny['address'] in nat['address'] or nat['address'] in ny['address']:
+            score += profile['address_partial']
+
+    same_city = bool(ny['city']) and ny['city'] == nat['city']
+    if same_city:
+        score += profile['city']
+
+    # Street name + city is pretty strong even without a name match
+    if ny['street'] and nat['street'] and ny['street'] == nat['street'] and same_city:
+        score += profile['street_city']
+
+    return score
+
+
+# ── Blocking index ────────────────────────────────────────────────────────────
+
+def build_match_index(candidates, profile):
+    """
+    candidates: dict keyed by facility name -> {'address', 'city', 'phone', ...}
+    (missing fields are treated as blank).
+
+    Every candidate is normalized once. The blocking indexes map phone
+    (10-digit and last 7), street name, city and significant name words to
+    candidate positions, so find_match only scores candidates that share at
+    least one key with the hospital. Keys the profile gives no weight to are
+    not indexed. Candidates that have no value for an indexed key can't be
+    ruled out by it and are always scored ('unblocked').
+    """
+    profile = PROFILES[profile] if isinstance(profile, str) else profile
+    uses_phone = profile['phone_exact'] > 0 or profile['phone_last7'] > 0
+    uses_street = profile['street'] > 0 or profile['address_exact'] > 0
+    uses_city = profile['city'] > 0
+
+    stop_words = blocking_stop_words(profile)
+    index = {
+        'profile': profile,
+        'stop_words': stop_words,
+        'facilities': [],
+        'phone': {},
+        'phone7': {},
+        'street': {},
+        'city': {},
+        'word': {},
+        'unblocked': [],
+    }
+    for position, (nat_name, nat_info) in enumerate(candidates.items()):
+        nat = prepare_hospital(
+            nat_name,
+            nat_info.get('address', ''),
+            nat_info.get('city', ''),
+            nat_info.get('phone', ''),
+        )
+        index['facilities'].append((nat_name, nat))
+
+        if uses_phone and nat['phone']:
+            index['phone'].setdefault(nat['phone'], []).append(position)
+            if len(nat['phone']) >= 7:
+                index['phone7'].setdefault(nat['phone'][-7:], []).append(position)
+        if uses_street and nat['street']:
+            index['street'].setdefault(nat['street'], []).append(position)
+        if uses_city and nat['city']:
+            index['city'].setdefault(nat['city'], []).append(position)
+        significant_words = nat['words'] - stop_words
+        for word in significant_words:
+            index['word'].setdefault(word, []).append(position)
+
+        if (uses_street and not nat['street']) or (uses_city and not nat['city']) or not significant_words:
+            index['unblocked'].append(position)
+    return index
+
+
+def find_match(ny_hospital, match_index):
+    """Best-scoring candidate for one directory hospital, as (name, score)."""
+    profile = match_index['profile']
+    ny = prepare_hospital(
+        ny_hospital['name'],
+        ny_hospital.get('address', ''),
+        ny_hospital.get('city', ''),
+        ny_hospital.get('phone', ''),
+    )
+    facilities = match_index['facilities']
+
+    positions = set(match_index['unblocked'])
+    if ny['phone']:
+        positions.update(match_index['phone'].get(ny['phone'], []))
+        if len(ny['phone']) >= 7:
+            positions.update(match_index['phone7'].get(ny['phone'][-7:], []))
+    if ny['street']:
+        positions.update(match_index['street'].get(ny['street'], []))
+    if ny['city']:
+        positions.update(match_index['city'].get(ny['city'], []))
+    for word in ny['words'] - match_index['stop_words']:
+        positions.update(match_index['word'].get(word, []))
+
+    # A candidate outside the blocks shares no phone, street, city or
+    # significant word, so it can only score through a partial name and/or
+    # partial address match. If the blocked candidates didn't beat that, pull
+    # those candidates in too so the result matches a full scan.
+    word_pairs = profile['name_words_2'] if profile['generic_word_pairs'] else 0
+    unblocked_max = max(profile['name_partial'], word_pairs) + profile['address_partial']
+    scores = {p: score_match(ny, facilities[p][1], profile) for p in positions}
+    if unblocked_max >= profile['min_score'] and max(scores.values(), default=0) <= unblocked_max:
+        for position, (nat_name, nat) in enumerate(facilities):
+            if position in scores:
+                continue
+            if (
+                ny['name'] in nat['name'] or nat['name'] in ny['name']
+                or (profile['address_partial'] and ny['address'] and nat['address']
+                    and (ny['address'] in nat['address'] or nat['address'] in ny['address']))
+                or (word_pairs and len(ny['words'] & nat['words']) >= 2)
+            ):
+                scores[position] = score_match(ny, nat, profile)
+
+    best_match = None
+    best_score = 0
+    # Walk in candidate order so ties resolve the same way as a full scan
+    for position in sorted(scores):
+        score = scores[position]
+        if score >= profile['min_score'] and score > best_score:
+            best_score = score
+            best_match = facilities[position][0]
+
+    return best_match, best_score
+
+
+def match_all(ny_hospitals, match_index):
+    """
+    find_match for every hospital. From BATCH_MIN hospitals on they're scored
+    in one vectorized pass (hospital_similarity.py, needs numpy), which gives
+    the same results; below that the blocking indexes are quicker.
+    """
+    if len(ny_hospitals) >= BATCH_MIN:
+        try:
+            from hospital_similarity import BatchMatcher
+        except ImportError:
+            pass
+        else:
+            return BatchMatcher.from_index(match_index).best_matches(ny_hospitals)
+    return [find_match(ny_hospital, match_index) for ny_hospital in ny_hospitals]
+
+
+# ── Match cache ───────────────────────────────────────────────────────────────
+
+def file_fingerprint(paths):
+    """Content hash of one or more input files (missing files are skipped)."""
+    paths = [paths] if isinstance(paths, str) else paths
+    digest = hashlib.sha256()
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        digest.update(path.encode('utf-8'))
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def row_fingerprint(*values):
+    return hashlib.sha1('\x1f'.join(values).encode('utf-8')).hexdigest()
+
+
+def profile_fingerprint(profile):
+    profile = PROFILES[profile] if isinstance(profile, str) else profile
+    # The blocking words are part of it: matches found with other blocks may differ
+    return row_fingerprint(*(f"{key}={sorted(value) if isinstance(value, frozenset) else value}"
+                             for key, value in sorted(profile.items())),
+                           f"blocking={sorted(blocking_stop_words(profile))}")
+
+
+def hospital_key(ny_hospital):
+    return f"{ny_hospital['name']}|{ny_hospital.get('address', '')}"
+
+
+def _hospital_fingerprint(ny_hospital):
+    return row_fingerprint(*(ny_hospital.get(field, '') for field in ('name', 'address', 'city', 'phone')))
+
+
+def _candidate_fingerprint(name, info):
+    return row_fingerprint(name, *(info.get(field, '') for field in ('facility_id', 'address', 'city', 'phone')))
+
+
+def open_cache(path=LINKAGE_CACHE):
+    # The indicator scripts may run side by side (nys_refresh.py), so wait
+    # out each other's writes
+    conn = sqlite3.connect(path, timeout=60)
+    # Entries are per (dataset, profile): the same national file can be
+    # matched under more than one profile
+    if conn.execute("PRAGMA user_version").fetchone()[0] < CACHE_VERSION:
+        conn.executescript(f"""
+            DROP TABLE IF EXISTS datasets;
+            DROP TABLE IF EXISTS candidates;
+            DROP TABLE IF EXISTS matches;
+            DROP TABLE IF EXISTS crosswalks;
+            PRAGMA user_version = {CACHE_VERSION};
+        """)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS datasets (
+            dataset TEXT,
+            profile TEXT,
+            profile_hash TEXT,
+            directory_hash TEXT,
+            dataset_hash TEXT,
+            PRIMARY KEY (dataset, profile)
+        );
+        CREATE TABLE IF NOT EXISTS candidates (
+            dataset TEXT,
+            profile TEXT,
+            name TEXT,
+            position INTEGER,
+            fingerprint TEXT,
+            PRIMARY KEY (dataset, profile, name)
+        );
+        CREATE TABLE IF NOT EXISTS matches (
+            dataset TEXT,
+            profile TEXT,
+            hospital TEXT,
+            fingerprint TEXT,
+            match TEXT,
+            score INTEGER,
+            PRIMARY KEY (dataset, profile, hospital)
+        );
+        CREATE TABLE IF NOT EXISTS crosswalks (
+            path TEXT PRIMARY KEY,
+            fingerprint TEXT
+        );
+    """)
+    return conn
+
+
+def cached_matches(ny_hospitals, candidates, profile, dataset, directory=DIRECTORY_CSV, cache_path=LINKAGE_CACHE):
+    """
+    find_match for every hospital, backed by the on-disk match cache.
+
+    dataset: path (or list of paths) of the national file(s) the candidates
+    were read from; with the profile it names the cache entry, and it is
+    fingerprinted together with the directory file.
+
+    Returns ({hospital_key: (match, score)}, number of hospitals re-matched).
+    """
+    dataset_name = dataset if isinstance(dataset, str) else ','.join(dataset)
+    profile_hash = profile_fingerprint(profile)
+    profile_name = profile if isinstance(profile, str) else profile_hash
+    directory_hash = file_fingerprint(directory)
+    dataset_hash = file_fingerprint(dataset)
+    keys = [hospital_key(h) for h in ny_hospitals]
+
+    conn = open_cache(cache_path)
+    try:
+        return _refresh_matches(conn, ny_hospitals, keys, candidates, profile, (dataset_name, profile_name),
+                                (profile_hash, directory_hash, dataset_hash))
+    finally:
+        conn.close()
+
+
+def _refresh_matches(conn, ny_hospitals, keys, candidates, profile, entry, hashes):
+    profile_hash = hashes[0]
+    with conn:
+        state = conn.execute(
+            "SELECT profile_hash, directory_hash, dataset_hash FROM datasets WHERE dataset = ? AND profile = ?", entry
+        ).fetchone()
+        old_matches = {
+            hospital: (fingerprint, match, score)
+            for hospital, fingerprint, match, score in conn.execute(
+                "SELECT hospital, fingerprint, match, score FROM matches WHERE dataset = ? AND profile = ?", entry
+            )
+        }
+
+        # Neither input changed: everything comes straight from the cache
+        if state == hashes and all(key in old_matches for key in keys):
+            return {key: old_matches[key][1:] for key in keys}, 0
+
+        old_candidates = {} if state is None or state[0] != profile_hash else {
+            name: (position, fingerprint) for name, position, fingerprint in conn.execute(
+                "SELECT name, position, fingerprint FROM candidates WHERE dataset = ? AND profile = ?", entry
+            )
+        }
+        if state is None or state[0] != profile_hash:
+            old_matches = {}
+
+        match_index = build_match_index(candidates, profile)
+        prof = match_index['profile']
+        facilities = match_index['facilities']
+        positions = {name: position for position, (name, _) in enumerate(facilities)}
+        current = {name: _candidate_fingerprint(name, info) for name, info in candidates.items()}
+
+        # Facilities that are new or whose details changed, and names that no
+        # longer carry the same facility
+        old_fingerprints = {name: fp for name, (_, fp) in old_candidates.items()}
+        changed = sorted(positions[name] for name, fp in current.items() if old_fingerprints.get(name) != fp)
+        stale = {name for name, fp in old_fingerprints.items() if current.get(name) != fp}
+
+        # Ties go to the earliest facility, so if the unchanged facilities
+        # aren't in the same order as before, a cached match may no longer
+        # win its ties: match everything again, as a full scan would
+        unchanged = [name for name, fp in current.items() if old_fingerprints.get(name) == fp]
+        if sorted(unchanged, key=lambda name: old_candidates[name][0]) != sorted(unchanged, key=positions.get):
+            old_matches = {}
+
+        results = {}
+        rematch = []
+        for ny_hospital, key in zip(ny_hospitals, keys):
+            fingerprint = _hospital_fingerprint(ny_hospital)
+            cached = old_matches.get(key)
+            if cached is None or cached[0] != fingerprint or cached[1] in stale:
+                rematch.append((ny_hospital, key))
+                continue
+
+            # The cached match is still the best of the unchanged facilities,
+            # so only the changed ones can displace it. Same rule as
+            # find_match: highest score wins, earliest position breaks ties.
+            match, score = cached[1], cached[2]
+            best_position = positions[match] if match else len(facilities)
+            if changed:
+                ny = prepare_hospital(
+                    ny_hospital['name'],
+                    ny_hospital.get('address', ''),
+                    ny_hospital.get('city', ''),
+                    ny_hospital.get('phone', ''),
+                )
+                for position in changed:
+                    candidate_score = score_match(ny, facilities[position][1], prof)
+                    if candidate_score < prof['min_score']:
+                        continue
+                    if candidate_score > score or (candidate_score == score and position < best_position):
+                        match, score, best_position = facilities[position][0], candidate_score, position
+            results[key] = (match, score)
+
+        rematched = len(rematch)
+        for (ny_hospital, key), result in zip(rematch, match_all([h for h, _ in rematch], match_index)):
+            results[key] = result
+
+        conn.execute("DELETE FROM candidates WHERE dataset = ? AND profile = ?", entry)
+        conn.executemany(
+            "INSERT INTO candidates VALUES (?, ?, ?, ?, ?)",
+            [(*entry, name, positions[name], fp) for name, fp in current.items()],
+        )
+        conn.execute("DELETE FROM matches WHERE dataset = ? AND profile = ?", entry)
+        conn.executemany(
+            "INSERT INTO matches VALUES (?, ?, ?, ?, ?, ?)",
+            [(*entry, key, _hospital_fingerprint(h), results[key][0], results[key][1])
+             for h, key in zip(ny_hospitals, keys)],
+        )
+        conn.execute("INSERT OR REPLACE INTO datasets VALUES (?, ?, ?, ?, ?)", (*entry, *hashes))
+    return results, rematched
+
+
+# ── Directory and crosswalk ───────────────────────────────────────────────────
+
+def load_directory(path=DIRECTORY_CSV):
+    """Hospitals from the NYS directory in file order."""
+    hospitals = []
+    with open(path, 'r', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            hospitals.append({
+                'name': row['Hospital Name'],
+                'address': row['Street Address'],
+                'city': row.get('City, State, ZIP', '').split(',')[0].strip() if row.get('City, State, ZIP') else '',
+                'phone': row.get('Phone', '')
+            })
+    return hospitals
+
+
+def load_cms_facilities(paths=CMS_SOURCES, state='NY'):
+    """NY facilities pooled by Facility ID across the national files present."""
+    facilities = {}
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        for row in iter_state_rows(path, state):
+            facility = facilities.setdefault(row['Facility ID'], {
+                'facility_id': row['Facility ID'],
+                'name': row['Facility Name'],
+                'address': '',
+                'city': '',
+                'phone': '',
+                'county': '',
+            })
+            facility['address'] = facility['address'] or row.get('Address', '')
+            facility['city'] = facility['city'] or row.get('City/Town', '')
+            facility['phone'] = facility['phone'] or row.get('Telephone Number', '')
+            facility['county'] = facility['county'] or row.get('County/Parish', '')
+    return facilities
+
+
+def cms_profile(path):
+    """Scoring profile for a CMS file: 'full' if it carries addresses, else 'name_only'."""
+    return 'full' if 'Address' in read_fieldnames(path) else 'name_only'
+
+
+def load_pfi_facilities(paths=PFI_SOURCES):
+    """NYS facilities keyed by PFI from the staffing scraper outputs."""
+    facilities = {}
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                facilities.setdefault(row['pfi'], {'pfi': row['pfi'], 'name': row['hospital_name'],
+                                                   'county': row.get('county', '')})
+    return facilities
+
+
+def build_crosswalk(hospitals=None, cms_sources=CMS_SOURCES, pfi_sources=PFI_SOURCES):
+    """
+    One row per directory hospital with its CMS Facility ID and PFI. Each CMS
+    file is matched on its own, with cms_profile(); the first file (in
+    cms_sources order) with a link of at least CROSSWALK_MIN_SCORE gives the
+    Facility ID. PFIs need the exact name, or a partial one corroborated by
+    the county. Hospitals without a confident link get blank columns.
+    """
+    hospitals = load_directory() if hospitals is None else hospitals
+
+    cms_links = {}
+    for path in cms_sources:
+        if not os.path.exists(path):
+            continue
+        profile = cms_profile(path)
+        # Facility names aren't unique across IDs, so index candidates by
+        # name and keep the first ID seen for each one
+        candidates = {}
+        for facility in load_cms_facilities([path]).values():
+            candidates.setdefault(facility['name'], facility)
+        matches, _ = cached_matches(hospitals, candidates, profile, path)
+        for hospital in hospitals:
+            key = hospital_key(hospital)
+            match, score = matches[key]
+            if key not in cms_links and match and score >= CROSSWALK_MIN_SCORE[profile]:
+                cms_links[key] = (candidates[match], score)
+    counties = {facility_id: facility['county']
+                for facility_id, facility in load_cms_facilities(cms_sources).items()}
+
+    pfi_by_name = {}
+    for facility in load_pfi_facilities(pfi_sources).values():
+        pfi_by_name.setdefault(facility['name'], facility)
+    pfi_matches, _ = cached_matches(hospitals, pfi_by_name, 'name_only', pfi_sources)
+
+    crosswalk = []
+    for hospital in hospitals:
+        key = hospital_key(hospital)
+        cms, cms_score = cms_links.get(key, (None, None))
+        pfi_match, pfi_score = pfi_matches[key]
+        pfi = pfi_by_name[pfi_match] if pfi_match else None
+        if pfi and pfi_score < CROSSWALK_MIN_SCORE['name_only']:
+            county = counties.get(cms['facility_id'], '') if cms else ''
+            if pfi_score < PFI_CORROBORATED_SCORE or not county or county.upper() != pfi['county'].upper():
+                pfi = None
+        crosswalk.append({
+            'Hospital Name': hospital['name'],
+            'Street Address': hospital['address'],
+            'City': hospital['city'],
+            'Phone': hospital['phone'],
+            'Facility ID': cms['facility_id'] if cms else '',
+            'CMS Facility Name': cms['name'] if cms else '',
+            'CMS Match Score': cms_score if cms else '',
+            'PFI': pfi['pfi'] if pfi else '',
+            'PFI Facility Name': pfi_match if pfi else '',
+            'PFI Match Score': pfi_score if pfi else '',
+        })
+    return crosswalk
+
+
+def write_crosswalk(crosswalk, path=CROSSWALK_CSV):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=CROSSWALK_FIELDS)
+        writer.writeheader()
+        writer.writerows(crosswalk)
+
+
+def crosswalk_fingerprint():
+    """Hash of everything build_crosswalk() reads: its input files, both scoring profiles and its thresholds."""
+    return row_fingerprint(file_fingerprint([DIRECTORY_CSV] + CMS_SOURCES + PFI_SOURCES),
+                           profile_fingerprint('full'), profile_fingerprint('name_only'),
+                           f"min={sorted(CROSSWALK_MIN_SCORE.items())}", f"pfi={PFI_CORROBORATED_SCORE}")
+
+
+def save_crosswalk(path=CROSSWALK_CSV, cache_path=LINKAGE_CACHE):
+    """Build the crosswalk, write it to path and record what it was built from."""
+    fingerprint = crosswalk_fingerprint()
+    crosswalk = build_crosswalk()
+    write_crosswalk(crosswalk, path)
+    conn = open_cache(cache_path)
+    try:
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO crosswalks VALUES (?, ?)", (path, fingerprint))
+    finally:
+        conn.close()
+    return crosswalk
+
+
+def load_crosswalk(path=CROSSWALK_CSV, cache_path=LINKAGE_CACHE):
+    """
+    Crosswalk keyed by (Hospital Name, Street Address). Builds and saves it
+    first if it doesn't exist yet, or if the directory, the CMS or staffing
+    files or the scoring profiles changed since it was built.
+    """
+    conn = open_cache(cache_path)
+    try:
+        recorded = conn.execute("SELECT fingerprint FROM crosswalks WHERE path = ?", (path,)).fetchone()
+    finally:
+        conn.close()
+    if not os.path.exists(path) or recorded is None or recorded[0] != crosswalk_fingerprint():
+        save_crosswalk(path, cache_path)
+    with open(path, 'r', encoding='utf-8') as f:
+        return {(row['Hospital Name'], row['Street Address']): row for row in csv.DictReader(f)}
+
+
+def link_hospitals(ny_hospitals, candidates, profile, dataset):
+    """
+    Resolve every directory hospital against one dataset's candidates.
+
+    candidates: dict keyed by facility name -> {'facility_id', 'address',
+    'city', 'phone'}, read from the national file(s) at `dataset`. Each
+    hospital gets the cached find_match result for the given scoring
+    profile, so a script's output doesn't depend on the crosswalk.
+
+    Returns a list of (ny_hospital, match, score) in directory order.
+    """
+    matches, rematched = cached_matches(ny_hospitals, candidates, profile, dataset)
+    print(f"Linked {len(ny_hospitals)} hospitals ({rematched} re-matched, {len(ny_hospitals) - rematched} from cache)")
+    return [(ny_hospital, *matches[hospital_key(ny_hospital)]) for ny_hospital in ny_hospitals]
+
+
+def main():
+    from columnar import output_formats, write_dataset
+
+    crosswalk = save_crosswalk()
+    if 'parquet' in output_formats():
+        print(f"Parquet dataset written to {write_dataset(crosswalk, 'hospital_crosswalk', CROSSWALK_FIELDS)}")
+    cms_linked = sum(1 for row in crosswalk if row['Facility ID'])
+    pfi_linked = sum(1 for row in crosswalk if row['PFI'])
+    print(f"Successfully created {CROSSWALK_CSV}")
+    print(f"Directory hospitals: {len(crosswalk)}")
+    print(f"Linked to a CMS Facility ID: {cms_linked}")
+    print(f"Linked to a PFI: {pfi_linked}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+NY Hospital Profiles
+====================
+Materializes one pre-joined profile per hospital into
+collected-data/hospital_profiles.sqlite, so serving a profile is a single
+primary-key read instead of filtering every dataset for one facility.
+
+A profile is the hospital's row from the hospital store (hospital_store.py)
+plus, for every dataset, the rows for its Facility ID or PFI:
+
+  {"hospital": {...name, address, facility_id, pfi, ...},
+   "hai": [...], "hcahps": [...], ..., "staffing_rn": [...], "pos": [...]}
+
+Columns that only repeat the hospital's identity (facility name, address,
+phone, ...) and empty values are left out of the dataset rows. Profiles are
+stored as zlib-compressed JSON keyed by the store's (stable) hospital_id,
+with indexes on facility_id and pfi.
+
+Rebuilds are incremental. Every profile keeps a fingerprint of its inputs:
+its hospital row (less the id it's keyed by) and a digest of its rows in each
+dataset. Per-facility digests are only recomputed for datasets whose source
+file changed (by SHA-256, as recorded in the store), and only hospitals whose
+fingerprint moved are re-materialized; hospitals that left the store are
+dropped.
+
+Run:
+  python hospital_profiles.py            # (re)build changed profiles
+  python hospital_profiles.py --full     # rebuild every profile
+  python hospital_profiles.py --show 330085
+
+Read:
+  from hospital_profiles import open_profiles, get_profile
+  profile = get_profile(open_profiles(), facility_id='330085')
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import zlib
+
+from hospital_store import STORE_PATH, build_store, open_store
+
+PROFILES_PATH = 'collected-data/hospital_profiles.sqlite'
+# Bumped when the profile tables change shape; older tables are dropped
+SCHEMA_VERSION = 2
+
+# Order of profiles sharing a Facility ID or PFI: directory hospitals first
+PROFILE_ORDER = 'in_directory DESC, name, hospital_id'
+
+# Dataset columns that only repeat the hospital's identity
+IDENTITY_COLUMNS = {
+    'in_219_list', 'facility_id', 'facility_name', 'address', 'city_town', 'state', 'zip_code',
+    'county_parish', 'telephone_number', 'pfi', 'hospital_name', 'county', 'region',
+}
+
+
+def _digest(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def open_profiles(path=PROFILES_PATH):
+    """Connection to the profile database, creating its tables if needed."""
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+        conn.executescript(f"""
+            DROP TABLE IF EXISTS profiles;
+            DROP TABLE IF EXISTS sources;
+            DROP TABLE IF EXISTS row_digests;
+            PRAGMA user_version = {SCHEMA_VERSION};
+        """)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS profiles (
+            hospital_id TEXT PRIMARY KEY,
+            in_directory INTEGER,
+            facility_id TEXT,
+            pfi TEXT,
+            name TEXT,
+            fingerprint TEXT,
+            built REAL,
+            profile BLOB
+        );
+        CREATE INDEX IF NOT EXISTS profiles_facility_id ON profiles (facility_id);
+        CREATE INDEX IF NOT EXISTS profiles_pfi ON profiles (pfi);
+        CREATE TABLE IF NOT EXISTS sources (
+            dataset TEXT PRIMARY KEY,
+            sha256 TEXT
+        );
+        CREATE TABLE IF NOT EXISTS row_digests (
+            dataset TEXT,
+            key TEXT,
+            digest TEXT,
+            PRIMARY KEY (dataset, key)
+        );
+    """)
+    return conn
+
+
+def _dataset_rows(store, dataset, key, value):
+    """One facility's rows of a dataset, identity columns and blanks dropped."""
+    rows = store.execute(f"SELECT * FROM {dataset} WHERE {key} = ? ORDER BY rowid", (value,))
+    return [{k: v for k, v in dict(row).items() if v is not None and k not in IDENTITY_COLUMNS} for row in rows]
+
+
+def _refresh_digests(store, profiles, datasets, full=False):
+    """
+    Per-facility row digests of every dataset, recomputed only for datasets
+    whose source changed. Returns {dataset: {key value: digest}} and the
+    names of the datasets that were re-digested.
+    """
+    previous = dict(profiles.execute("SELECT dataset, sha256 FROM sources"))
+    digests, changed = {}, []
+    for dataset, key, sha256 in datasets:
+        if not full and previous.get(dataset) == sha256:
+            digests[dataset] = dict(profiles.execute(
+                "SELECT key, digest FROM row_digests WHERE dataset = ?", (dataset,)))
+            continue
+        # One ordered scan of the table, hashing each facility's rows
+        by_key = {}
+        for row in store.execute(f"SELECT * FROM {dataset} ORDER BY rowid"):
+            row = dict(row)
+            if row[key] is not None:
+                by_key.setdefault(row[key], hashlib.sha256()).update(
+                    json.dumps(row, sort_keys=True, default=str).encode('utf-8'))
+        digests[dataset] = {value: h.hexdigest() for value, h in by_key.items()}
+        changed.append(dataset)
+        with profiles:
+            profiles.execute("DELETE FROM row_digests WHERE dataset = ?", (dataset,))
+            profiles.executemany("INSERT INTO row_digests VALUES (?, ?, ?)",
+                                 ((dataset, value, digest) for value, digest in digests[dataset].items()))
+            profiles.execute("INSERT OR REPLACE INTO sources VALUES (?, ?)", (dataset, sha256))
+    # Datasets no longer in the store
+    known = {dataset for dataset, _, _ in datasets}
+    with profiles:
+        for dataset in set(previous) - known:
+            profiles.execute("DELETE FROM sources WHERE dataset = ?", (dataset,))
+            profiles.execute("DELETE FROM row_digests WHERE dataset = ?", (dataset,))
+    return digests, changed
+
+
+def build_profile(store, hospital, datasets):
+    """The profile dict of one hospital row (see the module docstring)."""
+    profile = {'hospital': {k: v for k, v in hospital.items() if v is not None}}
+    for dataset, key, _ in datasets:
+        if hospital.get(key) is not None:
+            profile[dataset] = _dataset_rows(store, dataset, key, hospital[key])
+    return profile
+
+
+def materialize(store_path=STORE_PATH, path=PROFILES_PATH, full=False):
+    """
+    Bring the profile database up to date with the store. Returns a dict with
+    the number of profiles built, unchanged and removed.
+    """
+    store = open_store(store_path)
+    profiles = open_profiles(path)
+    try:
+        datasets = store.execute("SELECT name, key, sha256 FROM datasets ORDER BY rowid").fetchall()
+        digests, changed = _refresh_digests(store, profiles, datasets, full)
+
+        stored = dict(profiles.execute("SELECT hospital_id, fingerprint FROM profiles"))
+        hospitals = [dict(row) for row in store.execute("SELECT * FROM hospitals ORDER BY rowid")]
+        built = 0
+        with profiles:
+            for hospital in hospitals:
+                identity = {k: v for k, v in hospital.items() if k != 'hospital_id'}
+                parts = [identity] + [
+                    [dataset, digests[dataset].get(hospital.get(key))] for dataset, key, _ in datasets
+                ]
+                fingerprint = _digest(parts)
+                if not full and stored.get(hospital['hospital_id']) == fingerprint:
+                    continue
+                profile = build_profile(store, hospital, datasets)
+                blob = zlib.compress(json.dumps(profile, separators=(',', ':'), default=str).encode('utf-8'), 6)
+                profiles.execute(
+                    "INSERT OR REPLACE INTO profiles VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (hospital['hospital_id'], hospital['in_directory'], hospital['facility_id'], hospital['pfi'], hospital['name'],
+                     fingerprint, time.time(), blob),
+                )
+                built += 1
+
+            current = {hospital['hospital_id'] for hospital in hospitals}
+            removed = [hospital_id for hospital_id in stored if hospital_id not in current]
+            profiles.executemany("DELETE FROM profiles WHERE hospital_id = ?", ((i,) for i in removed))
+    finally:
+        store.close()
+        profiles.close()
+    return {
+        'built': built,
+        'unchanged': len(hospitals) - built,
+        'removed': len(removed),
+        'datasets_changed': changed,
+    }
+
+
+def get_profile(conn, hospital_id=None, facility_id=None, pfi=None):
+    """
+    One profile by hospital_id, Facility ID or PFI, or None. A Facility ID or
+    PFI shared by several hospitals returns the first in PROFILE_ORDER.
+    """
+    if hospital_id is not None:
+        where, value = "hospital_id = ?", hospital_id
+    elif facility_id:
+        where, value = "facility_id = ?", facility_id
+    elif pfi:
+        where, value = "pfi = ?", pfi
+    else:
+        raise ValueError("give a hospital_id, facility_id or pfi")
+    row = conn.execute(f"SELECT profile FROM profiles WHERE {where} ORDER BY {PROFILE_ORDER} LIMIT 1", (value,)).fetchone()
+    return json.loads(zlib.decompress(row[0])) if row else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Materialize one pre-joined profile per hospital.")
+    parser.add_argument('--store', default=STORE_PATH, help=f"hospital store (default {STORE_PATH})")
+    parser.add_argument('--profiles', default=PROFILES_PATH, help=f"profile database (default {PROFILES_PATH})")
+    parser.add_argument('--full', action='store_true', help="rebuild every profile")
+    parser.add_argument('--show', metavar='ID', help="print the profile with this Facility ID, PFI or hospital_id")
+    args, _ = parser.parse_known_args()
+
+    if args.show:
+        conn = open_profiles(args.profiles)
+        profile = (get_profile(conn, facility_id=args.show) or get_profile(conn, pfi=args.show)
+                   or get_profile(conn, hospital_id=args.show))
+        if profile is None:
+            raise SystemExit(f"No profile for {args.show}")
+        print(json.dumps(profile, indent=2))
+        return
+
+    if not os.path.exists(args.store):
+        print(f"{args.store} not found, building it first")
+        build_store(args.store)
+    start = time.perf_counter()
+    result = materialize(args.store, args.profiles, args.full)
+    print(f"Profiles: {result['built']} built, {result['unchanged']} unchanged, {result['removed']} removed "
+          f"in {time.perf_counter() - start:.2f}s")
+    if result['datasets_changed']:
+        print(f"Datasets re-digested: {', '.join(result['datasets_changed'])}")
+
+
+if __name__ == "__main__":
+    main()
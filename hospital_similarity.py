@@ -0,0 +1,351 @@
+"""
+NY Hospital Linkage - Batch Matching
+====================================
+Scores every directory hospital against every candidate facility at once,
+as matrices, instead of one find_match call per hospital.
+
+Names and addresses are encoded as character trigram and word incidence
+vectors over the trigrams/words that occur on the hospital side (the only
+ones a dot product can hit). From their products, in blocks of BLOCK
+candidates, come:
+
+  score        the hospital_linkage.score_match score of every pair, exactly:
+               phone, name, address, city and street+city terms are
+               comparisons of integer codes, shared-word counts are products
+               of word vectors, and the substring ("partial") checks are only
+               run for the pairs whose trigram overlap allows one
+  similarity   cosine of the TF-IDF weighted trigram vectors of the two names
+               (IDF over the candidates), which still rates abbreviations
+               and reorderings the word and substring rules miss
+
+best_matches() returns what find_match returns for each hospital. top_k()
+ranks every candidate by score + similarity_weight * similarity and returns
+the k best per hospital with both values, for reviewing near misses.
+
+Install:
+  pip install numpy
+
+Use:
+  from hospital_similarity import BatchMatcher
+  matcher = BatchMatcher(candidates, 'full')
+  matcher.best_matches(hospitals)      # [(name, score), ...]
+  matcher.top_k(hospitals, k=5)        # [[(name, score, similarity), ...], ...]
+"""
+
+import math
+
+import numpy as np
+
+from hospital_linkage import PROFILES, prepare_hospital
+
+NGRAM = 3
+
+# Candidates scored per block; bounds the size of the (hospitals x block) matrices
+BLOCK = 4096
+
+
+def ngrams(text, n=NGRAM):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def _codes(values, table):
+    """Integer code per value; values missing from the table get -2 (equal to nothing)."""
+    return np.fromiter((table.get(value, -2) for value in values), dtype=np.int64, count=len(values))
+
+
+def _incidence(sets, vocab):
+    """float32 (len(sets) x len(vocab)) matrix with a 1 for each member of each set."""
+    matrix = np.zeros((len(sets), len(vocab)), dtype=np.float32)
+    rows, cols = [], []
+    for row, members in enumerate(sets):
+        for member in members:
+            col = vocab.get(member)
+            if col is not None:
+                rows.append(row)
+                cols.append(col)
+    matrix[rows, cols] = 1
+    return matrix
+
+
+class _Side:
+    """Prepared hospitals or candidates as parallel lists."""
+
+    def __init__(self, prepared):
+        self.prepared = prepared
+        self.names = [p['name'] for p in prepared]
+        self.addresses = [p['address'] for p in prepared]
+        self.name_grams = [ngrams(name) for name in self.names]
+        self.address_grams = [ngrams(address) for address in self.addresses]
+
+
+class _Postings:
+    """
+    The members of every candidate's set (name trigrams, address trigrams or
+    name words) as flat (row, term) arrays in row order, so the incidence
+    matrix of any run of candidates is a slice and one fancy-indexed store.
+    """
+
+    def __init__(self, sets):
+        self.terms = {}
+        self.cols = np.array([self.terms.setdefault(member, len(self.terms)) for members in sets for member in members],
+                             dtype=np.int64)
+        self.counts = np.fromiter(map(len, sets), dtype=np.int64, count=len(sets))
+        self.rows = np.repeat(np.arange(len(sets)), self.counts)
+        self.starts = np.concatenate([[0], np.cumsum(self.counts)])
+
+    def lookup(self, vocab):
+        """Term id -> column of `vocab`, -1 for terms not in it."""
+        table = np.full(len(self.terms), -1, dtype=np.int64)
+        for term, col in vocab.items():
+            term_id = self.terms.get(term)
+            if term_id is not None:
+                table[term_id] = col
+        return table
+
+    def incidence(self, start, stop, lookup, width):
+        """float32 (stop - start x width) incidence matrix of candidates start..stop-1."""
+        a, b = self.starts[start], self.starts[stop]
+        cols = lookup[self.cols[a:b]]
+        rows = self.rows[a:b] - start
+        keep = cols >= 0
+        matrix = np.zeros((stop - start, width), dtype=np.float32)
+        matrix[rows[keep], cols[keep]] = 1
+        return matrix
+
+
+class BatchMatcher:
+    def __init__(self, candidates, profile='full'):
+        """candidates: dict keyed by facility name -> {'address', 'city', 'phone', ...}, as for find_match."""
+        facilities = []
+        for name, info in candidates.items():
+            facilities.append((name, prepare_hospital(
+                name, info.get('address', ''), info.get('city', ''), info.get('phone', ''))))
+        self._setup(facilities, PROFILES[profile] if isinstance(profile, str) else profile)
+
+    @classmethod
+    def from_index(cls, match_index):
+        """A matcher over the candidates of a hospital_linkage.build_match_index result."""
+        matcher = cls.__new__(cls)
+        matcher._setup(match_index['facilities'], match_index['profile'])
+        return matcher
+
+    def _setup(self, facilities, profile):
+        self.profile = profile
+        self.facility_names = [name for name, _ in facilities]
+        side = self.candidates = _Side([nat for _, nat in facilities])
+        prepared = side.prepared
+
+        # Integer codes for the fields compared for equality. Phones,
+        # addresses, streets and cities only count when present, so blanks
+        # get -1.
+        self.tables = {}
+        for field in ('name', 'address', 'city', 'phone', 'phone7', 'street'):
+            self.tables[field] = table = {}
+            for value in self._field(prepared, field):
+                if value is not None:
+                    table.setdefault(value, len(table))
+        self.codes = {field: self._field_codes(prepared, field) for field in self.tables}
+
+        self.name_postings = _Postings(side.name_grams)
+        self.address_postings = _Postings(side.address_grams)
+        self.word_postings = _Postings([p['words'] for p in prepared])
+
+        # IDF of every name trigram over the candidates, and the length of
+        # each candidate's TF-IDF vector over all its trigrams
+        postings = self.name_postings
+        df = np.bincount(postings.cols, minlength=len(postings.terms))
+        self.idf = np.log((1 + len(prepared)) / (1 + df)) + 1
+        norms = np.sqrt(np.bincount(postings.rows, weights=self.idf[postings.cols] ** 2, minlength=len(prepared)))
+        self.name_norms = np.where(norms > 0, norms, 1).astype(np.float32)
+
+    @staticmethod
+    def _field(prepared, field):
+        if field == 'phone7':
+            return [p['phone'][-7:] if len(p['phone']) >= 7 else None for p in prepared]
+        if field in ('phone', 'street', 'address', 'city'):
+            return [p[field] or None for p in prepared]
+        return [p[field] for p in prepared]
+
+    def _field_codes(self, prepared, field):
+        values = self._field(prepared, field)
+        codes = _codes(values, self.tables[field])
+        codes[[i for i, value in enumerate(values) if value is None]] = -1
+        return codes
+
+    # ── Blocks ───────────────────────────────────────────────────────────────
+
+    def _query(self, ny_hospitals):
+        """Everything about the hospital side that doesn't depend on the candidate block."""
+        side = _Side([prepare_hospital(h['name'], h.get('address', ''), h.get('city', ''), h.get('phone', ''))
+                      for h in ny_hospitals])
+        profile = self.profile
+        query = {'side': side, 'codes': {field: self._field_codes(side.prepared, field) for field in self.tables}}
+
+        name_vocab = {}
+        for grams in side.name_grams:
+            for gram in grams:
+                name_vocab.setdefault(gram, len(name_vocab))
+        query['name_vocab'] = name_vocab
+        query['name_lookup'] = self.name_postings.lookup(name_vocab)
+        query['name_grams'] = _incidence(side.name_grams, name_vocab)
+
+        # TF-IDF weighted, unit-length trigram vectors of the hospital names;
+        # a trigram no candidate has gets the highest IDF
+        unseen = math.log(1 + len(self.facility_names)) + 1
+        idf = np.full(len(name_vocab), unseen, dtype=np.float32)
+        idf[query['name_lookup'][query['name_lookup'] >= 0]] = self.idf[query['name_lookup'] >= 0]
+        weights = query['name_grams'] * idf
+        norms = np.linalg.norm(weights, axis=1, keepdims=True)
+        query['name_tfidf'] = np.divide(weights, norms, out=np.zeros_like(weights), where=norms > 0)
+        query['name_idf'] = idf
+
+        word_vocab = {}
+        for p in side.prepared:
+            for word in p['words']:
+                word_vocab.setdefault(word, len(word_vocab))
+        query['word_vocab'] = word_vocab
+        query['word_lookup'] = self.word_postings.lookup(word_vocab)
+        query['words'] = _incidence([p['words'] for p in side.prepared], word_vocab)
+        significant = [p['words'] - profile['generic_words'] for p in side.prepared]
+        query['significant'] = _incidence(significant, word_vocab)
+
+        if profile['address_partial']:
+            address_vocab = {}
+            for grams in side.address_grams:
+                for gram in grams:
+                    address_vocab.setdefault(gram, len(address_vocab))
+            query['address_vocab'] = address_vocab
+            query['address_lookup'] = self.address_postings.lookup(address_vocab)
+            query['address_grams'] = _incidence(side.address_grams, address_vocab)
+        return query
+
+    def _contains(self, query, start, stop, field, exclude):
+        """Pairs where one string is a substring of the other, apart from `exclude`."""
+        postings = self.name_postings if field == 'name' else self.address_postings
+        texts = self.candidates.names if field == 'name' else self.candidates.addresses
+        q_texts = query['side'].names if field == 'name' else query['side'].addresses
+        q_matrix = query[f"{field}_grams"]
+        c_matrix = postings.incidence(start, stop, query[f"{field}_lookup"], q_matrix.shape[1])
+
+        # A substring's trigrams are all trigrams of the longer string, so
+        # only pairs whose overlap covers one side's trigrams are checked
+        shared = q_matrix @ c_matrix.T
+        q_count = q_matrix.sum(axis=1)
+        c_count = postings.counts[start:stop]
+        possible = ((shared == q_count[:, None]) | (shared == c_count[None, :])) & ~exclude
+        # A blank string is in every other one, but blanks never match (score_match)
+        q_present = np.array([bool(t) for t in q_texts])
+        c_present = np.array([bool(t) for t in texts[start:stop]])
+        possible &= q_present[:, None] & c_present[None, :]
+
+        result = np.zeros_like(possible)
+        rows, cols = np.nonzero(possible)
+        result[rows, cols] = [a in b or b in a for a, b in
+                              zip((q_texts[i] for i in rows.tolist()), (texts[start + j] for j in cols.tolist()))]
+        return result
+
+    def _block(self, query, start, stop):
+        """(score, similarity) matrices of all hospitals against candidates start..stop-1."""
+        profile, codes = self.profile, self.codes
+        q_codes = query['codes']
+        shape = (len(query['side'].names), stop - start)
+
+        def equal(field, present=False):
+            q, c = q_codes[field][:, None], codes[field][None, start:stop]
+            return (q == c) & (q >= 0) if present else q == c
+
+        score = np.zeros(shape, dtype=np.int32)
+
+        # Phone
+        if profile['phone_exact'] or profile['phone_last7']:
+            phone = equal('phone', present=True)
+            score += phone * profile['phone_exact']
+            score += (~phone & equal('phone7', present=True)) * profile['phone_last7']
+
+        # Name: exact, then substring, then shared words
+        name_exact = equal('name')
+        name_partial = self._contains(query, start, stop, 'name', name_exact)
+        c_words = self.word_postings.incidence(start, stop, query['word_lookup'], len(query['word_vocab']))
+        common = query['words'] @ c_words.T
+        significant = query['significant'] @ c_words.T
+        two = (common if profile['generic_word_pairs'] else significant) >= 2
+        one = ~two & (significant >= 1)
+        score += np.where(name_exact, profile['name_exact'],
+                          np.where(name_partial, profile['name_partial'],
+                                   np.where(two, profile['name_words_2'],
+                                            np.where(one, profile['name_words_1'], 0)))).astype(np.int32)
+
+        # Address: exact, then same street, then substring; city; street + city
+        street = equal('street', present=True)
+        city = equal('city', present=True)
+        if profile['address_exact'] or profile['street'] or profile['address_partial']:
+            address_exact = equal('address', present=True)
+            score += address_exact * profile['address_exact']
+            score += (~address_exact & street) * profile['street']
+            if profile['address_partial']:
+                partial = self._contains(query, start, stop, 'address', address_exact | street)
+                score += partial * profile['address_partial']
+        score += city * profile['city']
+        score += (street & city) * profile['street_city']
+
+        # Name similarity (only the trigrams the hospitals have can contribute)
+        c_grams = self.name_postings.incidence(start, stop, query['name_lookup'], len(query['name_vocab']))
+        similarity = query['name_tfidf'] @ (c_grams * query['name_idf']).T / self.name_norms[None, start:stop]
+        return score, similarity
+
+    def _blocks(self, ny_hospitals):
+        query = self._query(ny_hospitals)
+        for start in range(0, len(self.facility_names), BLOCK):
+            stop = min(start + BLOCK, len(self.facility_names))
+            yield np.arange(start, stop), *self._block(query, start, stop)
+
+    # ── Results ──────────────────────────────────────────────────────────────
+
+    def scores(self, ny_hospitals):
+        """Full (hospitals x candidates) score and similarity matrices."""
+        blocks = list(self._blocks(ny_hospitals))
+        if not blocks:
+            shape = (len(ny_hospitals), 0)
+            return np.zeros(shape, dtype=np.int32), np.zeros(shape, dtype=np.float32)
+        return np.hstack([b[1] for b in blocks]), np.hstack([b[2] for b in blocks])
+
+    def best_matches(self, ny_hospitals):
+        """find_match for every hospital: (name, score), or (None, 0) below the profile's min_score."""
+        best_score = np.zeros(len(ny_hospitals), dtype=np.int32)
+        best_position = np.full(len(ny_hospitals), -1)
+        for block, score, _ in self._blocks(ny_hospitals):
+            if not len(block):
+                continue
+            # argmax takes the first of equal scores, like find_match's candidate order
+            top = score.argmax(axis=1)
+            top_score = score[np.arange(len(top)), top]
+            better = (top_score >= self.profile['min_score']) & (top_score > best_score)
+            best_score[better] = top_score[better]
+            best_position[better] = block[top[better]]
+        return [(self.facility_names[p], int(s)) if p >= 0 else (None, 0)
+                for p, s in zip(best_position, best_score)]
+
+    def top_k(self, ny_hospitals, k=5, similarity_weight=1.0):
+        """
+        The k best candidates per hospital by score + similarity_weight *
+        similarity (ties in candidate order), as (name, score, similarity).
+        """
+        n = len(ny_hospitals)
+        kept_rank = np.empty((n, 0), dtype=np.float32)
+        kept_position = np.empty((n, 0), dtype=np.int64)
+        kept_score = np.empty((n, 0), dtype=np.int32)
+        kept_similarity = np.empty((n, 0), dtype=np.float32)
+        for block, score, similarity in self._blocks(ny_hospitals):
+            rank = np.hstack([kept_rank, score + similarity_weight * similarity])
+            position = np.hstack([kept_position, np.broadcast_to(block, score.shape)])
+            scores = np.hstack([kept_score, score])
+            similarities = np.hstack([kept_similarity, similarity])
+            # Highest rank first, then lowest candidate position
+            order = np.lexsort((position, -rank), axis=1)[:, :k] if rank.shape[1] else position
+            rows = np.arange(n)[:, None]
+            kept_rank, kept_position = rank[rows, order], position[rows, order]
+            kept_score, kept_similarity = scores[rows, order], similarities[rows, order]
+        return [
+            [(self.facility_names[p], int(s), round(float(sim), 4)) for p, s, sim in zip(*row)]
+            for row in zip(kept_position, kept_score, kept_similarity)
+        ]
@@ -0,0 +1,385 @@
+"""
+NY Hospital Store
+=================
+One SQLite database (collected-data/hospitals.sqlite) holding a hospital
+dimension table and every dataset the pipeline produces, so cross-dataset
+hospital questions are index lookups instead of re-reading and fuzzy-joining
+several CSVs.
+
+  hospitals       one row per directory hospital (in_directory = 1), with its
+                  name, address, city and phone from ny_hospitals.csv and its
+                  CMS Facility ID (CCN) and NYS PFI from the crosswalk
+                  (hospital_linkage.py). Facilities that only appear in the
+                  datasets (the "NO" rows of the nys_*.py outputs, PFIs the
+                  directory doesn't link) are added with in_directory = 0.
+                  Indexed on facility_id, pfi, name and phone.
+                  hospital_id is a hash of the directory name and address
+                  (of the Facility ID or PFI for in_directory = 0 rows), so
+                  a hospital keeps its id across rebuilds. Crosswalk links
+                  below MIN_CMS_SCORE / MIN_PFI_SCORE aren't imported, and a
+                  dataset facility the crosswalk left out is attached to the
+                  directory hospital it matches confidently. county and region
+                  come from the staffing tables, unless the PFI link is only
+                  a partial name and the County/Parish of the CMS datasets
+                  (or of the hospital's city) disagrees; hospitals without
+                  staffing rows take those directly.
+
+  fact tables     hai, hcahps, hrrp, hacrp, hvbp, complications,
+                  timely_care, unplanned_visits, staffing_rn, staffing_lpn,
+                  staffing_unlicensed and pos: the pipeline's CSV outputs as
+                  they are, with column names in snake_case and a
+                  facility_id or pfi key column, indexed.
+
+  datasets        which file each table was loaded from, its size, mtime,
+                  SHA-256 and row count
+
+Several directory hospitals can share one Facility ID or PFI (campuses of one
+system), so facts are keyed by the CMS / NYS identifier, not by hospital row:
+look the hospital up, then read every table by its facility_id or pfi.
+Numbers are stored as numbers; identifiers, codes with leading zeros, dates
+and text as text; blanks (and "Not Available" and the like in numeric
+columns) as NULL. Columns are typed by the same rules as the Parquet
+outputs (columnar.column_kind).
+
+The database is rebuilt from scratch into a scratch file and swapped in, so
+readers never see a half-built store. Missing inputs are skipped.
+
+Run:
+  python hospital_store.py                      # build
+  python hospital_store.py --facility-id 330085 # profile of one hospital
+  python hospital_store.py --pfi 0001
+  python hospital_store.py --name "albany medical"
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import os
+import re
+import sqlite3
+import time
+
+from columnar import cell_value, column_kind
+from hospital_linkage import (
+    CROSSWALK_MIN_SCORE, PFI_CORROBORATED_SCORE, build_match_index, find_match, load_crosswalk, load_directory,
+)
+
+STORE_PATH = 'collected-data/hospitals.sqlite'
+
+# table -> (source CSV, source key column, key kind)
+FACT_TABLES = {
+    'hai':                 ('collected-data/nys_hai.csv', 'Facility ID', 'facility_id'),
+    'hcahps':              ('collected-data/nys_hcahps.csv', 'Facility ID', 'facility_id'),
+    'hrrp':                ('collected-data/nys_LQTP_HRRP.csv', 'Facility ID', 'facility_id'),
+    'hacrp':               ('collected-data/nys_LQTP_HACRP.csv', 'Facility ID', 'facility_id'),
+    'hvbp':                ('collected-data/nys_LQTP_HVBP.csv', 'Facility ID', 'facility_id'),
+    'complications':       ('collected-data/nys_complicationsanddeaths.csv', 'Facility ID', 'facility_id'),
+    'timely_care':         ('collected-data/nys_timelyandeffectivecare.csv', 'Facility ID', 'facility_id'),
+    'unplanned_visits':    ('collected-data/nys_unplannedhospitalvisits.csv', 'Facility ID', 'facility_id'),
+    'staffing_rn':         ('rn_shifts_all.csv', 'pfi', 'pfi'),
+    'staffing_lpn':        ('lpn_shifts_all.csv', 'pfi', 'pfi'),
+    'staffing_unlicensed': ('UNLICENSED_shifts_all.csv', 'pfi', 'pfi'),
+    # POS covers the whole country; PRVDR_NUM is the CCN, i.e. the Facility ID
+    'pos':                 ('collected-data/hospitals_filtered.csv', 'PRVDR_NUM', 'facility_id'),
+}
+
+# Crosswalk links weaker than these are left out of the hospitals table; a
+# PFI link below EXACT_PFI_SCORE (a partial name) doesn't decide the county
+MIN_CMS_SCORE = min(CROSSWALK_MIN_SCORE.values())
+MIN_PFI_SCORE = PFI_CORROBORATED_SCORE
+EXACT_PFI_SCORE = CROSSWALK_MIN_SCORE['name_only']
+
+# Columns of the fact tables besides their key that are worth an index
+INDEXED_COLUMNS = ['measure_id', 'hcahps_measure_id', 'measure_name', 'unit_name']
+
+HOSPITAL_COLUMNS = [
+    'hospital_id', 'in_directory', 'name', 'address', 'city', 'phone',
+    'facility_id', 'cms_name', 'cms_match_score', 'pfi', 'pfi_name', 'pfi_match_score',
+    'county', 'region',
+]
+
+
+def column_name(header):
+    """snake_case SQL column name: 'In 219 List' -> in_219_list, 'MORT-30-AMI Benchmark' -> mort_30_ami_benchmark."""
+    name = re.sub(r'[^0-9a-zA-Z]+', '_', header).strip('_').lower()
+    return name if name and not name[0].isdigit() else f"c_{name}"
+
+
+def _column_kind(header, values):
+    """'int', 'float' or 'text' for a column of CSV strings; SQLite has no date type."""
+    kind = column_kind(header, values)
+    return 'text' if kind == 'date' else kind
+
+
+def _converter(kind):
+    if kind == 'int':
+        return lambda v: int(float(v)) if cell_value(v) is not None else None
+    if kind == 'float':
+        return lambda v: float(v) if cell_value(v) is not None else None
+    return lambda v: v.strip() if v and v.strip() else None
+
+
+def hospital_id(*parts):
+    """Stable id of a hospital row: a short hash of what identifies it."""
+    return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+def _create_hospitals(conn):
+    conn.execute("""
+        CREATE TABLE hospitals (
+            hospital_id TEXT PRIMARY KEY,
+            in_directory INTEGER NOT NULL,
+            name TEXT, address TEXT, city TEXT, phone TEXT,
+            facility_id TEXT, cms_name TEXT, cms_match_score INTEGER,
+            pfi TEXT, pfi_name TEXT, pfi_match_score INTEGER,
+            county TEXT, region TEXT
+        )
+    """)
+    for column in ['facility_id', 'pfi', 'name', 'phone']:
+        conn.execute(f"CREATE INDEX hospitals_{column} ON hospitals ({column})")
+    conn.execute("CREATE INDEX hospitals_name_nocase ON hospitals (name COLLATE NOCASE)")
+
+
+def _directory_rows():
+    """Directory hospitals with their confident crosswalk identifiers, in directory order."""
+    crosswalk = load_crosswalk()
+    rows = []
+    for hospital in load_directory():
+        entry = dict(crosswalk.get((hospital['name'], hospital['address']), {}))
+        if not entry.get('CMS Match Score') or int(entry['CMS Match Score']) < MIN_CMS_SCORE:
+            entry.update({'Facility ID': '', 'CMS Facility Name': '', 'CMS Match Score': ''})
+        if not entry.get('PFI Match Score') or int(entry['PFI Match Score']) < MIN_PFI_SCORE:
+            entry.update({'PFI': '', 'PFI Facility Name': '', 'PFI Match Score': ''})
+        rows.append({
+            'hospital_id': hospital_id('directory', hospital['name'], hospital['address']),
+            'in_directory': 1,
+            'name': hospital['name'],
+            'address': hospital['address'],
+            'city': hospital['city'],
+            'phone': hospital['phone'],
+            'facility_id': entry.get('Facility ID') or None,
+            'cms_name': entry.get('CMS Facility Name') or None,
+            'cms_match_score': int(entry['CMS Match Score']) if entry.get('CMS Match Score') else None,
+            'pfi': entry.get('PFI') or None,
+            'pfi_name': entry.get('PFI Facility Name') or None,
+            'pfi_match_score': int(entry['PFI Match Score']) if entry.get('PFI Match Score') else None,
+        })
+    return rows
+
+
+def _load_fact_table(conn, table, path, key_column, key_kind):
+    """Load one CSV as a table with a facility_id / pfi key. Returns its rows as dicts."""
+    with open(path, 'rb') as f:
+        content = f.read()
+    reader = csv.reader(io.StringIO(content.decode('utf-8'), newline=''))
+    header = next(reader)
+    records = list(reader)
+
+    columns = []
+    for source in header:
+        name = key_kind if source == key_column else column_name(source)
+        while name in columns:
+            name += '_'
+        columns.append(name)
+    kinds = [
+        'text' if source == key_column else _column_kind(source, [r[i] if i < len(r) else '' for r in records])
+        for i, source in enumerate(header)
+    ]
+    converters = [_converter(kind) for kind in kinds]
+    sql_types = {'int': 'INTEGER', 'float': 'REAL', 'text': 'TEXT'}
+
+    conn.execute(f"CREATE TABLE {table} ({', '.join(f'{c} {sql_types[k]}' for c, k in zip(columns, kinds))})")
+    placeholders = ', '.join('?' for _ in columns)
+    conn.executemany(
+        f"INSERT INTO {table} VALUES ({placeholders})",
+        ([convert(r[i] if i < len(r) else '') for i, convert in enumerate(converters)] for r in records),
+    )
+    conn.execute(f"CREATE INDEX {table}_{key_kind} ON {table} ({key_kind})")
+    for column in INDEXED_COLUMNS:
+        if column in columns:
+            conn.execute(f"CREATE INDEX {table}_{column} ON {table} ({column})")
+
+    stat = os.stat(path)
+    conn.execute("INSERT INTO datasets VALUES (?, ?, ?, ?, ?, ?, ?)",
+                 (table, path, key_kind, len(records), stat.st_size, stat.st_mtime, hashlib.sha256(content).hexdigest()))
+    return [dict(zip(header, r)) for r in records]
+
+
+def build_store(path=STORE_PATH, fact_tables=FACT_TABLES):
+    """Build the store from the current pipeline outputs. Returns {table: rows}."""
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    scratch = f"{path}.building"
+    if os.path.exists(scratch):
+        os.remove(scratch)
+
+    conn = sqlite3.connect(scratch)
+    counts = {}
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("""
+            CREATE TABLE datasets (
+                name TEXT PRIMARY KEY, source TEXT, key TEXT, rows INTEGER, size INTEGER, mtime REAL, sha256 TEXT
+            )
+        """)
+        _create_hospitals(conn)
+
+        hospitals = _directory_rows()
+        known = {('facility_id', h['facility_id']) for h in hospitals if h['facility_id']}
+        known |= {('pfi', h['pfi']) for h in hospitals if h['pfi']}
+        places = {}  # pfi -> (county, region) from the staffing tables
+        cms_counties = {}  # facility_id -> County/Parish from the CMS tables
+        city_counties = {}  # city (upper case) -> {County/Parish} from the CMS tables
+        regions = {}  # county (upper case) -> (county, region) from the staffing tables
+
+        # Directory hospitals the crosswalk gave no Facility ID, for the
+        # dataset facilities it left out
+        unlinked = {}
+        for hospital in hospitals:
+            if not hospital['facility_id']:
+                unlinked.setdefault(hospital['name'], hospital)
+        unlinked_index = build_match_index(unlinked, 'full')
+
+        for table, (source, key_column, key_kind) in fact_tables.items():
+            if not os.path.exists(source):
+                print(f"  skipped {table}: {source} not found")
+                continue
+            rows = _load_fact_table(conn, table, source, key_column, key_kind)
+            counts[table] = len(rows)
+            if table == 'pos':
+                # National file: only linked, never adds hospitals
+                continue
+            for row in rows:
+                key = (row.get(key_column) or '').strip()
+                if key_kind == 'pfi' and key:
+                    places.setdefault(key, (row.get('county') or None, row.get('region') or None))
+                    if row.get('county') and row.get('region'):
+                        regions.setdefault(row['county'].upper(), (row['county'], row['region']))
+                elif key and row.get('County/Parish'):
+                    cms_counties.setdefault(key, row['County/Parish'])
+                    if row.get('City/Town'):
+                        city_counties.setdefault(row['City/Town'].upper(), set()).add(row['County/Parish'].upper())
+                if not key or (key_kind, key) in known:
+                    continue
+                known.add((key_kind, key))
+                if key_kind == 'facility_id':
+                    match, score = find_match({
+                        'name': row.get('Facility Name') or '', 'address': row.get('Address') or '',
+                        'city': row.get('City/Town') or '', 'phone': row.get('Telephone Number') or '',
+                    }, unlinked_index)
+                    if match and score >= CROSSWALK_MIN_SCORE['full'] and not unlinked[match]['facility_id']:
+                        unlinked[match].update(facility_id=key, cms_name=row.get('Facility Name'), cms_match_score=score)
+                        continue
+                if key_kind == 'pfi':
+                    hospitals.append({'hospital_id': hospital_id('pfi', key), 'in_directory': 0,
+                                      'name': row.get('hospital_name'), 'pfi': key})
+                else:
+                    hospitals.append({
+                        'hospital_id': hospital_id('facility_id', key),
+                        'in_directory': 0,
+                        'name': row.get('Facility Name'),
+                        'address': row.get('Address') or None,
+                        'city': row.get('City/Town') or None,
+                        'phone': row.get('Telephone Number') or None,
+                        'facility_id': key,
+                    })
+
+        for hospital in hospitals:
+            county, region = places.get(hospital.get('pfi'), (None, None))
+            # The county CMS reports for the facility, or for the city when
+            # all of its facilities are in one county
+            cities = city_counties.get((hospital.get('city') or '').upper(), set())
+            cms_county = cms_counties.get(hospital.get('facility_id')) or (min(cities) if len(cities) == 1 else None)
+            # A PFI linked on a partial name may be another site's: when its
+            # staffing county disagrees with CMS, trust CMS
+            pfi_score = hospital.get('pfi_match_score')
+            if (county and cms_county and pfi_score is not None and pfi_score < EXACT_PFI_SCORE
+                    and county.upper() != cms_county.upper()):
+                county, region = None, None
+            # Hospitals without staffing rows: the county CMS reports, spelled
+            # as in the staffing tables, and the region those give it
+            county = county or cms_county
+            if county:
+                county, known_region = regions.get(county.upper(), (county.title(), None))
+                region = region or known_region
+            hospital['county'], hospital['region'] = county, region
+        conn.executemany(
+            f"INSERT INTO hospitals VALUES ({', '.join('?' for _ in HOSPITAL_COLUMNS)})",
+            ([hospital.get(column) for column in HOSPITAL_COLUMNS] for hospital in hospitals),
+        )
+        counts['hospitals'] = len(hospitals)
+        conn.commit()
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    os.replace(scratch, path)
+    return counts
+
+
+def open_store(path=STORE_PATH):
+    """Read connection to the store; rows come back as sqlite3.Row."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found; build it with `python hospital_store.py`")
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def find_hospitals(conn, facility_id=None, pfi=None, name=None):
+    """Hospitals with this Facility ID, PFI or (case-insensitive) name fragment, directory hospitals first."""
+    if facility_id:
+        where, value = "facility_id = ?", facility_id
+    elif pfi:
+        where, value = "pfi = ?", pfi
+    elif name:
+        where, value = "name LIKE ? COLLATE NOCASE", f"%{name}%"
+    else:
+        raise ValueError("give a facility_id, pfi or name")
+    sql = f"SELECT * FROM hospitals WHERE {where} ORDER BY in_directory DESC, rowid"
+    return [dict(row) for row in conn.execute(sql, (value,))]
+
+
+def hospital_profile(conn, hospital):
+    """Every table's rows for one hospital (a row from find_hospitals): {table: [rows]}."""
+    profile = {}
+    for table, key in conn.execute("SELECT name, key FROM datasets ORDER BY rowid").fetchall():
+        value = hospital.get(key)
+        if value is None:
+            continue
+        profile[table] = [dict(row) for row in conn.execute(f"SELECT * FROM {table} WHERE {key} = ?", (value,))]
+    return profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the hospital store (collected-data/hospitals.sqlite).")
+    parser.add_argument('--store', default=STORE_PATH, help=f"database path (default {STORE_PATH})")
+    parser.add_argument('--facility-id', help="show the profile of the hospital(s) with this CMS Facility ID")
+    parser.add_argument('--pfi', help="show the profile of the hospital(s) with this NYS PFI")
+    parser.add_argument('--name', help="show the profile of hospitals whose name contains this")
+    args, _ = parser.parse_known_args()
+
+    if not (args.facility_id or args.pfi or args.name):
+        start = time.perf_counter()
+        counts = build_store(args.store)
+        for table, rows in counts.items():
+            print(f"  {table:<20} {rows:>7} rows")
+        print(f"Built {args.store} in {time.perf_counter() - start:.1f}s")
+        return
+
+    conn = open_store(args.store)
+    start = time.perf_counter()
+    hospitals = find_hospitals(conn, args.facility_id, args.pfi, args.name)
+    profiles = [(hospital, hospital_profile(conn, hospital)) for hospital in hospitals]
+    elapsed = (time.perf_counter() - start) * 1000
+    for hospital, profile in profiles:
+        print(f"{hospital['name']} (Facility ID {hospital['facility_id'] or '-'}, PFI {hospital['pfi'] or '-'}"
+              f"{'' if hospital['in_directory'] else ', not in the directory'})")
+        for table, rows in profile.items():
+            print(f"  {table:<20} {len(rows):>5} rows")
+    print(f"{len(hospitals)} hospitals, looked up in {elapsed:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
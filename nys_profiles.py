@@ -0,0 +1,66 @@
+"""
+NYS Hospital Profiles - Pipeline Entry Point
+============================================
+One command for every pipeline step:
+
+  directory   scrape the NYS hospital directory        (NYS_downloader.py)
+  staffing    RN / LPN / unlicensed staffing plans     (staffing_extractor.py)
+  metrics     skill mix, 24h totals, percentiles       (staffing_metrics.py)
+  hacrp       HAC Reduction Program measures           (nys_limited_indicators.py)
+  hvbp        Hospital Value-Based Purchasing measures (nys_national.py)
+  hcahps      HCAHPS patient survey                    (nys_survey.py)
+  pos         Provider of Services hospitals           (POS_parser.py)
+  store       hospital dimension + all datasets in SQLite (hospital_store.py)
+  profiles    one pre-joined profile per hospital      (hospital_profiles.py)
+  serve       local read-only JSON query API           (hospital_api.py)
+  refresh     rerun only the stale steps, in parallel  (nys_refresh.py)
+
+Nothing heavy is imported up front: the step's module is only loaded once the
+subcommand is known, so a job pays for pdfplumber, pandas, requests, ... only
+if its step uses them. Arguments after the subcommand go to the step as if
+its script had been run directly (e.g. --format parquet).
+
+Run:
+  python nys_profiles.py hcahps --format both
+  python nys_profiles.py staffing --offline --roles rn
+"""
+
+import argparse
+import runpy
+import sys
+
+# subcommand -> (module, help, module has its own argument parser)
+COMMANDS = {
+    'directory': ('NYS_downloader', "scrape the NYS hospital directory", False),
+    'staffing':  ('staffing_extractor', "RN, LPN and unlicensed staffing from the staffing plan PDFs", True),
+    'metrics':   ('staffing_metrics', "staffing metrics from the RN, LPN and unlicensed shift tables", True),
+    'hacrp':     ('nys_limited_indicators', "HAC Reduction Program measures for NY hospitals", False),
+    'hvbp':      ('nys_national', "Hospital Value-Based Purchasing measures for NY hospitals", False),
+    'hcahps':    ('nys_survey', "HCAHPS patient survey results for NY hospitals", False),
+    'pos':       ('POS_parser', "hospitals from the Provider of Services file", True),
+    'store':     ('hospital_store', "build or query the SQLite hospital store", True),
+    'profiles':  ('hospital_profiles', "materialize (or show) per-hospital profiles", True),
+    'serve':     ('hospital_api', "serve hospitals, profiles and measures as JSON over HTTP", True),
+    'refresh':   ('nys_refresh', "rerun the pipeline steps whose inputs or code changed", True),
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="NYS hospital profile pipeline.")
+    subparsers = parser.add_subparsers(dest='command', required=True, metavar='command')
+    for name, (module, help_text, own_parser) in COMMANDS.items():
+        # Steps with their own parser answer --help themselves
+        subparser = subparsers.add_parser(name, help=help_text, add_help=not own_parser)
+        if not own_parser:
+            subparser.add_argument('--format', choices=['csv', 'parquet', 'both'], default='csv', help="output format")
+    args, rest = parser.parse_known_args(argv)
+
+    module = COMMANDS[args.command][0]
+    if getattr(args, 'format', None):
+        rest = ['--format', args.format] + rest
+    sys.argv = [f"{module}.py"] + rest
+    runpy.run_module(module, run_name='__main__', alter_sys=True)
+
+
+if __name__ == "__main__":
+    main()
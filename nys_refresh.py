@@ -0,0 +1,384 @@
+"""
+NYS Hospital Profiles - Incremental Refresh
+===========================================
+Runs the pipeline as a dependency graph and only reruns the stages that are
+out of date. Every stage declares the files it reads and writes (STAGES);
+a stage depends on the stages that write its inputs.
+
+A stage is stale when it never ran, one of its outputs is missing or was
+changed since it ran, or the fingerprint of what it ran on changed: the
+SHA-256 of each input file, of its script and every repo module the script
+imports, and its arguments. Fingerprints are recorded in
+collected-data/refresh_state.json after each stage succeeds. File hashes are
+reused while a file's size and mtime are unchanged, so a refresh with
+nothing to do only stats files.
+
+Stages run as soon as their upstream stages are done, up to --jobs at a
+time. The directory scrape, the staffing crawl and the POS parse run side
+by side, as do the CMS joins (hacrp, hvbp, hcahps), which only need the
+directory, and the staffing metrics. The crosswalk links PFIs as well as
+Facility IDs, so it reads the staffing files and waits for the crawl: when
+the crawl runs (--remote, or its outputs are missing), the critical path is
+
+  staffing -> crosswalk -> store -> profiles
+
+and a refresh takes about as long as the crawl plus the rest of that chain.
+A stage only waits on failed upstream stages that write its required
+inputs; for optional ones it uses the file as it is. Because staleness is
+decided when a stage is about to run, a stage whose upstream reran but
+wrote identical files is skipped. Each stage's output goes to
+collected-data/refresh_logs/<stage>.log.
+
+The directory scrape and the staffing crawl read from the web, which can't
+be fingerprinted: they run when their outputs are missing or their code
+changed, or with --remote. Outputs they wrote before the first refresh are
+adopted as they are. A stage whose source file is missing (e.g. a CMS
+download not in data/) is reported as blocked and its outputs are left as
+they are.
+
+Run:
+  python nys_refresh.py                  # refresh everything that's stale
+  python nys_refresh.py --dry-run        # show what would run and why
+  python nys_refresh.py profiles         # only what profiles needs
+  python nys_refresh.py --remote --jobs 4
+  python nys_refresh.py --force crosswalk
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+STATE_PATH = 'collected-data/refresh_state.json'
+LOG_DIR = 'collected-data/refresh_logs'
+
+DIRECTORY_CSV = 'collected-data/ny_hospitals.csv'
+CROSSWALK_CSV = 'collected-data/hospital_crosswalk.csv'
+STAFFING_CSVS = ['rn_shifts_all.csv', 'lpn_shifts_all.csv', 'UNLICENSED_shifts_all.csv']
+
+# stage -> script, arguments, files read (required, and optional ones the
+# script skips when they're missing), files written, reads from the web.
+# The crosswalk reads the staffing files (it links PFIs), so the store,
+# which joins on it, also waits for the staffing crawl.
+# Listed in pipeline order, which is also the order ready stages start in.
+STAGES = {
+    'directory': {
+        'script': 'NYS_downloader.py',
+        'inputs': [],
+        'outputs': [DIRECTORY_CSV],
+        'remote': True,
+    },
+    'staffing': {
+        'script': 'staffing_extractor.py',
+        'inputs': [],
+        'outputs': STAFFING_CSVS,
+        'remote': True,
+    },
+    'pos': {
+        'script': 'POS_parser.py',
+        'inputs': ['data/Hospital_and_other.DATA.Q4_2025.csv'],
+        'outputs': ['collected-data/hospitals_filtered.csv'],
+    },
+    'crosswalk': {
+        'script': 'hospital_linkage.py',
+        'inputs': [DIRECTORY_CSV],
+        'optional': ['data/HCAHPS-Hospital.csv', 'data/hvbp_clinical_outcomes.csv',
+                     'data/FY_2025_HAC_Reduction_Program_Hospital.csv',
+                     'data/FY_2025_Hospital_Readmissions_Reduction_Program_Hospital.csv'] + STAFFING_CSVS,
+        'outputs': [CROSSWALK_CSV],
+    },
+    'hacrp': {
+        'script': 'nys_limited_indicators.py',
+        'inputs': [DIRECTORY_CSV, 'data/FY_2025_HAC_Reduction_Program_Hospital.csv'],
+        'outputs': ['collected-data/nys_LQTP_HACRP.csv'],
+    },
+    'hvbp': {
+        'script': 'nys_national.py',
+        'inputs': [DIRECTORY_CSV, 'data/FY_2025_HAC_Reduction_Program_Hospital.csv'],
+        'outputs': ['collected-data/nys_LQTP_HVBP.csv'],
+    },
+    'hcahps': {
+        'script': 'nys_survey.py',
+        'inputs': [DIRECTORY_CSV, 'data/HCAHPS-Hospital.csv'],
+        'outputs': ['collected-data/nys_hcahps.csv'],
+    },
+    'metrics': {
+        'script': 'staffing_metrics.py',
+        'inputs': STAFFING_CSVS,
+        'outputs': ['collected-data/staffing_metrics.csv', 'collected-data/staffing_region_percentiles.csv'],
+    },
+    'store': {
+        'script': 'hospital_store.py',
+        'inputs': [DIRECTORY_CSV, CROSSWALK_CSV],
+        'optional': ['collected-data/nys_hai.csv', 'collected-data/nys_hcahps.csv',
+                     'collected-data/nys_LQTP_HRRP.csv', 'collected-data/nys_LQTP_HACRP.csv',
+                     'collected-data/nys_LQTP_HVBP.csv', 'collected-data/nys_complicationsanddeaths.csv',
+                     'collected-data/nys_timelyandeffectivecare.csv',
+                     'collected-data/nys_unplannedhospitalvisits.csv',
+                     'collected-data/hospitals_filtered.csv'] + STAFFING_CSVS,
+        'outputs': ['collected-data/hospitals.sqlite'],
+    },
+    'profiles': {
+        'script': 'hospital_profiles.py',
+        'inputs': ['collected-data/hospitals.sqlite'],
+        'outputs': ['collected-data/hospital_profiles.sqlite'],
+    },
+}
+
+
+# ── Fingerprints ──────────────────────────────────────────────────────────────
+
+class FileHashes:
+    """SHA-256 of files, reused while (size, mtime) is unchanged."""
+
+    def __init__(self, known=None):
+        self.known = dict(known or {})
+
+    def __call__(self, path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        known = self.known.get(path)
+        if known and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+            return known[2]
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+        self.known[path] = [stat.st_size, stat.st_mtime_ns, h.hexdigest()]
+        return self.known[path][2]
+
+
+def code_files(script):
+    """The script and every module of the repo it imports, directly or not."""
+    found, queue = [], [script]
+    while queue:
+        path = queue.pop()
+        if path in found:
+            continue
+        found.append(path)
+        with open(path, encoding='utf-8') as f:
+            tree = ast.parse(f.read(), path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                module = name.split('.')[0] + '.py'
+                if os.path.exists(module):
+                    queue.append(module)
+    return sorted(found)
+
+
+def stage_fingerprint(stage, hashes):
+    """What the stage would run on now: {'inputs': {path: sha}, 'code': sha, 'args': [...]}."""
+    code = hashlib.sha256()
+    for path in code_files(stage['script']):
+        code.update(f"{path}:{hashes(path)}\n".encode('utf-8'))
+    return {
+        'inputs': {path: hashes(path) for path in stage['inputs'] + stage.get('optional', [])},
+        'code': code.hexdigest(),
+        'args': stage.get('args', []),
+    }
+
+
+def stale_reason(stage, fingerprint, recorded, hashes, remote=False):
+    """Why the stage has to run, or None if it's up to date."""
+    if recorded is None:
+        return "never ran"
+    missing = [path for path in stage['outputs'] if not os.path.exists(path)]
+    if missing:
+        return f"{missing[0]} missing"
+    changed = [path for path in stage['outputs'] if hashes(path) != recorded['outputs'].get(path)]
+    if changed:
+        return f"{changed[0]} changed since it ran"
+    if fingerprint['code'] != recorded['code']:
+        return "code changed"
+    if fingerprint['args'] != recorded['args']:
+        return "arguments changed"
+    changed = [path for path, sha in fingerprint['inputs'].items() if recorded['inputs'].get(path) != sha]
+    if changed:
+        return f"{changed[0]} changed"
+    if stage.get('remote') and remote:
+        return "--remote"
+    return None
+
+
+# ── Graph ─────────────────────────────────────────────────────────────────────
+
+def dependencies(stages=STAGES):
+    """{stage: set of stages that write one of its inputs}."""
+    producers = {path: name for name, stage in stages.items() for path in stage['outputs']}
+    return {
+        name: {producers[path] for path in stage['inputs'] + stage.get('optional', [])
+               if path in producers and producers[path] != name}
+        for name, stage in stages.items()
+    }
+
+
+def select(targets, deps):
+    """The targets and everything upstream of them (all stages if no targets)."""
+    if not targets:
+        return list(deps)
+    selected, queue = set(), list(targets)
+    while queue:
+        name = queue.pop()
+        if name not in selected:
+            selected.add(name)
+            queue.extend(deps[name])
+    return [name for name in deps if name in selected]
+
+
+def load_state(path=STATE_PATH):
+    if not os.path.exists(path):
+        return {'files': {}, 'stages': {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(state, path=STATE_PATH):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def run_stage(name, stage):
+    """Run one stage's script; returns (returncode, seconds)."""
+    os.makedirs(LOG_DIR, exist_ok=True)
+    start = time.perf_counter()
+    with open(os.path.join(LOG_DIR, f"{name}.log"), 'w') as log:
+        returncode = subprocess.call([sys.executable, stage['script']] + stage.get('args', []),
+                                     stdout=log, stderr=subprocess.STDOUT)
+    return returncode, time.perf_counter() - start
+
+
+def refresh(targets=(), jobs=None, force=(), remote=False, dry_run=False, stages=STAGES, state_path=STATE_PATH):
+    """
+    Bring the selected stages up to date. Returns {stage: (status, detail,
+    seconds)}; status is one of fresh, ran, failed, blocked, skipped and, with
+    dry_run, stale.
+    """
+    deps = dependencies(stages)
+    order = select(targets, deps)
+    state = load_state(state_path)
+    hashes = FileHashes(state['files'])
+    results = {}
+    pending, running = list(order), {}
+
+    def record(name, fingerprint, seconds):
+        state['stages'][name] = dict(
+            fingerprint,
+            outputs={path: hashes(path) for path in stages[name]['outputs']},
+            finished=time.time(),
+            seconds=seconds,
+        )
+
+    def decide(name):
+        stage = stages[name]
+        upstream = [d for d in deps[name] if d in results]
+        # A failed stage only holds back the ones it writes required inputs
+        # for; optional inputs are used as they are
+        failed = sorted(d for d in upstream if results[d][0] in ('failed', 'skipped')
+                        and set(stages[d]['outputs']) & set(stage['inputs']))
+        if failed:
+            return 'skipped', f"upstream stage {', '.join(failed)} failed", 0
+        fingerprint = stage_fingerprint(stage, hashes)
+        # Inputs a stale upstream stage would write (dry runs only) aren't missing
+        coming = {path for d in upstream if results[d][0] == 'stale' for path in stages[d]['outputs']}
+        missing = [path for path in stage['inputs'] if fingerprint['inputs'][path] is None and path not in coming]
+        if missing:
+            return 'blocked', f"{missing[0]} missing", 0
+        if coming:
+            return 'stale', f"after {', '.join(sorted(d for d in upstream if results[d][0] == 'stale'))}", 0
+        reason = "forced" if name in force else stale_reason(
+            stage, fingerprint, state['stages'].get(name), hashes, remote)
+        if reason is None:
+            return 'fresh', "", 0
+        if reason == "never ran" and stage.get('remote') and not remote and name not in force \
+                and all(os.path.exists(path) for path in stage['outputs']):
+            # Outputs from before the first refresh: take them as they are
+            # rather than scraping again
+            record(name, fingerprint, 0)
+            return 'fresh', "existing outputs adopted", 0
+        if dry_run:
+            return 'stale', reason, 0
+        return None, reason, fingerprint
+
+    with ThreadPoolExecutor(max_workers=jobs or len(order) or 1) as pool:
+        while pending or running:
+            ready = [name for name in pending if all(d in results for d in deps[name])]
+            if not ready and not running:
+                raise RuntimeError(f"stages wait on each other: {', '.join(pending)}")
+            for name in ready:
+                pending.remove(name)
+                status, reason, fingerprint = decide(name)
+                if status:
+                    results[name] = (status, reason, 0)
+                    continue
+                print(f"{name}: running ({reason})", flush=True)
+                running[pool.submit(run_stage, name, stages[name])] = (name, fingerprint)
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, fingerprint = running.pop(future)
+                returncode, seconds = future.result()
+                stage = stages[name]
+                missing = [path for path in stage['outputs'] if not os.path.exists(path)]
+                if returncode or missing:
+                    detail = f"exit code {returncode}" if returncode else f"did not write {missing[0]}"
+                    results[name] = ('failed', f"{detail}, see {LOG_DIR}/{name}.log", seconds)
+                else:
+                    results[name] = ('ran', "", seconds)
+                    record(name, fingerprint, seconds)
+                print(f"{name}: {results[name][0]} in {seconds:.1f}s", flush=True)
+                state['files'] = hashes.known
+                save_state(state, state_path)
+
+    if not dry_run:
+        state['files'] = hashes.known
+        save_state(state, state_path)
+    return {name: results[name] for name in order}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rerun the pipeline stages that are out of date.")
+    parser.add_argument('targets', nargs='*', metavar='stage',
+                        help=f"only refresh these stages and what they depend on ({', '.join(STAGES)})")
+    parser.add_argument('--jobs', type=int, help="stages run at the same time (default: as many as are ready)")
+    parser.add_argument('--force', nargs='+', default=[], choices=list(STAGES), metavar='stage',
+                        help="rerun these stages even if they're up to date")
+    parser.add_argument('--remote', action='store_true', help="re-scrape the directory and the staffing plans")
+    parser.add_argument('--dry-run', action='store_true', help="only show which stages would run and why")
+    args, _ = parser.parse_known_args()
+    unknown = [name for name in args.targets if name not in STAGES]
+    if unknown:
+        parser.error(f"unknown stage {unknown[0]} (choose from {', '.join(STAGES)})")
+
+    os.chdir(REPO_ROOT)
+    start = time.perf_counter()
+    results = refresh(args.targets, args.jobs, set(args.force), args.remote, args.dry_run)
+    wall = time.perf_counter() - start
+
+    print(f"\n{'stage':<10} {'status':<8} {'seconds':>8}  detail")
+    for name, (status, detail, seconds) in results.items():
+        print(f"{name:<10} {status:<8} {seconds:>8.1f}  {detail}")
+    ran = sum(seconds for _, _, seconds in results.values())
+    print(f"\nDone in {wall:.2f}s ({ran:.1f}s of stage time)")
+    if any(status == 'failed' for status, _, _ in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,19 +9,36 @@ Only keeps units: Critical Care, Medical/Surgical, Emergency Department
 Install:
   pip install pdfplumber requests beautifulsoup4 pandas
 
+PDFs are downloaded concurrently (--workers, default 8) under a global rate
+limit (--rate requests/second, default 4) and parsed in a process pool
+(--parse-workers, default all cores). Use --base-url to crawl a local
+stand-in instead of health.ny.gov.
+
+Downloads are kept in collected-data/pdf_cache and revalidated on later runs,
+so only changed plans are downloaded again; --offline reruns the parser from
+the cache alone. Parse results are memoized per PDF in
+collected-data/parse_cache.sqlite (see staffing_memo). Finished facilities
+are journaled as they complete, so an interrupted crawl can be continued with
+--resume. Each run writes a report of per-facility stage timings to
+collected-data/run_reports/ (--profile N adds cProfile dumps of the N slowest
+PDFs; see staffing_stats).
+
 Run:
   python parse_rn_day_shift.py
 """
 
-import requests
-import pdfplumber
-import pandas as pd
-import io
-import time
-from bs4 import BeautifulSoup
+import argparse
+
+from columnar import output_formats
+from staffing_pages import StaffingPdf, classify_title
+from staffing_fetch import PAGE_PATH, get_facilities
+from staffing_memo import memoized
+from staffing_output import CsvSink, finish_outputs, output_path, staffing_fieldnames, write_errors
+from staffing_pipeline import add_crawl_arguments, open_cache, open_journal, open_memo, open_report, run_crawl
+from staffing_records import UnitLayout, UnitRecord
 
 BASE_URL = "https://www.health.ny.gov"
-PAGE_URL = f"{BASE_URL}/facilities/hospital/staffing_plans/"
+PAGE_URL = f"{BASE_URL}{PAGE_PATH}"
 
 HEADERS = {"User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"}
 
@@ -33,75 +50,52 @@ SHIFT_KEYWORDS = {
     "night":   "NIGHT SHIFT UNLICENSED",
 }
 
+# Table column -> output column parse_rn_shifts reads for each shift,
+# e.g. row[2] -> day_UNLICENSED_count
+SHIFT_COLUMNS = {
+    2: "UNLICENSED_count",
+    3: "UNLICENSED_hours_per_pt",
+    # 4: "avg_patients",
+    # 5: "LPN_pts_per_nurse",
+}
 
-def get_facilities():
-    print("Fetching facility list...")
-    resp = requests.get(PAGE_URL, timeout=30, headers=HEADERS)
-    resp.raise_for_status()
-    soup = BeautifulSoup(resp.text, "html.parser")
-
-    facilities = []
-    for row in soup.select("table tr")[1:]:
-        cols = row.find_all("td")
-        if len(cols) < 4:
-            continue
-        norm_link = cols[3].find("a")
-        if norm_link:
-            facilities.append({
-                "pfi":    cols[0].text.strip(),
-                "name":   cols[1].text.strip(),
-                "county": cols[2].text.strip(),
-                "url":    BASE_URL + norm_link["href"],
-            })
-
-    print(f"Found {len(facilities)} facilities")
-    return facilities
+# Every unit record of this parser shares one slot layout
+UNIT_LAYOUT = UnitLayout(SHIFT_KEYWORDS, SHIFT_COLUMNS)
 
 
 def parse_rn_shifts(pdf_bytes):
     """
     Returns:
       hospital_info: dict
-      units: dict keyed by unit_name ->
-               { "unit_description": ...,
-                 "day_rn_count": ..., "day_rn_hours_per_pt": ..., etc.
-                 "evening_rn_count": ..., etc.
-                 "night_rn_count": ..., etc. }
+      units: dict keyed by (unit_name, unit_description) -> UnitRecord
+             holding day_/evening_/night_ values for each SHIFT_COLUMNS column
     """
     hospital_info = {}
     units = {}
 
-    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-        for page in pdf.pages:
-            text = page.extract_text() or ""
-            first_line = text.split("\n")[0].strip().upper()
+    # Titles come from a cheap pdfium pass and tables from the parse memo when
+    # this PDF was seen before; skipped pages never go through pdfplumber
+    with StaffingPdf(pdf_bytes) as doc:
+        for i, title in enumerate(doc.titles):
+            kind, shift = classify_title(title, SHIFT_KEYWORDS)
+            if kind is None:
+                continue
+
+            table = doc.table(i)
 
             # Hospital info (page 1)
-            if "HOSPITAL INFORMATION" in first_line:
-                tables = page.extract_tables()
-                if tables:
-                    for row in tables[0][1:]:
+            if kind == "info":
+                if table:
+                    for row in table[1:]:
                         if row and len(row) >= 2 and row[0]:
                             key = row[0].strip().lower().replace(" ", "_")
                             hospital_info[key] = (row[1] or "").strip()
                 continue
 
-            # Detect which shift this page is
-            shift = None
-            for shift_name, keyword in SHIFT_KEYWORDS.items():
-                if keyword in first_line:
-                    shift = shift_name
-                    break
-            if shift is None:
+            if not table:
                 continue
 
-            tables = page.extract_tables()
-            if not tables:
-                continue
-
-            prefix = f"{shift}_"
-
-            for row in tables[0][2:]:  # skip title row and header row
+            for row in table[2:]:  # skip title row and header row
                 if not row or not row[0] or not str(row[0]).strip():
                     continue
                 unit_name = str(row[0]).strip()
@@ -114,53 +108,45 @@ def parse_rn_shifts(pdf_bytes):
                 key = (unit_name, unit_desc)
 
                 if key not in units:
-                    units[key] = {
-                        "unit_name":        unit_name,
-                        "unit_description": unit_desc,
-                    }
+                    units[key] = UnitRecord(UNIT_LAYOUT, unit_name, unit_desc)
 
-                u = units[key]
-                u[f"{prefix}UNLICENSED_count"]        = str(row[2]).strip() if len(row) > 2 and row[2] else ""
-                u[f"{prefix}UNLICENSED_hours_per_pt"] = str(row[3]).strip() if len(row) > 3 and row[3] else ""
-                # u[f"{prefix}avg_patients"]     = str(row[4]).strip() if len(row) > 4 and row[4] else ""
-                # u[f"{prefix}LPN_pts_per_nurse"] = str(row[5]).strip() if len(row) > 5 and row[5] else ""
+                # Cells are parsed to numbers once, here
+                units[key].set_shift(shift, row)
 
     return hospital_info, units
 
 
 def main():
-    facilities = get_facilities()
-    all_rows = []
-    errors = []
-
-    for i, f in enumerate(facilities):
-        print(f"[{i+1}/{len(facilities)}] {f['pfi']} - {f['name']}")
-        try:
-            resp = requests.get(f["url"], timeout=60, headers=HEADERS)
-            resp.raise_for_status()
-            hospital_info, units = parse_rn_shifts(resp.content)
-
-            for unit in units.values():
-                all_rows.append({
-                    "pfi":           f["pfi"],
-                    "hospital_name": f["name"],
-                    "county":        f["county"],
-                    "region":        hospital_info.get("region", ""),
-                    **unit,
-                })
-
-        except Exception as e:
-            print(f"  ERROR: {e}")
-            errors.append({"pfi": f["pfi"], "name": f["name"], "error": str(e)})
-
-        time.sleep(0.75)
-
-    df = pd.DataFrame(all_rows)
-    df.to_csv("UNLICENSED_shifts_all.csv", index=False)
-    print(f"\nDone! {len(all_rows)} rows saved to UNLICENSED_shifts_all.csv")
+    parser = argparse.ArgumentParser(description="Scrape staffing data from the NYS hospital staffing plan PDFs.")
+    add_crawl_arguments(parser, BASE_URL)
+    args, _ = parser.parse_known_args()
+
+    cache = open_cache(args)
+    memo = open_memo(args)
+    # Memoized per PDF; the fingerprint changes with the parser's code and config
+    parse = memoized(parse_rn_shifts, KEEP_UNITS, SHIFT_KEYWORDS)
+
+    journal = open_journal(args, "UNLICENSED_shifts_all")
+    report = open_report(args, "UNLICENSED_shifts_all")
+    facilities = get_facilities(args.base_url, HEADERS, cache, args.offline)
+
+    # Rows are written as facilities finish, in facility order
+    formats = output_formats()
+    path = output_path("UNLICENSED_shifts_all.csv", formats)
+    sink = CsvSink(path, staffing_fieldnames(UNIT_LAYOUT))
+    count, errors = run_crawl(facilities, parse, workers=args.workers, rate=args.rate,
+                              parse_workers=args.parse_workers, headers=HEADERS,
+                              cache=cache, offline=args.offline, memo=memo, journal=journal, sink=sink,
+                              report=report)
+    journal.close()
+    print(f"Run report saved to {report.write()}")
+
+    if "csv" in formats:
+        print(f"\nDone! {count} rows saved to UNLICENSED_shifts_all.csv")
+    finish_outputs(path, "UNLICENSED_shifts_all.csv", "UNLICENSED_shifts_all", formats)
 
     if errors:
-        pd.DataFrame(errors).to_csv("UNLICENSED_shifts_errors.csv", index=False)
+        write_errors(errors, "UNLICENSED_shifts_errors.csv")
         print(f"{len(errors)} errors saved to UNLICENSED_shifts_errors.csv")
 
 
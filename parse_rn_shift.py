@@ -13,12 +13,8 @@ Run:
   python parse_rn_day_shift.py
 """
 
-import requests
-import pdfplumber
-import pandas as pd
-import io
-import time
-from bs4 import BeautifulSoup
+from staffing_pages import StaffingPdf, classify_title
+from staffing_records import UnitLayout, UnitRecord
 
 BASE_URL = "https://www.health.ny.gov"
 PAGE_URL = f"{BASE_URL}/facilities/hospital/staffing_plans/"
@@ -33,8 +29,23 @@ SHIFT_KEYWORDS = {
     "night":   "RN NIGHT SHIFT",
 }
 
+# Table column -> output column parse_rn_shifts reads for each shift,
+# e.g. row[2] -> day_rn_count
+SHIFT_COLUMNS = {
+    2: "rn_count",
+    3: "rn_hours_per_pt",
+    4: "avg_patients",
+    5: "rn_pts_per_nurse",
+}
+
+# Every unit record of this parser shares one slot layout
+UNIT_LAYOUT = UnitLayout(SHIFT_KEYWORDS, SHIFT_COLUMNS)
+
 
 def get_facilities():
+    import requests
+    from bs4 import BeautifulSoup
+
     print("Fetching facility list...")
     resp = requests.get(PAGE_URL, timeout=30, headers=HEADERS)
     resp.raise_for_status()
@@ -62,46 +73,35 @@ def parse_rn_shifts(pdf_bytes):
     """
     Returns:
       hospital_info: dict
-      units: dict keyed by unit_name ->
-               { "unit_description": ...,
-                 "day_rn_count": ..., "day_rn_hours_per_pt": ..., etc.
-                 "evening_rn_count": ..., etc.
-                 "night_rn_count": ..., etc. }
+      units: dict keyed by (unit_name, unit_description) -> UnitRecord
+             holding day_/evening_/night_ values for each SHIFT_COLUMNS column
     """
     hospital_info = {}
     units = {}
 
-    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-        for page in pdf.pages:
-            text = page.extract_text() or ""
-            first_line = text.split("\n")[0].strip().upper()
+    # Titles come from a cheap pdfium pass and tables from the parse memo when
+    # this PDF was seen before; skipped pages never go through pdfplumber
+    with StaffingPdf(pdf_bytes) as doc:
+        for i, title in enumerate(doc.titles):
+            kind, shift = classify_title(title, SHIFT_KEYWORDS)
+            if kind is None:
+                continue
+
+            table = doc.table(i)
 
             # Hospital info (page 1)
-            if "HOSPITAL INFORMATION" in first_line:
-                tables = page.extract_tables()
-                if tables:
-                    for row in tables[0][1:]:
+            if kind == "info":
+                if table:
+                    for row in table[1:]:
                         if row and len(row) >= 2 and row[0]:
                             key = row[0].strip().lower().replace(" ", "_")
                             hospital_info[key] = (row[1] or "").strip()
                 continue
 
-            # Detect which shift this page is
-            shift = None
-            for shift_name, keyword in SHIFT_KEYWORDS.items():
-                if keyword in first_line:
-                    shift = shift_name
-                    break
-            if shift is None:
-                continue
-
-            tables = page.extract_tables()
-            if not tables:
+            if not table:
                 continue
 
-            prefix = f"{shift}_"
-
-            for row in tables[0][2:]:  # skip title row and header row
+            for row in table[2:]:  # skip title row and header row
                 if not row or not row[0] or not str(row[0]).strip():
                     continue
                 unit_name = str(row[0]).strip()
@@ -114,21 +114,18 @@ def parse_rn_shifts(pdf_bytes):
                 key = (unit_name, unit_desc)
 
                 if key not in units:
-                    units[key] = {
-                        "unit_name":        unit_name,
-                        "unit_description": unit_desc,
-                    }
+                    units[key] = UnitRecord(UNIT_LAYOUT, unit_name, unit_desc)
 
-                u = units[key]
-                u[f"{prefix}rn_count"]        = str(row[2]).strip() if len(row) > 2 and row[2] else ""
-                u[f"{prefix}rn_hours_per_pt"] = str(row[3]).strip() if len(row) > 3 and row[3] else ""
-                u[f"{prefix}avg_patients"]     = str(row[4]).strip() if len(row) > 4 and row[4] else ""
-                u[f"{prefix}rn_pts_per_nurse"] = str(row[5]).strip() if len(row) > 5 and row[5] else ""
+                # Cells are parsed to numbers once, here
+                units[key].set_shift(shift, row)
 
     return hospital_info, units
 
 
 def main():
+    import pandas as pd
+    import requests
+
     # ── Test on a single PDF ──────────────────────────────────────────────────
     test_url = "https://www.health.ny.gov/facilities/hospital/staffing_plans/docs/0001.pdf"
     print(f"Testing on: {test_url}")
@@ -144,7 +141,7 @@ def main():
             "hospital_name": hospital_info.get("reporting_organization", ""),
             "county":        hospital_info.get("county", ""),
             "region":        hospital_info.get("region", ""),
-            **unit,
+            **unit.to_row(),
         })
 
     df = pd.DataFrame(rows)
@@ -0,0 +1,141 @@
+"""
+Local Cache for Staffing Plan Downloads
+=======================================
+Keeps every downloaded staffing-plan PDF (and the facility index page) on
+disk so reruns don't download them again.
+
+  collected-data/pdf_cache/objects/<sha256[:2]>/<sha256>   file contents
+  collected-data/pdf_cache/index.json                      URL -> entry
+
+Contents are stored under their SHA-256, so a plan that didn't change between
+two URLs or two refreshes is stored once. Each index entry keeps the URL's
+content hash plus the ETag and Last-Modified the server sent, which are
+replayed as If-None-Match / If-Modified-Since so routine refreshes only
+download the plans that changed (the server answers 304 for the rest).
+
+In offline mode nothing is requested at all: everything is served from the
+cache, and URLs that were never cached fail like a download error would.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+from staffing_stats import count
+
+PDF_CACHE = 'collected-data/pdf_cache'
+
+
+class PdfCache:
+    """URL -> content cache on disk. Safe to share between fetch threads."""
+
+    def __init__(self, root=PDF_CACHE):
+        self.root = root
+        self.index_path = os.path.join(root, 'index.json')
+        self.lock = threading.Lock()
+        os.makedirs(os.path.join(root, 'objects'), exist_ok=True)
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding='utf-8') as f:
+                self.index = json.load(f)
+        else:
+            self.index = {}
+
+    def _object_path(self, sha256):
+        return os.path.join(self.root, 'objects', sha256[:2], sha256)
+
+    def lookup(self, url):
+        """Index entry for url, or None when it isn't cached (or its file is gone)."""
+        with self.lock:
+            entry = self.index.get(url)
+        if entry and os.path.exists(self._object_path(entry['sha256'])):
+            return entry
+        return None
+
+    def read(self, entry):
+        """Cached contents of an entry. Raises ValueError if the file was corrupted."""
+        with open(self._object_path(entry['sha256']), 'rb') as f:
+            content = f.read()
+        if hashlib.sha256(content).hexdigest() != entry['sha256']:
+            raise ValueError(f"cached copy of {entry['url']} is corrupt")
+        return content
+
+    def conditional_headers(self, entry):
+        """If-None-Match / If-Modified-Since headers for revalidating an entry."""
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, url, content, response_headers=None):
+        """Save content for url and record the validators the server sent."""
+        response_headers = response_headers or {}
+        sha256 = hashlib.sha256(content).hexdigest()
+        path = self._object_path(sha256)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(content)
+            os.replace(tmp, path)
+
+        entry = {
+            'url': url,
+            'sha256': sha256,
+            'size': len(content),
+            'etag': response_headers.get('ETag'),
+            'last_modified': response_headers.get('Last-Modified'),
+            'fetched': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        }
+        with self.lock:
+            self.index[url] = entry
+            self._save_index()
+        return entry
+
+    def _save_index(self):
+        # Written after every store so a killed crawl keeps what it downloaded
+        tmp = f"{self.index_path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.index_path)
+
+
+def cached_get(session, url, cache=None, offline=False, timeout=60, before_request=None):
+    """
+    GET url through the cache: revalidate a cached copy with a conditional
+    request (304 -> cached bytes), store fresh downloads, and in offline mode
+    only ever read from the cache. Returns the response body as bytes.
+
+    before_request: called right before a request goes out (e.g. to take a
+    rate-limit token); never called for offline cache hits.
+    """
+    entry = cache.lookup(url) if cache else None
+    if offline:
+        if entry is None:
+            raise FileNotFoundError(f"{url} is not in the cache (offline mode)")
+        count("cache_reads")
+        return cache.read(entry)
+
+    if before_request:
+        before_request()
+    headers = cache.conditional_headers(entry) if cache else {}
+    count("requests")
+    resp = session.get(url, timeout=timeout, headers=headers)
+    if resp.status_code == 304 and entry is not None:
+        try:
+            count("not_modified")
+            return cache.read(entry)
+        except ValueError:
+            # Corrupt copy: fetch it again without validators
+            if before_request:
+                before_request()
+            count("requests")
+            resp = session.get(url, timeout=timeout)
+    resp.raise_for_status()
+    count("bytes_downloaded", len(resp.content))
+    if cache:
+        cache.store(url, resp.content, resp.headers)
+    return resp.content
@@ -0,0 +1,205 @@
+"""
+NY Hospital Staffing Plans - RN, LPN & Unlicensed Shifts in One Pass
+====================================================================
+Downloads and parses each facility's normalized staffing-plan PDF once and
+writes the per-role tables that used to take one full crawl per role:
+
+  rn_shifts_all.csv          (RN DAY SHIFT / RN EVENING SHIFT / RN NIGHT SHIFT)
+  lpn_shifts_all.csv         (DAY SHIFT LPN / ...)
+  UNLICENSED_shifts_all.csv  (DAY SHIFT UNLICENSED / ...)
+
+Each role is described once in ROLES: the title keyword of its page for each
+shift, and which table column goes to which output column. Every page title is
+checked against all roles, so one PDF read fills all three tables. Output rows
+and columns are the same as the single-role scripts produce.
+
+Only keeps units: Critical Care, Medical/Surgical, Emergency Department
+
+Install:
+  pip install pdfplumber requests beautifulsoup4 pandas
+
+Run:
+  python staffing_extractor.py
+  python staffing_extractor.py --roles rn lpn --format both
+  python staffing_extractor.py --resume     # continue an interrupted crawl
+"""
+
+import argparse
+from functools import partial
+
+from columnar import output_formats
+from official_parser import BASE_URL, HEADERS, KEEP_UNITS
+from staffing_pages import StaffingPdf
+from staffing_fetch import get_facilities
+from staffing_memo import memoized
+from staffing_output import CsvSink, RoleSinks, finish_outputs, output_path, staffing_fieldnames, write_errors
+from staffing_pipeline import add_crawl_arguments, open_cache, open_journal, open_memo, open_report, run_crawl
+from staffing_records import UnitLayout, UnitRecord
+
+# role -> output file, page title keyword per shift, and table column index ->
+# output column (prefixed with the shift, e.g. day_rn_count)
+ROLES = {
+    "rn": {
+        "output": "rn_shifts_all.csv",
+        "keywords": {
+            "day":     "RN DAY SHIFT",
+            "evening": "RN EVENING SHIFT",
+            "night":   "RN NIGHT SHIFT",
+        },
+        "columns": {
+            2: "rn_count",
+            3: "rn_hours_per_pt",
+            4: "avg_patients",
+            5: "rn_pts_per_nurse",
+        },
+    },
+    "lpn": {
+        "output": "lpn_shifts_all.csv",
+        "keywords": {
+            "day":     "DAY SHIFT LPN",
+            "evening": "EVENING SHIFT LPN",
+            "night":   "NIGHT SHIFT LPN",
+        },
+        "columns": {
+            2: "LPN_count",
+            3: "LPN_hours_per_pt",
+        },
+    },
+    "UNLICENSED": {
+        "output": "UNLICENSED_shifts_all.csv",
+        "keywords": {
+            "day":     "DAY SHIFT UNLICENSED",
+            "evening": "EVENING SHIFT UNLICENSED",
+            "night":   "NIGHT SHIFT UNLICENSED",
+        },
+        "columns": {
+            2: "UNLICENSED_count",
+            3: "UNLICENSED_hours_per_pt",
+        },
+    },
+}
+
+ERRORS_CSV = "staffing_errors.csv"
+
+
+def page_roles(first_line, roles=ROLES):
+    """(role, shift) for every role whose shift keyword is in the page title."""
+    matches = []
+    for role, spec in roles.items():
+        for shift_name, keyword in spec["keywords"].items():
+            if keyword in first_line:
+                matches.append((role, shift_name))
+                break
+    return matches
+
+
+def parse_staffing(pdf_bytes, roles=ROLES):
+    """
+    Returns:
+      hospital_info: dict
+      units_by_role: {role: {(unit_name, unit_description): UnitRecord}}
+    """
+    hospital_info = {}
+    units_by_role = {role: {} for role in roles}
+    layouts = {role: UnitLayout(spec["keywords"], spec["columns"]) for role, spec in roles.items()}
+
+    with StaffingPdf(pdf_bytes) as doc:
+        for i, first_line in enumerate(doc.titles):
+            # Hospital info (page 1)
+            if "HOSPITAL INFORMATION" in first_line:
+                table = doc.table(i)
+                if table:
+                    for row in table[1:]:
+                        if row and len(row) >= 2 and row[0]:
+                            key = row[0].strip().lower().replace(" ", "_")
+                            hospital_info[key] = (row[1] or "").strip()
+                continue
+
+            matches = page_roles(first_line, roles)
+            if not matches:
+                continue
+
+            table = doc.table(i)
+            if not table:
+                continue
+
+            for role, shift in matches:
+                units = units_by_role[role]
+
+                for row in table[2:]:  # skip title row and header row
+                    if not row or not row[0] or not str(row[0]).strip():
+                        continue
+                    unit_name = str(row[0]).strip()
+
+                    # Filter to only the units we care about
+                    if unit_name.lower() not in KEEP_UNITS:
+                        continue
+
+                    unit_desc = str(row[1]).strip() if row[1] else ""
+                    key = (unit_name, unit_desc)
+
+                    if key not in units:
+                        units[key] = UnitRecord(layouts[role], unit_name, unit_desc)
+
+                    # Cells are parsed to numbers once, here
+                    units[key].set_shift(shift, row)
+
+    return hospital_info, units_by_role
+
+
+def role_rows(parse, facility, pdf_bytes):
+    """Output rows for every role, each tagged with its role. Runs in a pool worker."""
+    hospital_info, units_by_role = parse(pdf_bytes)
+    return [{
+        "role":          role,
+        "pfi":           facility["pfi"],
+        "hospital_name": facility["name"],
+        "county":        facility["county"],
+        "region":        hospital_info.get("region", ""),
+        **unit.to_row(),
+    } for role, units in units_by_role.items() for unit in units.values()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract RN, LPN and unlicensed staffing from the NYS staffing plan PDFs in one pass.")
+    parser.add_argument("--roles", nargs="+", choices=list(ROLES), default=list(ROLES), help="roles to extract (default all)")
+    add_crawl_arguments(parser, BASE_URL)
+    args, _ = parser.parse_known_args()
+
+    # Only the requested roles are matched and parsed; memoized per PDF, with
+    # the selected roles and KEEP_UNITS as part of the fingerprint
+    memo = open_memo(args)
+    parse = memoized(partial(parse_staffing, roles={role: ROLES[role] for role in args.roles}), KEEP_UNITS)
+
+    cache = open_cache(args)
+    journal = open_journal(args, "staffing_extractor")
+    report = open_report(args, "staffing_extractor")
+    facilities = get_facilities(args.base_url, HEADERS, cache, args.offline)
+
+    # One streaming CSV per role, written as facilities finish
+    formats = output_formats()
+    paths = {role: output_path(ROLES[role]["output"], formats) for role in args.roles}
+    sink = RoleSinks({
+        role: CsvSink(paths[role], staffing_fieldnames(UnitLayout(ROLES[role]["keywords"], ROLES[role]["columns"])))
+        for role in args.roles
+    })
+    counts, errors = run_crawl(facilities, parse, workers=args.workers, rate=args.rate,
+                               parse_workers=args.parse_workers, headers=HEADERS, rows=role_rows,
+                               cache=cache, offline=args.offline, memo=memo, journal=journal, sink=sink,
+                               report=report)
+    journal.close()
+    print(f"Run report saved to {report.write()}")
+
+    for role in args.roles:
+        output = ROLES[role]["output"]
+        if "csv" in formats:
+            print(f"{counts[role]} {role} rows saved to {output}")
+        finish_outputs(paths[role], output, output[:-len(".csv")], formats)
+
+    if errors:
+        write_errors(errors, ERRORS_CSV)
+        print(f"{len(errors)} errors saved to {ERRORS_CSV}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Concurrent PDF Fetcher for the Staffing Plan Scrapers
+=====================================================
+Downloads facility staffing-plan PDFs with a bounded number of worker threads
+sharing one pooled requests.Session. Instead of sleeping a fixed time after
+every facility, all workers draw from a single token bucket, which caps the
+overall request rate while letting requests overlap.
+
+PDFs are yielded as they arrive, so parsing can start before the crawl ends.
+
+Every URL comes from the facility list, so pointing the scrapers at a local
+stand-in (e.g. `python -m http.server` over a folder of fixture PDFs plus an
+index page) only needs a different base URL.
+
+With a PdfCache (staffing_cache), the index page and PDFs are revalidated
+with conditional requests instead of downloaded again, and offline mode
+serves everything from the cache without touching the network.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from staffing_cache import cached_get
+from staffing_stats import count, recording, stage
+
+PAGE_PATH = "/facilities/hospital/staffing_plans/"
+
+DEFAULT_WORKERS = 8
+DEFAULT_RATE = 4.0    # requests per second across all workers
+DEFAULT_BURST = 4     # requests allowed back to back after an idle period
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `burst` saved."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def make_session(pool_size=DEFAULT_WORKERS, headers=None, retries=2):
+    """One session (and connection pool) shared by all fetch workers."""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if headers:
+        session.headers.update(headers)
+    return session
+
+
+def get_facilities(base_url, headers=None, cache=None, offline=False):
+    """Facility rows (pfi, name, county, url) from the staffing plans index page."""
+    from bs4 import BeautifulSoup
+
+    print("Fetching facility list...")
+    with make_session(1, headers) as session:
+        html = cached_get(session, f"{base_url}{PAGE_PATH}", cache, offline, timeout=30)
+    soup = BeautifulSoup(html, "html.parser")
+
+    facilities = []
+    for row in soup.select("table tr")[1:]:
+        cols = row.find_all("td")
+        if len(cols) < 4:
+            continue
+        norm_link = cols[3].find("a")
+        if norm_link:
+            facilities.append({
+                "pfi":    cols[0].text.strip(),
+                "name":   cols[1].text.strip(),
+                "county": cols[2].text.strip(),
+                "url":    base_url + norm_link["href"],
+            })
+
+    print(f"Found {len(facilities)} facilities")
+    return facilities
+
+
+def fetch_pdfs(facilities, session=None, workers=DEFAULT_WORKERS, rate=DEFAULT_RATE,
+               burst=DEFAULT_BURST, timeout=60, headers=None, cache=None, offline=False, report=None):
+    """
+    Download every facility's PDF concurrently.
+
+    Yields (index, facility, pdf_bytes, error) in completion order, where index
+    is the facility's position in `facilities`; error is None on success and
+    pdf_bytes is None on failure.
+
+    cache: a staffing_cache.PdfCache; cached PDFs are revalidated (or, when
+    offline, read) instead of downloaded.
+    report: a staffing_stats.RunReport that gets each download's timings.
+    """
+    own_session = session is None
+    if own_session:
+        session = make_session(workers, headers)
+    bucket = TokenBucket(rate, burst)
+
+    def wait():
+        with stage("wait"):
+            bucket.acquire()
+
+    def fetch(f):
+        with recording(report.facility(f) if report else None), stage("fetch"):
+            pdf_bytes = cached_get(session, f["url"], cache, offline, timeout, before_request=wait)
+            count("bytes", len(pdf_bytes))
+            return pdf_bytes
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(fetch, f): i for i, f in enumerate(facilities)}
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    yield i, facilities[i], future.result(), None
+                except Exception as e:
+                    yield i, facilities[i], None, e
+    finally:
+        if own_session:
+            session.close()
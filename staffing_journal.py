@@ -0,0 +1,77 @@
+"""
+Crawl Journal for the Staffing Plan Scrapers
+============================================
+Appends every facility's outcome to a JSONL file as soon as it is known, so a
+crawl that crashes or is killed halfway doesn't lose what it already did:
+
+  {"pfi": "0001", "url": "...", "rows": [...], "error": null}
+  {"pfi": "0002", "url": "...", "rows": null, "error": "404 Client Error: ..."}
+
+Each line is flushed and synced to disk before the next facility is handled.
+With --resume, facilities whose latest line holds rows are skipped and their
+rows are taken from the journal; facilities that failed are tried again.
+Without --resume the journal starts over.
+
+Journals live in collected-data/journals/, one per scraper.
+"""
+
+import json
+import os
+import threading
+
+JOURNAL_DIR = 'collected-data/journals'
+
+
+def facility_key(facility):
+    return f"{facility['pfi']}|{facility['url']}"
+
+
+class CrawlJournal:
+    """Append-only JSONL record of finished facilities. Safe to share between threads."""
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        if resume and os.path.exists(path):
+            with open(path, 'r+b') as f:
+                content = f.read()
+                # A crash can leave the last line cut short: drop it, so new
+                # lines aren't appended onto it; that facility is redone
+                complete = content.rfind(b'\n') + 1
+                if complete < len(content):
+                    f.truncate(complete)
+            for line in content[:complete].splitlines():
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Damaged by an older crash; that facility is redone too
+                    continue
+                self.entries[f"{entry['pfi']}|{entry['url']}"] = entry
+        self.file = open(path, 'a' if resume else 'w', encoding='utf-8')
+
+    def completed(self, facility):
+        """Journaled rows of a facility that finished without error, or None."""
+        entry = self.entries.get(facility_key(facility))
+        if entry is None or entry['error'] is not None:
+            return None
+        return entry['rows']
+
+    def record(self, facility, rows=None, error=None):
+        entry = {
+            'pfi': facility['pfi'],
+            'url': facility['url'],
+            'rows': rows,
+            'error': None if error is None else str(error),
+        }
+        line = json.dumps(entry, ensure_ascii=False)
+        with self.lock:
+            self.file.write(line + '\n')
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.entries[facility_key(facility)] = entry
+
+    def close(self):
+        self.file.close()
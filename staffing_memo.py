@@ -0,0 +1,177 @@
+"""
+Parse Memo for the Staffing Plan Parsers
+========================================
+Remembers parse work per PDF content hash in collected-data/parse_cache.sqlite,
+so reruns over unchanged PDFs skip pdfplumber entirely.
+
+Three kinds of entries are kept, from cheapest to rebuild to most expensive:
+
+  result  the parser's full output (hospital_info, units), keyed by the PDF
+          hash and a parser fingerprint: a hash of the parse function's source
+          plus its configuration (KEEP_UNITS, SHIFT_KEYWORDS, roles, ...)
+  titles  the title line of every page, keyed by the PDF hash
+  table   the first table of one page, keyed by the PDF hash and page number
+
+titles and table entries don't depend on any parser configuration, only on
+the extraction code in staffing_pages (whose source is part of their key). So
+changing KEEP_UNITS or SHIFT_KEYWORDS only invalidates the result entries of
+the parser that changed; they are rebuilt from the cached titles and tables,
+and pdfplumber only runs for pages whose tables were never extracted before
+(e.g. the pages of a newly added keyword).
+
+The store is bounded (--parse-cache-mb, default 256): when it grows past the
+limit, the least recently used entries are evicted first.
+
+Pool workers open their own connection; configure() sets the store up in each
+process (run_crawl passes it as the pool initializer).
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import sqlite3
+import time
+from functools import partial
+
+from staffing_stats import count, stage
+
+PARSE_CACHE = 'collected-data/parse_cache.sqlite'
+DEFAULT_MAX_MB = 256
+
+_settings = {'path': None, 'max_bytes': DEFAULT_MAX_MB * 1024 * 1024}
+_memo = {'pid': None, 'store': None}
+
+
+class ParseMemo:
+    """Size-bounded LRU store of pickled parse artifacts."""
+
+    def __init__(self, path=PARSE_CACHE, max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Several parser processes write concurrently; WAL + a busy timeout
+        # lets them take turns instead of failing
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                kind TEXT,
+                key TEXT,
+                value BLOB,
+                size INTEGER,
+                used REAL,
+                PRIMARY KEY (kind, key)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS entries_used ON entries (used)")
+        self.conn.commit()
+
+    def get(self, kind, key):
+        """Stored value, or None. A hit marks the entry as recently used."""
+        with stage("memo"):
+            row = self.conn.execute("SELECT value FROM entries WHERE kind = ? AND key = ?", (kind, key)).fetchone()
+            if row is None:
+                return None
+            with self.conn:
+                self.conn.execute("UPDATE entries SET used = ? WHERE kind = ? AND key = ?", (time.time(), kind, key))
+            return pickle.loads(row[0])
+
+    def put(self, kind, key, value):
+        with stage("memo"):
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO entries (kind, key, value, size, used) VALUES (?, ?, ?, ?, ?)",
+                    (kind, key, blob, len(blob), time.time()),
+                )
+                self._evict()
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used entries until the store fits again
+        for kind, key, size in self.conn.execute("SELECT kind, key, size FROM entries ORDER BY used").fetchall():
+            self.conn.execute("DELETE FROM entries WHERE kind = ? AND key = ?", (kind, key))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def close(self):
+        self.conn.close()
+
+
+def configure(path=PARSE_CACHE, max_mb=DEFAULT_MAX_MB):
+    """Use the store at path in this process (None turns memoization off)."""
+    _settings['path'] = path
+    _settings['max_bytes'] = int(max_mb * 1024 * 1024)
+    _memo['pid'] = None
+    _memo['store'] = None
+
+
+def current_memo():
+    """This process's ParseMemo, or None when memoization is off."""
+    if _settings['path'] is None:
+        return None
+    # A connection must not cross a fork, so each process opens its own
+    if _memo['pid'] != os.getpid():
+        _memo['store'] = ParseMemo(_settings['path'], _settings['max_bytes'])
+        _memo['pid'] = os.getpid()
+    return _memo['store']
+
+
+def source_hash(*functions):
+    """Short hash of the functions' source code, used as a code version."""
+    digest = hashlib.sha256()
+    for function in functions:
+        digest.update(inspect.getsource(function).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def _config_default(value):
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"can't fingerprint {type(value).__name__}")
+
+
+def parser_fingerprint(parse, *config):
+    """Version key for a parse function: its source plus the configuration it reads."""
+    keywords = {}
+    while isinstance(parse, partial):
+        keywords.update(parse.keywords)
+        parse = parse.func
+    payload = json.dumps([parse.__qualname__, source_hash(parse), config, keywords],
+                         sort_keys=True, default=_config_default)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def memo_parse(parse, fingerprint, pdf_bytes):
+    """
+    parse(pdf_bytes), served from the memo when this PDF was already parsed
+    with the same fingerprint. Bind it with
+    partial(memo_parse, parse, parser_fingerprint(parse, ...)) so it can be
+    sent to pool workers.
+    """
+    memo = current_memo()
+    if memo is None:
+        return parse(pdf_bytes)
+    key = f"{hashlib.sha256(pdf_bytes).hexdigest()}:{fingerprint}"
+    result = memo.get('result', key)
+    if result is None:
+        result = parse(pdf_bytes)
+        memo.put('result', key, result)
+    else:
+        count('results_memoized')
+    return result
+
+
+def memoized(parse, *config):
+    """parse wrapped with memo_parse, fingerprinted with the configuration it reads."""
+    # Results also depend on the shared page extraction code and on the
+    # record classes they are pickled as
+    from staffing_pages import EXTRACT_VERSION
+    from staffing_records import RECORD_VERSION
+
+    return partial(memo_parse, parse, parser_fingerprint(parse, EXTRACT_VERSION, RECORD_VERSION, *config))
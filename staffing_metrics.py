@@ -0,0 +1,233 @@
+"""
+NY Hospital Staffing Metrics
+============================
+Derived staffing metrics over the three shift tables the staffing scrapers
+write (rn_shifts_all.csv, lpn_shifts_all.csv, UNLICENSED_shifts_all.csv).
+
+The three files are loaded once and joined on (pfi, unit_name,
+unit_description), giving one row per clinical unit with every role's
+counts and hours per patient for every shift. All metrics are computed on
+whole columns at once (a roles x shifts x units NumPy cube), never row by
+row:
+
+  skill mix      {shift}_rn_share, {shift}_licensed_share and the 24h shares:
+                 RN (and RN + LPN) staff as a share of all nursing staff
+  24-hour totals rn_count_24h, ..., total_count_24h and the hours per patient
+                 summed over the shifts (rn_hours_per_pt_24h, ...)
+  shift deltas   evening/night minus day for the RN and total counts
+  percentiles    where a unit ranks (0-1) among the same kind of unit in its
+                 region and its county: *_region_pct, *_county_pct
+
+Blank or non-numeric cells are NaN and fall out of the sums; a unit missing
+from one role's file simply has NaN for that role.
+
+Outputs:
+  collected-data/staffing_metrics.csv                one row per unit
+  collected-data/staffing_region_percentiles.csv     p10..p90 per region and
+                                                     unit type (--by county
+                                                     for counties)
+
+Install:
+  pip install pandas numpy
+
+Run:
+  python staffing_metrics.py
+  python staffing_metrics.py --by county --format both
+
+Use from Python (e.g. behind a dashboard):
+  from staffing_metrics import load_staffing, compute_metrics
+  metrics = compute_metrics(load_staffing())
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from columnar import output_formats, write_dataset
+
+# role -> shift table written by the staffing scrapers
+ROLE_CSVS = {
+    "rn":         "rn_shifts_all.csv",
+    "lpn":        "lpn_shifts_all.csv",
+    "unlicensed": "UNLICENSED_shifts_all.csv",
+}
+
+KEYS = ["pfi", "unit_name", "unit_description"]
+INFO_COLUMNS = ["hospital_name", "county", "region"]
+SHIFTS = ["day", "evening", "night"]
+
+METRICS_CSV = "collected-data/staffing_metrics.csv"
+PERCENTILES_CSV = "collected-data/staffing_{by}_percentiles.csv"
+
+# Metrics ranked within each region / county (among units of the same name)
+RANKED_METRICS = [
+    "rn_count_24h",
+    "total_count_24h",
+    "rn_hours_per_pt_24h",
+    "total_hours_per_pt_24h",
+    "rn_share_24h",
+    "licensed_share_24h",
+]
+
+QUANTILES = [0.1, 0.25, 0.5, 0.75, 0.9]
+
+
+def load_role(path):
+    """
+    One role's shift table indexed by KEYS: the info columns as text and every
+    shift column as float, with its name lowercased (day_LPN_count ->
+    day_lpn_count) so all roles follow one naming scheme.
+    """
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    df = df.drop_duplicates(KEYS).set_index(KEYS)
+    numeric = {}
+    for column in df.columns.difference(INFO_COLUMNS, sort=False):
+        numeric[column.lower()] = pd.to_numeric(df[column].str.replace(",", "", regex=False), errors="coerce")
+    return df[INFO_COLUMNS], pd.DataFrame(numeric, index=df.index)
+
+
+def load_staffing(paths=ROLE_CSVS):
+    """
+    All role tables joined on (pfi, unit_name, unit_description), one row per
+    unit. Role files that don't exist (e.g. a crawl run with --roles rn) are
+    left out.
+    """
+    infos, values = [], []
+    for path in paths.values():
+        if not os.path.exists(path):
+            continue
+        info, numeric = load_role(path)
+        infos.append(info)
+        values.append(numeric)
+    if not values:
+        raise FileNotFoundError(f"none of the staffing tables exist: {', '.join(paths.values())}")
+
+    # Outer join: a unit only listed for some roles keeps NaN for the others.
+    # Hospital info comes from the first file that lists the unit.
+    numeric = pd.concat(values, axis=1, join="outer")
+    # avg_patients is in several role files of some scrapers; keep the first
+    numeric = numeric.loc[:, ~numeric.columns.duplicated()]
+    info = pd.concat(infos)
+    info = info[~info.index.duplicated()].reindex(numeric.index)
+    return info.join(numeric).reset_index()
+
+
+def _column(df, name):
+    """A column as a float array, or all NaN when the table doesn't have it."""
+    if name in df.columns:
+        return df[name].to_numpy(dtype=float)
+    return np.full(len(df), np.nan)
+
+
+def _cube(df, measure):
+    """roles x shifts x units array of {shift}_{role}_{measure}."""
+    return np.stack([
+        np.stack([_column(df, f"{shift}_{role}_{measure}") for shift in SHIFTS])
+        for role in ROLE_CSVS
+    ])
+
+
+def _sum(values, axis):
+    """nansum that stays NaN where every value summed is NaN."""
+    total = np.nansum(values, axis=axis)
+    total[np.isnan(values).all(axis=axis)] = np.nan
+    return total
+
+
+def _ratio(numerator, denominator):
+    """Elementwise numerator / denominator, NaN where the denominator is 0 or NaN."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator > 0, numerator / denominator, np.nan)
+
+
+def compute_metrics(staffing):
+    """Per-unit metrics for a table from load_staffing (see the module docstring)."""
+    counts = _cube(staffing, "count")           # roles x shifts x units
+    hours = _cube(staffing, "hours_per_pt")
+    rn, lpn = 0, 1
+
+    metrics = {}
+    shift_totals = _sum(counts, axis=0)         # shifts x units
+    shift_hours = _sum(hours, axis=0)
+    for s, shift in enumerate(SHIFTS):
+        metrics[f"{shift}_total_count"] = shift_totals[s]
+        metrics[f"{shift}_total_hours_per_pt"] = shift_hours[s]
+        metrics[f"{shift}_rn_share"] = _ratio(counts[rn, s], shift_totals[s])
+        metrics[f"{shift}_licensed_share"] = _ratio(_sum(counts[[rn, lpn], s], axis=0), shift_totals[s])
+
+    # 24-hour totals: staff over the three shifts, and hours per patient summed
+    # over them (nursing hours per patient day)
+    role_counts = _sum(counts, axis=1)          # roles x units
+    role_hours = _sum(hours, axis=1)
+    for r, role in enumerate(ROLE_CSVS):
+        metrics[f"{role}_count_24h"] = role_counts[r]
+        metrics[f"{role}_hours_per_pt_24h"] = role_hours[r]
+    total_count = _sum(role_counts, axis=0)
+    metrics["total_count_24h"] = total_count
+    metrics["total_hours_per_pt_24h"] = _sum(role_hours, axis=0)
+    metrics["rn_share_24h"] = _ratio(role_counts[rn], total_count)
+    metrics["licensed_share_24h"] = _ratio(_sum(role_counts[[rn, lpn]], axis=0), total_count)
+
+    # Shift deltas against the day shift
+    for s, shift in enumerate(SHIFTS[1:], start=1):
+        metrics[f"{shift}_minus_day_rn_count"] = counts[rn, s] - counts[rn, 0]
+        metrics[f"{shift}_minus_day_total_count"] = shift_totals[s] - shift_totals[0]
+
+    result = pd.concat([staffing[KEYS + INFO_COLUMNS], pd.DataFrame(metrics, index=staffing.index)], axis=1)
+    for by in ["region", "county"]:
+        result = add_percentile_ranks(result, by)
+    return result
+
+
+def add_percentile_ranks(metrics, by, columns=RANKED_METRICS):
+    """
+    Adds {column}_{by}_pct: the unit's percentile rank (0-1) among units with
+    the same name in the same region / county. Units of different kinds
+    (Critical Care vs Emergency Department) aren't compared with each other.
+    """
+    groups = metrics.groupby([by, "unit_name"], sort=False)[columns]
+    ranks = groups.rank(pct=True)
+    ranks.columns = [f"{column}_{by}_pct" for column in columns]
+    return pd.concat([metrics, ranks], axis=1)
+
+
+def group_percentiles(metrics, by="region", columns=RANKED_METRICS, quantiles=QUANTILES):
+    """
+    Distribution of each metric per region (or county) and unit name: one row
+    per (group, unit_name, metric) with the number of units and p10..p90.
+    """
+    groups = metrics.groupby([by, "unit_name"])[columns]
+    table = groups.quantile(quantiles).stack().unstack(-2)
+    table.columns = [f"p{round(q * 100)}" for q in quantiles]
+    table.index = table.index.set_names([by, "unit_name", "metric"])
+    sizes = groups.count().stack()
+    table.insert(0, "units", sizes.reindex(table.index).astype("int64"))
+    return table.reset_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute staffing metrics from the RN, LPN and unlicensed shift tables.")
+    parser.add_argument("--by", choices=["region", "county"], default="region",
+                        help="grouping for the percentile summary (default region)")
+    args, _ = parser.parse_known_args()
+    formats = output_formats()
+
+    staffing = load_staffing()
+    metrics = compute_metrics(staffing)
+    summary = group_percentiles(metrics, args.by)
+    summary_csv = PERCENTILES_CSV.format(by=args.by)
+
+    if "csv" in formats:
+        metrics.to_csv(METRICS_CSV, index=False)
+        summary.to_csv(summary_csv, index=False)
+        print(f"{len(metrics)} units saved to {METRICS_CSV}")
+        print(f"{len(summary)} percentile rows saved to {summary_csv}")
+    if "parquet" in formats:
+        print(f"Parquet dataset written to {write_dataset(metrics, 'staffing_metrics')}")
+        print(f"Parquet dataset written to {write_dataset(summary, f'staffing_{args.by}_percentiles')}")
+
+
+if __name__ == "__main__":
+    main()
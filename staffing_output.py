@@ -0,0 +1,137 @@
+"""
+Streaming Outputs for the Staffing Plan Scrapers
+================================================
+run_crawl hands every facility's rows to a sink as soon as the facility is
+done. CsvSink writes them straight to the output CSV instead of holding the
+whole crawl in memory for a final DataFrame, so memory stays flat however
+many units are kept, and the CSV fills up while the crawl runs.
+
+The column list is fixed up front (base columns plus every shift column the
+parser can fill), which is the same header the DataFrame used to produce.
+Facilities finish out of order, so rows wait in a small reorder buffer until
+every facility before them is written; the file keeps the index page's
+facility order.
+
+pandas is only needed for the Parquet output, which is converted from the
+finished CSV.
+"""
+
+import csv
+import os
+import tempfile
+
+BASE_COLUMNS = ["pfi", "hospital_name", "county", "region", "unit_name", "unit_description"]
+
+
+def staffing_fieldnames(layout):
+    """Output header: base columns, then each shift's columns (day_rn_count, ...) of a UnitLayout."""
+    return BASE_COLUMNS + layout.fields
+
+
+class OrderedRows:
+    """Sink that keeps every row in memory; close() returns them in facility order."""
+
+    def __init__(self):
+        self.rows_by_facility = {}
+
+    def add(self, index, rows):
+        self.rows_by_facility[index] = rows
+
+    def skip(self, index):
+        pass
+
+    def close(self):
+        return [row for i in sorted(self.rows_by_facility) for row in self.rows_by_facility[i]]
+
+
+class CsvSink:
+    """Streams rows to a CSV in facility order. close() returns the number of rows written."""
+
+    def __init__(self, path, fieldnames):
+        self.path = path
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.DictWriter(self.file, fieldnames=fieldnames, lineterminator="\n")
+        self.writer.writeheader()
+        self.next_index = 0
+        self.waiting = {}
+        self.count = 0
+
+    def add(self, index, rows):
+        self.waiting[index] = rows
+        self._drain()
+
+    def skip(self, index):
+        self.waiting[index] = []
+        self._drain()
+
+    def _drain(self):
+        # Write every facility that is next in line, then make it visible
+        wrote = False
+        while self.next_index in self.waiting:
+            rows = self.waiting.pop(self.next_index)
+            self.writer.writerows(rows)
+            self.count += len(rows)
+            self.next_index += 1
+            wrote = True
+        if wrote:
+            self.file.flush()
+
+    def close(self):
+        # Facilities that never reported (e.g. the crawl was cut short) are passed over
+        for index in sorted(self.waiting):
+            rows = self.waiting.pop(index)
+            self.writer.writerows(rows)
+            self.count += len(rows)
+        self.file.close()
+        return self.count
+
+
+class RoleSinks:
+    """Routes rows tagged with a "role" key to one sink per role (the tag is dropped)."""
+
+    def __init__(self, sinks):
+        self.sinks = sinks
+
+    def add(self, index, rows):
+        by_role = {role: [] for role in self.sinks}
+        for row in rows:
+            if row["role"] in by_role:
+                by_role[row["role"]].append({k: v for k, v in row.items() if k != "role"})
+        for role, sink in self.sinks.items():
+            sink.add(index, by_role[role])
+
+    def skip(self, index):
+        for sink in self.sinks.values():
+            sink.skip(index)
+
+    def close(self):
+        return {role: sink.close() for role, sink in self.sinks.items()}
+
+
+def output_path(csv_path, formats):
+    """Where to stream rows: the CSV itself, or a scratch file when only Parquet is wanted."""
+    if "csv" in formats:
+        return csv_path
+    fd, path = tempfile.mkstemp(suffix=".csv", dir=os.path.dirname(os.path.abspath(csv_path)))
+    os.close(fd)
+    return path
+
+
+def finish_outputs(path, csv_path, name, formats):
+    """Convert the streamed CSV to Parquet if asked for, and drop the scratch file."""
+    if "parquet" in formats:
+        import pandas as pd
+
+        from columnar import write_dataset
+
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+        print(f"Parquet dataset written to {write_dataset(df, name)}")
+    if path != csv_path:
+        os.remove(path)
+
+
+def write_errors(errors, path):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["pfi", "name", "error"], lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(errors)
@@ -0,0 +1,169 @@
+"""
+Page Helpers for the Staffing Plan Parsers
+==========================================
+Every staffing-plan page starts with a title line ("HOSPITAL INFORMATION",
+"RN DAY SHIFT", "DAY SHIFT UNLICENSED", ...), and most pages are of no
+interest to a given parser. Reading that title through pdfplumber means
+running pdfminer's layout analysis over the whole page, which is where nearly
+all of the parse time goes.
+
+page_titles() reads just the title line of every page with pdfium (already
+installed as a pdfplumber dependency), which is a small fraction of the
+cost. Parsers then hand only the hospital-info and shift pages to pdfplumber,
+and only extract the first table on those pages, the only one they read.
+
+Parsers go through StaffingPdf, which serves titles and tables from the parse
+memo (staffing_memo) when this PDF was seen before, and only opens the PDF
+with pdfplumber for tables that aren't memoized yet.
+"""
+
+import hashlib
+import io
+import re
+
+from staffing_memo import current_memo, source_hash
+from staffing_stats import count, stage
+
+HEADER_BAND = 24  # points below the topmost glyph that can hold the title line
+
+
+def _first_line(text):
+    line = text.strip().split("\n")[0] if text else ""
+    return re.sub(r"\s+", " ", line).strip().upper()
+
+
+def page_titles(pdf_bytes):
+    """
+    Title line of every page, upper-cased, read from the topmost line of text
+    with pdfium. Pages without text get "" (classify_page then falls back to
+    pdfplumber for them).
+    """
+    import pypdfium2 as pdfium
+
+    titles = []
+    doc = pdfium.PdfDocument(pdf_bytes)
+    try:
+        for page in doc:
+            textpage = page.get_textpage()
+            rects = [textpage.get_rect(i) for i in range(textpage.count_rects())]
+            if rects:
+                # The title is the line of text highest on the page
+                _, bottom, _, top = max(rects, key=lambda rect: rect[3])
+                width, _ = page.get_size()
+                titles.append(_first_line(textpage.get_text_bounded(0, bottom, width, top)))
+            else:
+                titles.append("")
+            textpage.close()
+            page.close()
+    finally:
+        doc.close()
+    return titles
+
+
+def page_header(page):
+    """First text line of a pdfplumber page, read from the header band only."""
+    chars = page.chars
+    if not chars:
+        return ""
+    x0, top, x1, bottom = page.bbox
+    band_top = max(top, min(c["top"] for c in chars))
+    band_bottom = min(bottom, band_top + HEADER_BAND)
+    return _first_line(page.crop((x0, band_top, x1, band_bottom)).extract_text())
+
+
+def classify_title(first_line, shift_keywords):
+    """
+    ("info", None) for the hospital information page, ("shift", name) for a
+    page whose title contains one of shift_keywords, or (None, None) to skip.
+    """
+    if "HOSPITAL INFORMATION" in first_line:
+        return "info", None
+    for shift_name, keyword in shift_keywords.items():
+        if keyword in first_line:
+            return "shift", shift_name
+    return None, None
+
+
+def first_table(page):
+    """Rows of the first table on the page (cells inside its bounding box only), or None."""
+    tables = page.find_tables()
+    return tables[0].extract() if tables else None
+
+
+# Memo entries made by the functions above are only valid for this exact code
+EXTRACT_VERSION = source_hash(_first_line, page_titles, page_header, first_table)
+
+
+class StaffingPdf:
+    """
+    Titles and first tables of one staffing-plan PDF, memoized by content hash.
+
+      with StaffingPdf(pdf_bytes) as doc:
+          for i, title in enumerate(doc.titles):
+              ... doc.table(i) ...
+    """
+
+    def __init__(self, pdf_bytes):
+        self.pdf_bytes = pdf_bytes
+        self.key = f"{hashlib.sha256(pdf_bytes).hexdigest()}:{EXTRACT_VERSION}"
+        self.memo = current_memo()
+        self._pdf = None
+        self._titles = None
+
+    def _pages(self):
+        if self._pdf is None:
+            # Imported on first use: fully memoized PDFs never load pdfplumber
+            import pdfplumber
+
+            with stage("open"):
+                self._pdf = pdfplumber.open(io.BytesIO(self.pdf_bytes))
+        return self._pdf.pages
+
+    @property
+    def titles(self):
+        """Title line of every page ("" when the page has no text)."""
+        if self._titles is None:
+            titles = self.memo.get("titles", self.key) if self.memo else None
+            if titles is None:
+                with stage("titles"):
+                    titles = page_titles(self.pdf_bytes)
+                # Pages pdfium found no text on get a second look with pdfplumber
+                if not all(titles):
+                    pages = self._pages()
+                    with stage("header"):
+                        titles = [title or page_header(pages[i]) for i, title in enumerate(titles)]
+                if self.memo:
+                    self.memo.put("titles", self.key, titles)
+            else:
+                count("titles_memoized")
+            count("pages", len(titles))
+            self._titles = titles
+        return self._titles
+
+    def table(self, index):
+        """Rows of the first table on page `index`, or None."""
+        key = f"{self.key}:{index}"
+        if self.memo:
+            cached = self.memo.get("table", key)
+            if cached is not None:
+                count("tables_memoized")
+                return cached["rows"]
+        page = self._pages()[index]
+        with stage("tables"):
+            rows = first_table(page)
+        count("tables_extracted")
+        if self.memo:
+            # Wrapped so that "no table" is memoized too
+            self.memo.put("table", key, {"rows": rows})
+        return rows
+
+    def close(self):
+        if self._pdf is not None:
+            self._pdf.close()
+            self._pdf = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,199 @@
+"""
+Fetch + Parse Pipeline for the Staffing Plan Scrapers
+=====================================================
+Runs the crawl shared by hospital_staffing_data_collection.py and
+official_parser.py: PDFs are downloaded concurrently (staffing_fetch) and each
+one is handed to a process pool as soon as it lands, so the CPU-bound
+pdfplumber layout analysis runs on every core instead of the main thread.
+
+Rows come back in the facility order of the index page, however the downloads
+and parses finish, and per-facility failures (download or parse) are collected
+as error rows, exactly like the old serial loop.
+
+Options added to each scraper:
+  --workers N         concurrent downloads (default 8)
+  --rate R            max requests per second across all downloads (default 4)
+  --parse-workers N   parser processes (default: all cores; 1 parses inline)
+  --base-url URL      site to crawl (e.g. a local stand-in for testing)
+  --cache-dir DIR     local download cache (default collected-data/pdf_cache)
+  --no-cache          download everything, don't read or write the cache
+  --offline           run purely from the cache, no network requests
+  --parse-cache PATH  parse memo (default collected-data/parse_cache.sqlite)
+  --parse-cache-mb N  parse memo size limit, least recently used evicted first
+  --no-parse-cache    always parse from scratch
+  --resume            skip facilities finished by an earlier, interrupted run
+                      (their rows come from its journal; failures are retried)
+  --journal PATH      crawl journal (default collected-data/journals/<output>.jsonl)
+  --report PATH       run report with per-facility stage timings (default
+                      collected-data/run_reports/<output>.json, see staffing_stats)
+  --profile N         also cProfile the parses and keep the N slowest PDFs' profiles
+"""
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import staffing_memo
+from staffing_cache import PDF_CACHE, PdfCache
+from staffing_fetch import DEFAULT_RATE, DEFAULT_WORKERS, fetch_pdfs
+from staffing_journal import JOURNAL_DIR, CrawlJournal
+from staffing_output import OrderedRows
+from staffing_stats import REPORT_DIR, RunReport, measured_rows
+
+
+def add_crawl_arguments(parser, base_url):
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="concurrent downloads")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="max requests per second across all downloads")
+    parser.add_argument("--parse-workers", type=int, default=os.cpu_count() or 1,
+                        help="parser processes (default: all cores; 1 parses in the main process)")
+    parser.add_argument("--base-url", default=base_url, help="site to crawl (e.g. a local stand-in for testing)")
+    parser.add_argument("--cache-dir", default=PDF_CACHE, help=f"local download cache (default {PDF_CACHE})")
+    parser.add_argument("--no-cache", dest="cache_dir", action="store_const", const=None, help="don't use the download cache")
+    parser.add_argument("--offline", action="store_true", help="serve the index page and PDFs from the cache only")
+    parser.add_argument("--parse-cache", default=staffing_memo.PARSE_CACHE,
+                        help=f"parse memo (default {staffing_memo.PARSE_CACHE})")
+    parser.add_argument("--parse-cache-mb", type=float, default=staffing_memo.DEFAULT_MAX_MB,
+                        help=f"parse memo size limit in MB (default {staffing_memo.DEFAULT_MAX_MB})")
+    parser.add_argument("--no-parse-cache", dest="parse_cache", action="store_const", const=None,
+                        help="don't memoize parse results")
+    parser.add_argument("--resume", action="store_true", help="continue the crawl recorded in the journal")
+    parser.add_argument("--journal", help=f"crawl journal (default {JOURNAL_DIR}/<output>.jsonl)")
+    parser.add_argument("--report", help=f"run report (default {REPORT_DIR}/<output>.json)")
+    parser.add_argument("--profile", type=int, default=0, metavar="N",
+                        help="cProfile every parse and save the profiles of the N slowest PDFs")
+    return parser
+
+
+def open_cache(args):
+    """The PdfCache selected by the crawl arguments, or None with --no-cache."""
+    if args.cache_dir is None:
+        if args.offline:
+            raise SystemExit("--offline needs the cache (drop --no-cache)")
+        return None
+    return PdfCache(args.cache_dir)
+
+
+def open_memo(args):
+    """Set up the parse memo from the crawl arguments; pass the result to run_crawl."""
+    memo = (args.parse_cache, args.parse_cache_mb)
+    staffing_memo.configure(*memo)
+    return memo
+
+
+def open_journal(args, name):
+    """The crawl journal for this run: args.journal or collected-data/journals/<name>.jsonl."""
+    path = args.journal or os.path.join(JOURNAL_DIR, f"{name}.jsonl")
+    return CrawlJournal(path, resume=args.resume)
+
+
+def open_report(args, name):
+    """The run report for this run: args.report or collected-data/run_reports/<name>.json."""
+    path = args.report or os.path.join(REPORT_DIR, f"{name}.json")
+    return RunReport(path, profile=args.profile)
+
+
+def facility_rows(parse, facility, pdf_bytes):
+    """Parse one PDF into output rows. Runs in a pool worker, so parse must be a module-level function."""
+    hospital_info, units = parse(pdf_bytes)
+    return [{
+        "pfi":           facility["pfi"],
+        "hospital_name": facility["name"],
+        "county":        facility["county"],
+        "region":        hospital_info.get("region", ""),
+        **unit.to_row(),
+    } for unit in units.values()]
+
+
+def _error_row(facility, error):
+    print(f"  ERROR: {facility['pfi']} - {error}")
+    return {"pfi": facility["pfi"], "name": facility["name"], "error": str(error)}
+
+
+def run_crawl(facilities, parse, workers=DEFAULT_WORKERS, rate=DEFAULT_RATE,
+              parse_workers=None, headers=None, rows=facility_rows, cache=None, offline=False,
+              memo=None, journal=None, sink=None, report=None):
+    """
+    Download and parse every facility's PDF.
+
+    rows: rows(parse, facility, pdf_bytes) -> list of output rows; runs in the
+    pool workers, so it must be a module-level function too.
+    cache / offline: see staffing_fetch.fetch_pdfs.
+    memo: open_memo()'s settings, applied in every parser process.
+    journal: a CrawlJournal; facilities it already completed are not crawled
+    again, and every new outcome is appended to it as soon as it is known.
+    sink: receives each facility's rows as it finishes (staffing_output); by
+    default they are kept in memory.
+    report: a staffing_stats.RunReport that gets every facility's timings.
+
+    Returns (sink.close(), errors): all rows in facility order for the default
+    sink, and the error rows in facility order.
+    """
+    parse_workers = parse_workers or os.cpu_count() or 1
+    sink = sink if sink is not None else OrderedRows()
+    errors_by_facility = {}
+    lock = threading.Lock()
+
+    todo = []
+    for i, f in enumerate(facilities):
+        done_rows = journal.completed(f) if journal else None
+        if done_rows is None:
+            todo.append(i)
+        else:
+            sink.add(i, done_rows)
+    if journal and len(todo) < len(facilities):
+        print(f"Resuming: {len(facilities) - len(todo)} facilities already in {journal.path}, {len(todo)} to go")
+    if report:
+        report.resumed = len(facilities) - len(todo)
+    profile = bool(report and report.profile)
+
+    progress = iter(range(1, len(todo) + 1))
+
+    def finish(i, result=None, error=None, stats=None, profile=None):
+        # Called from the main thread or a pool callback thread
+        f = facilities[i]
+        if report:
+            report.finished(f, result, error, stats, profile)
+        with lock:
+            print(f"[{next(progress)}/{len(todo)}] {f['pfi']} - {f['name']}")
+            if error is None:
+                sink.add(i, result)
+            else:
+                sink.skip(i)
+                errors_by_facility[i] = _error_row(f, error)
+        if journal:
+            journal.record(f, result, error)
+
+    pending = [facilities[i] for i in todo]
+    fetched = fetch_pdfs(pending, workers=workers, rate=rate, headers=headers, cache=cache, offline=offline,
+                         report=report)
+
+    if parse_workers <= 1:
+        for j, f, pdf_bytes, error in fetched:
+            if error is not None:
+                finish(todo[j], error=error)
+                continue
+            finish(todo[j], *measured_rows(rows, parse, f, pdf_bytes, profile))
+    else:
+        initializer, initargs = (staffing_memo.configure, memo) if memo else (None, ())
+        with ProcessPoolExecutor(max_workers=parse_workers, initializer=initializer, initargs=initargs) as pool:
+            # Submit parses while downloads are still coming in; each result is
+            # recorded as soon as its parse finishes
+            def parsed(future, i):
+                # measured_rows returns parse errors; an exception here means
+                # the worker itself failed
+                error = future.exception()
+                if error is None:
+                    finish(i, *future.result())
+                else:
+                    finish(i, error=error)
+
+            for j, f, pdf_bytes, error in fetched:
+                if error is not None:
+                    finish(todo[j], error=error)
+                else:
+                    future = pool.submit(measured_rows, rows, parse, f, pdf_bytes, profile)
+                    future.add_done_callback(lambda future, i=todo[j]: parsed(future, i))
+
+    # Keep the facility order of the index page, whatever order work finished in
+    errors = [errors_by_facility[i] for i in sorted(errors_by_facility)]
+    return sink.close(), errors
@@ -0,0 +1,139 @@
+"""
+Typed Unit Records for the Staffing Plan Parsers
+================================================
+A parsed unit used to be a dict of f-string keys (day_rn_count, ...) holding
+stripped strings. UnitRecord keeps the unit's name and description plus one
+float per (shift, column) in a flat array('d'), laid out by a UnitLayout that
+all records of a parser share:
+
+  layout = UnitLayout(SHIFT_KEYWORDS, {2: "rn_count", 3: "rn_hours_per_pt"})
+  record = UnitRecord(layout, "Critical Care", "ICU A")
+  record.set_shift("day", table_row)        # parses row[2], row[3] once
+  record.value("day", "rn_count")           # 12.0, or None when blank
+
+Numbers are parsed once, at extraction; blank cells are NaN in the array and
+None everywhere else. Cells whose text the number doesn't give back exactly
+("5.80", "1,200") or that hold text rather than a number (both rare) are
+kept verbatim on the side, so to_row() writes every cell as it was in the
+table. to_columns() turns a list of records straight into column arrays.
+"""
+
+import math
+import re
+from array import array
+
+from staffing_memo import source_hash
+
+NUMBER = re.compile(r"^[-+]?(\d+(\.\d*)?|\.\d+)$")
+
+
+def parse_number(text):
+    """float for a numeric cell ("1,200" and "12.5" included), None for a blank one, else the text."""
+    if text is None:
+        return None
+    text = str(text).strip()
+    if not text:
+        return None
+    plain = text.replace(",", "")
+    if NUMBER.match(plain):
+        return float(plain)
+    return text
+
+
+def format_number(value):
+    """CSV text for a parsed number: 12.0 -> "12", 1.5 -> "1.5"."""
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class UnitLayout:
+    """Shared field layout: every (shift, column) pair gets a slot in the record array."""
+
+    def __init__(self, shifts, columns):
+        # columns: table column index -> output column name, in table order
+        self.shifts = list(shifts)
+        self.columns = dict(columns)
+        self.fields = [f"{shift}_{name}" for shift in self.shifts for name in self.columns.values()]
+        self.slots = {(shift, name): i
+                      for i, (shift, name) in enumerate((s, n) for s in self.shifts for n in self.columns.values())}
+
+    def slot(self, shift, name):
+        return self.slots[(shift, name)]
+
+
+class UnitRecord:
+    """One clinical unit: name, description and a float per shift column."""
+
+    __slots__ = ("layout", "unit_name", "unit_description", "values", "text")
+
+    def __init__(self, layout, unit_name, unit_description=""):
+        self.layout = layout
+        self.unit_name = unit_name
+        self.unit_description = unit_description
+        self.values = array("d", [math.nan]) * len(layout.fields)
+        self.text = None  # slot -> cell text that format_number can't rebuild
+
+    def set(self, shift, name, cell):
+        slot = self.layout.slot(shift, name)
+        value = parse_number(cell)
+        if self.text:
+            self.text.pop(slot, None)
+        if isinstance(value, str):
+            text, self.values[slot] = value, math.nan
+        elif value is None:
+            text, self.values[slot] = None, math.nan
+        else:
+            self.values[slot] = value
+            text = str(cell).strip()
+            if text == format_number(value):
+                text = None
+        if text is not None:
+            if self.text is None:
+                self.text = {}
+            self.text[slot] = text
+
+    def set_shift(self, shift, row):
+        """Fill every column of one shift from a table row (missing cells become blank)."""
+        for index, name in self.layout.columns.items():
+            self.set(shift, name, row[index] if len(row) > index and row[index] else None)
+
+    def value(self, shift, name):
+        """The cell as a float, its text if it wasn't a number, or None when blank."""
+        slot = self.layout.slot(shift, name)
+        value = self.values[slot]
+        if not math.isnan(value):
+            return value
+        return self.text.get(slot) if self.text else None
+
+    def to_row(self):
+        """CSV row dict: unit_name, unit_description and every shift column as its cell text (None when blank)."""
+        row = {"unit_name": self.unit_name, "unit_description": self.unit_description}
+        for slot, field in enumerate(self.layout.fields):
+            if self.text and slot in self.text:
+                row[field] = self.text[slot]
+            else:
+                value = self.values[slot]
+                row[field] = None if math.isnan(value) else format_number(value)
+        return row
+
+
+def to_columns(records, layout=None):
+    """
+    Columns of a list of records: unit_name / unit_description as lists and
+    each shift column as an array('d') with NaN for blanks (and for text
+    cells), ready for numpy.frombuffer or pandas.
+    """
+    layout = layout or (records[0].layout if records else None)
+    columns = {
+        "unit_name": [r.unit_name for r in records],
+        "unit_description": [r.unit_description for r in records],
+    }
+    if layout is None:
+        return columns
+    for slot, field in enumerate(layout.fields):
+        columns[field] = array("d", (r.values[slot] for r in records))
+    return columns
+
+
+# Parse results are memoized as pickled records, so the memo fingerprint
+# includes this; changing the classes invalidates the stored results
+RECORD_VERSION = source_hash(parse_number, format_number, UnitLayout, UnitRecord)
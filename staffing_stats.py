@@ -0,0 +1,239 @@
+"""
+Run Report for the Staffing Plan Scrapers
+=========================================
+Records where a staffing crawl spends its time, per facility and per stage,
+and writes it as a JSON run report (collected-data/run_reports/<output>.json):
+
+  fetch     the download, or its revalidation / cache read (includes wait)
+  wait      time spent waiting for a rate-limit token
+  parse     the whole parse of the PDF in its worker (includes the stages below)
+  titles    reading page titles with pdfium
+  header    pdfplumber fallback for pages pdfium found no title on
+  open      pdfplumber.open
+  tables    table extraction (pdfminer layout analysis + find_tables)
+  memo      parse memo lookups and writes
+
+plus counters: bytes downloaded, HTTP requests, 304s, cache reads, pages,
+tables extracted vs served from the memo, and memoized results. Pages whose
+table was never needed are reported as skipped.
+
+The instrumented code calls stage() / count(), which are no-ops unless the
+current thread is recording (inside recording()), so the helpers stay usable
+on their own. Parses run in pool workers; measured_rows() records there and
+sends the numbers back with the rows.
+
+With --profile N, every parse also runs under cProfile and the profiles of
+the N slowest PDFs are written next to the report as <pfi>.prof, for
+`python -m pstats` or snakeviz. Profiling slows the parses down, so leave it
+off for timing runs.
+"""
+
+import cProfile
+import heapq
+import json
+import marshal
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from staffing_journal import facility_key
+
+REPORT_DIR = 'collected-data/run_reports'
+
+_local = threading.local()
+
+
+class FacilityStats:
+    """Stage timings (seconds) and counters of one facility."""
+
+    def __init__(self):
+        self.stages = defaultdict(float)
+        self.counts = defaultdict(int)
+
+    def merge(self, other):
+        for name, seconds in other['stages'].items():
+            self.stages[name] += seconds
+        for name, n in other['counts'].items():
+            self.counts[name] += n
+
+    def to_dict(self):
+        return {'stages': dict(self.stages), 'counts': dict(self.counts)}
+
+
+@contextmanager
+def recording(stats):
+    """Send stage() and count() calls made in this thread to stats."""
+    previous = getattr(_local, 'stats', None)
+    _local.stats = stats
+    try:
+        yield stats
+    finally:
+        _local.stats = previous
+
+
+@contextmanager
+def stage(name):
+    """Add the time spent in the block to the current facility's `name` stage."""
+    stats = getattr(_local, 'stats', None)
+    if stats is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.stages[name] += time.perf_counter() - start
+
+
+def count(name, n=1):
+    """Add n to the current facility's `name` counter."""
+    stats = getattr(_local, 'stats', None)
+    if stats is not None:
+        stats.counts[name] += n
+
+
+def measured_rows(rows, parse, facility, pdf_bytes, profile=False):
+    """
+    rows(parse, facility, pdf_bytes), timed. Runs in a pool worker.
+
+    Returns (result, error, stats, profile): the rows or the exception the
+    parse raised, the stats as a dict, and the marshalled cProfile stats when
+    profile is set.
+    """
+    stats = FacilityStats()
+    profiler = cProfile.Profile() if profile else None
+    result = error = None
+    with recording(stats):
+        with stage('parse'):
+            if profiler:
+                profiler.enable()
+            try:
+                result = rows(parse, facility, pdf_bytes)
+            except Exception as e:
+                error = e
+            finally:
+                if profiler:
+                    profiler.disable()
+    dump = None
+    if profiler:
+        profiler.create_stats()
+        dump = marshal.dumps(profiler.stats)
+    return result, error, stats.to_dict(), dump
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class RunReport:
+    """Per-facility stats of one crawl, written as JSON by write()."""
+
+    def __init__(self, path, profile=0):
+        self.path = path
+        self.profile = profile
+        self.started = time.time()
+        self.start = time.perf_counter()
+        self.facilities = {}
+        self.resumed = 0
+        self.lock = threading.Lock()
+        self._profiles = []  # min-heap of (parse seconds, pfi, marshalled stats)
+
+    def facility(self, facility):
+        """The FacilityStats of a facility, created on first use."""
+        key = facility_key(facility)
+        with self.lock:
+            entry = self.facilities.get(key)
+            if entry is None:
+                entry = self.facilities[key] = {
+                    'pfi': facility['pfi'],
+                    'name': facility['name'],
+                    'stats': FacilityStats(),
+                    'error': None,
+                }
+            return entry['stats']
+
+    def finished(self, facility, rows=None, error=None, parse_stats=None, profile=None):
+        """Record a facility's outcome, its worker stats and (optionally) its profile."""
+        stats = self.facility(facility)
+        with self.lock:
+            entry = self.facilities[facility_key(facility)]
+            if parse_stats:
+                stats.merge(parse_stats)
+            entry['rows'] = len(rows) if rows is not None else 0
+            entry['error'] = None if error is None else str(error)
+            if profile is not None and self.profile > 0:
+                item = (stats.stages.get('parse', 0.0), facility['pfi'], profile)
+                if len(self._profiles) < self.profile:
+                    heapq.heappush(self._profiles, item)
+                else:
+                    heapq.heappushpop(self._profiles, item)
+
+    def summary(self):
+        stages = defaultdict(float)
+        counts = defaultdict(int)
+        for entry in self.facilities.values():
+            for name, seconds in entry['stats'].stages.items():
+                stages[name] += seconds
+            for name, n in entry['stats'].counts.items():
+                counts[name] += n
+        pages = counts.get('pages', 0)
+        counts['pages_skipped'] = pages - counts.get('tables_extracted', 0) - counts.get('tables_memoized', 0)
+        parse_times = [e['stats'].stages['parse'] for e in self.facilities.values() if 'parse' in e['stats'].stages]
+        fetch_times = [e['stats'].stages['fetch'] for e in self.facilities.values() if 'fetch' in e['stats'].stages]
+        wall = time.perf_counter() - self.start
+        return {
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+            'wall_seconds': round(wall, 3),
+            'facilities': len(self.facilities),
+            'resumed': self.resumed,
+            'errors': sum(1 for e in self.facilities.values() if e['error']),
+            'facilities_per_second': round(len(self.facilities) / wall, 3) if wall > 0 else None,
+            'stage_seconds': {name: round(seconds, 3) for name, seconds in sorted(stages.items())},
+            'counts': dict(sorted(counts.items())),
+            'parse_seconds': {
+                'p50': _percentile(parse_times, 0.5),
+                'p90': _percentile(parse_times, 0.9),
+                'max': max(parse_times, default=None),
+            },
+            'fetch_seconds': {
+                'p50': _percentile(fetch_times, 0.5),
+                'p90': _percentile(fetch_times, 0.9),
+                'max': max(fetch_times, default=None),
+            },
+        }
+
+    def write(self):
+        """Write the report (and the slowest profiles); returns the report path."""
+        facilities = []
+        for entry in self.facilities.values():
+            stats = entry['stats']
+            facilities.append({
+                'pfi': entry['pfi'],
+                'name': entry['name'],
+                'rows': entry.get('rows', 0),
+                'error': entry['error'],
+                'stages': {name: round(seconds, 4) for name, seconds in stats.stages.items()},
+                'counts': dict(stats.counts),
+            })
+        facilities.sort(key=lambda f: f['stages'].get('parse', 0.0), reverse=True)
+        report = {'summary': self.summary(), 'facilities': facilities}
+
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if self._profiles:
+            profile_dir = os.path.splitext(self.path)[0] + '_profiles'
+            os.makedirs(profile_dir, exist_ok=True)
+            report['profiles'] = []
+            for seconds, pfi, dump in sorted(self._profiles, reverse=True):
+                path = os.path.join(profile_dir, f"{pfi}.prof")
+                with open(path, 'wb') as f:
+                    f.write(dump)
+                report['profiles'].append({'pfi': pfi, 'parse_seconds': round(seconds, 4), 'path': path})
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        return self.path
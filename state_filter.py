@@ -0,0 +1,149 @@
+"""
+Streaming State Filter for National CMS CSVs
+============================================
+Pulls one state's rows out of a national CMS file (HCAHPS, HAI, HAC, HRRP,
+HVBP, ...) without building a dict for every row in the country.
+
+Records are read as raw bytes and the State column is checked on those bytes
+first; only rows that pass are decoded and parsed. Rows are yielded lazily,
+and the extract/split modes copy matching records straight to the output
+file(s) as they are read.
+
+Run:
+  python state_filter.py data/HCAHPS-Hospital.csv --state NY --out data/HCAHPS-Hospital_NY.csv
+  python state_filter.py data/HCAHPS-Hospital.csv --split data/by-state
+"""
+
+import argparse
+import csv
+import os
+
+STATE_COLUMN = 'State'
+
+
+def iter_records(f):
+    """
+    Raw CSV records (bytes, line ending included) from a binary file. A line
+    that ends inside a quoted field is joined with the lines that follow it.
+    """
+    pending = []
+    quotes = 0
+    for line in f:
+        if not pending and line.count(b'"') % 2 == 0:
+            yield line
+            continue
+        pending.append(line)
+        quotes += line.count(b'"')
+        if quotes % 2 == 0:
+            yield b''.join(pending)
+            pending = []
+            quotes = 0
+    if pending:
+        yield b''.join(pending)
+
+
+def parse_record(record):
+    return next(csv.reader([record.decode('utf-8')]))
+
+
+def field_at(record, index):
+    """Raw bytes of one field. Unquoted records are split without parsing."""
+    if b'"' not in record:
+        fields = record.rstrip(b'\r\n').split(b',', index + 1)
+        return fields[index] if index < len(fields) else b''
+    fields = parse_record(record)
+    return fields[index].encode('utf-8') if index < len(fields) else b''
+
+
+def read_header(f):
+    header = next(iter_records(f), b'')
+    fieldnames = parse_record(header.decode('utf-8-sig').encode('utf-8')) if header else []
+    return header, fieldnames
+
+
+def read_fieldnames(path):
+    with open(path, 'rb') as f:
+        return read_header(f)[1]
+
+
+def iter_state_records(f, state, state_column=STATE_COLUMN):
+    """Yields (fieldnames, record) for the raw records of one state."""
+    header, fieldnames = read_header(f)
+    index = fieldnames.index(state_column)
+    wanted = state.encode('utf-8')
+    for record in iter_records(f):
+        # Cheap substring test first; most rows never contain the state code
+        if wanted not in record:
+            continue
+        if field_at(record, index) == wanted:
+            yield fieldnames, record
+
+
+def iter_state_rows(path, state='NY', state_column=STATE_COLUMN):
+    """Rows of one state as dicts (like csv.DictReader), read lazily."""
+    with open(path, 'rb') as f:
+        for fieldnames, record in iter_state_records(f, state, state_column):
+            yield dict(zip(fieldnames, parse_record(record)))
+
+
+def extract_state(path, out_path, state='NY', state_column=STATE_COLUMN):
+    """Copy the header and one state's records to out_path. Returns the row count."""
+    count = 0
+    with open(path, 'rb') as f, open(out_path, 'wb') as out:
+        header, fieldnames = read_header(f)
+        out.write(header)
+        index = fieldnames.index(state_column)
+        wanted = state.encode('utf-8')
+        for record in iter_records(f):
+            if wanted in record and field_at(record, index) == wanted:
+                out.write(record)
+                count += 1
+    return count
+
+
+def split_by_state(path, out_dir, state_column=STATE_COLUMN):
+    """
+    Split a national file into one shard per state in a single pass.
+    Shards are named <file stem>_<STATE>.csv. Returns {state: row count}.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    shards = {}
+    counts = {}
+    try:
+        with open(path, 'rb') as f:
+            header, fieldnames = read_header(f)
+            index = fieldnames.index(state_column)
+            for record in iter_records(f):
+                state = field_at(record, index).decode('utf-8').strip() or 'UNKNOWN'
+                if state not in shards:
+                    shards[state] = open(os.path.join(out_dir, f"{stem}_{state}.csv"), 'wb')
+                    shards[state].write(header)
+                    counts[state] = 0
+                shards[state].write(record)
+                counts[state] += 1
+    finally:
+        for shard in shards.values():
+            shard.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream one state's rows out of a national CMS CSV.")
+    parser.add_argument('path', help="national CSV file")
+    parser.add_argument('--state', default='NY', help="state code to keep (default NY)")
+    parser.add_argument('--out', help="output CSV (default <file>_<STATE>.csv next to the input)")
+    parser.add_argument('--split', metavar='DIR', help="write one shard per state into DIR instead")
+    args = parser.parse_args()
+
+    if args.split:
+        counts = split_by_state(args.path, args.split)
+        print(f"Split {sum(counts.values())} rows into {len(counts)} state files in {args.split}")
+    else:
+        out_path = args.out or f"{os.path.splitext(args.path)[0]}_{args.state}.csv"
+        count = extract_state(args.path, out_path, args.state)
+        print(f"Saved {count} {args.state} rows to {out_path}")
+
+
+if __name__ == "__main__":
+    main()
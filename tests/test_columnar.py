@@ -0,0 +1,39 @@
+"""
+Column typing shared by the Parquet outputs (columnar.py) and the hospital
+store (hospital_store.py).
+
+Run:
+  python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from columnar import cell_value, column_kind  # noqa: E402
+from hospital_store import _column_kind, _converter  # noqa: E402
+
+
+@pytest.mark.parametrize('name, values, kind', [
+    ('Score', ['0.5', 'Not Available', '1.25', ''], 'float'),
+    ('Denominator', ['12', 'Too Few to Report', 'Not Applicable'], 'int'),
+    ('Score', ['Not Available', 'N/A'], 'text'),
+    ('Score', ['Low', '2'], 'text'),
+    ('Code', ['0123', '45'], 'text'),
+    ('Facility ID', ['330085'], 'text'),
+    ('Start Date', ['07/01/2023', 'Not Available'], 'date'),
+])
+def test_column_kind(name, values, kind):
+    assert column_kind(name, values) == kind
+
+
+def test_store_types_match_columnar():
+    values = [' 3 ', 'Not Available', '']
+    assert _column_kind('Score', values) == column_kind('Score', values) == 'int'
+    assert [_converter('int')(v) for v in values] == [3, None, None]
+    assert _column_kind('Start Date', ['07/01/2023']) == 'text'
+    assert cell_value(' Too Few to Report ') is None
@@ -0,0 +1,174 @@
+"""
+find_match (blocking indexes) against a full scan with score_match, for
+both scoring profiles, on the repo's directory and CMS/staffing files and on
+hand-made cases; and the indicator scripts' links against the matching they
+did before hospital_linkage.py.
+
+Run:
+  python -m pytest tests
+"""
+
+import os
+import re
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from hospital_linkage import (  # noqa: E402
+    CMS_SOURCES, DIRECTORY_CSV, PFI_SOURCES, PROFILES, build_match_index, cached_matches, find_match,
+    link_hospitals, load_cms_facilities, load_directory, load_pfi_facilities, prepare_hospital, score_match,
+)
+from state_filter import iter_state_rows  # noqa: E402
+
+
+def full_scan(ny_hospital, candidates, profile):
+    """The best candidate by scoring every one: highest score, earliest on ties."""
+    profile = PROFILES[profile]
+    ny = prepare_hospital(ny_hospital['name'], ny_hospital.get('address', ''),
+                          ny_hospital.get('city', ''), ny_hospital.get('phone', ''))
+    best_match, best_score = None, 0
+    for name, info in candidates.items():
+        nat = prepare_hospital(name, info.get('address', ''), info.get('city', ''), info.get('phone', ''))
+        score = score_match(ny, nat, profile)
+        if score >= profile['min_score'] and score > best_score:
+            best_match, best_score = name, score
+    return best_match, best_score
+
+
+def _by_name(facilities):
+    candidates = {}
+    for facility in facilities.values():
+        candidates.setdefault(facility['name'], facility)
+    return candidates
+
+
+def repo_cases():
+    """(hospitals, candidates, profile) for the linkage runs the pipeline does."""
+    os.chdir(REPO_ROOT)
+    if not os.path.exists(DIRECTORY_CSV):
+        return []
+    hospitals = load_directory()
+    cms = _by_name(load_cms_facilities(CMS_SOURCES))
+    pfi = _by_name(load_pfi_facilities(PFI_SOURCES))
+    return [(hospitals, cms, 'full'), (hospitals, cms, 'name_only'), (hospitals, pfi, 'name_only')]
+
+
+# Shared words the blocks skip (OF, AND, INC) still score under 'name_only'
+HAND_MADE = [
+    ({'name': 'Home of Hope and Healing'}, {'SISTERS OF CHARITY AND MERCY INC': {}}, 'name_only'),
+    ({'name': 'Home of Hope and Healing'}, {'SISTERS OF CHARITY AND MERCY INC': {}}, 'full'),
+    ({'name': 'The Health Center', 'city': 'Albany'}, {'THE HEALTH CENTER OF ALBANY': {'city': 'ALBANY'}}, 'full'),
+    # A candidate without address or city (the name-only CMS files)
+    ({'name': 'Calvary Hospital', 'address': '1740 Eastchester Rd', 'city': 'Bronx'},
+     {'OUR LADY OF LOURDES MEMORIAL HOSPITAL, INC': {}, 'CALVARY HOSPITAL INC': {}}, 'full'),
+]
+
+
+@pytest.mark.parametrize('hospital, candidates, profile', HAND_MADE)
+def test_find_match_hand_made(hospital, candidates, profile):
+    assert find_match(hospital, build_match_index(candidates, profile)) == full_scan(hospital, candidates, profile)
+
+
+def test_find_match_word_pair_outside_blocks():
+    candidates = {'SISTERS OF CHARITY AND MERCY INC': {}}
+    hospital = {'name': 'Home of Hope and Healing'}
+    assert find_match(hospital, build_match_index(candidates, 'name_only')) == ('SISTERS OF CHARITY AND MERCY INC', 5)
+
+
+@pytest.mark.parametrize('case', range(3))
+def test_find_match_equals_full_scan(case):
+    cases = repo_cases()
+    if not cases:
+        pytest.skip(f"{DIRECTORY_CSV} not found")
+    hospitals, candidates, profile = cases[case]
+    index = build_match_index(candidates, profile)
+    for hospital in hospitals:
+        assert find_match(hospital, index) == full_scan(hospital, candidates, profile), hospital['name']
+
+
+def test_blank_address_and_city_score_nothing():
+    hospital = {'name': 'Calvary Hospital', 'address': '1740 Eastchester Rd', 'city': 'Bronx'}
+    candidates = {'OUR LADY OF LOURDES MEMORIAL HOSPITAL, INC': {}}
+    assert find_match(hospital, build_match_index(candidates, 'full')) == (None, 0)
+    assert score_match(prepare_hospital('A', '', ''), prepare_hospital('B', '', ''), PROFILES['full']) == 0
+
+
+def test_cache_breaks_ties_like_full_scan(tmp_path):
+    directory, dataset, cache = tmp_path / 'directory.csv', tmp_path / 'dataset.csv', str(tmp_path / 'cache.sqlite')
+    directory.write_text('Saint Mary\n')
+    hospitals = [{'name': 'Saint Mary Hospital'}]
+    tied = {'SAINT MARY NORTH': {}, 'SAINT MARY SOUTH': {}, 'OTHER': {}}
+    for version, names in enumerate([list(tied), ['SAINT MARY SOUTH', 'SAINT MARY NORTH', 'OTHER', 'NEW']]):
+        dataset.write_text(f"v{version}\n")
+        candidates = {name: tied.get(name, {}) for name in names}
+        matches, _ = cached_matches(hospitals, candidates, 'name_only', str(dataset), str(directory), cache)
+        assert list(matches.values()) == [full_scan(hospitals[0], candidates, 'name_only')]
+
+
+def name_only_scan(ny_hospital, candidates):
+    """nys_limited_indicators.py's find_match before hospital_linkage.py."""
+    def normalize(text):
+        return re.sub(r'\s+', ' ', re.sub(r'[^\w\s]', '', text.upper())).strip()
+
+    ny_name_norm = normalize(ny_hospital['name'])
+    best_match, best_score = None, 0
+    for nat_name in candidates:
+        nat_name_norm = normalize(nat_name)
+        if ny_name_norm == nat_name_norm:
+            score = 10
+        elif ny_name_norm in nat_name_norm or nat_name_norm in ny_name_norm:
+            score = 7
+        else:
+            common_words = set(ny_name_norm.split()) & set(nat_name_norm.split())
+            significant = common_words - {'HOSPITAL', 'MEDICAL', 'CENTER', 'HEALTH', 'SYSTEM', 'THE'}
+            score = 5 if len(significant) >= 2 else 3 if significant else 0
+        if score >= 5 and score > best_score:
+            best_match, best_score = nat_name, score
+    return best_match, best_score
+
+
+def limited_indicators_case(path):
+    """The hospitals and candidates nys_limited_indicators.py links (HACRP, HVBP)."""
+    hospitals, names = [], set()
+    for hospital in load_directory():
+        if hospital['name'] not in names:
+            hospitals.append(hospital)
+            names.add(hospital['name'])
+    candidates, seen = {}, set()
+    for row in iter_state_rows(path, 'NY'):
+        key = row.get('Facility ID', '') or row['Facility Name']
+        if key not in seen:
+            candidates[row['Facility Name']] = {'facility_id': row.get('Facility ID', '')}
+            seen.add(key)
+    return hospitals, candidates
+
+
+def survey_case(path):
+    """The hospitals and candidates nys_survey.py links (HCAHPS)."""
+    candidates = {}
+    for row in iter_state_rows(path, 'NY'):
+        candidates.setdefault(row['Facility Name'], {
+            'facility_id': row['Facility ID'], 'address': row['Address'],
+            'city': row['City/Town'], 'phone': row['Telephone Number'],
+        })
+    return load_directory(), candidates
+
+
+# The directory and the HCAHPS rows all carry an address, city and phone, so
+# full_scan scores them as nys_survey.py's own find_match did
+@pytest.mark.parametrize('path, case, profile, scan', [
+    ('data/FY_2025_HAC_Reduction_Program_Hospital.csv', limited_indicators_case, 'name_only', name_only_scan),
+    ('data/hvbp_clinical_outcomes.csv', limited_indicators_case, 'name_only', name_only_scan),
+    ('data/HCAHPS-Hospital.csv', survey_case, 'full',
+     lambda hospital, candidates: full_scan(hospital, candidates, 'full')),
+])
+def test_script_links_equal_pre_series(path, case, profile, scan):
+    os.chdir(REPO_ROOT)
+    if not os.path.exists(DIRECTORY_CSV) or not os.path.exists(path):
+        pytest.skip(f"{DIRECTORY_CSV} or {path} not found")
+    hospitals, candidates = case(path)
+    for hospital, match, score in link_hospitals(hospitals, candidates, profile, path):
+        assert (match, score) == scan(hospital, candidates), hospital['name']
@@ -0,0 +1,57 @@
+"""
+Incremental rebuilds of the materialized profiles (hospital_profiles.py):
+only the profiles whose dataset rows changed are built again.
+
+Run:
+  python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from hospital_linkage import DIRECTORY_CSV, load_crosswalk  # noqa: E402
+from hospital_profiles import materialize  # noqa: E402
+from hospital_store import build_store  # noqa: E402
+
+FACILITY_ID = '330013'
+
+
+def _write_hai(path, score):
+    path.write_text(
+        "Facility ID,Facility Name,Measure ID,Score\n"
+        f"{FACILITY_ID},ALBANY MEDICAL CENTER HOSPITAL,HAI_1_SIR,{score}\n"
+        f"{FACILITY_ID},ALBANY MEDICAL CENTER HOSPITAL,HAI_2_SIR,0.5\n"
+    )
+
+
+def test_materialize_rebuilds_only_changed_profiles(tmp_path):
+    os.chdir(REPO_ROOT)
+    if not os.path.exists(DIRECTORY_CSV):
+        pytest.skip(f"{DIRECTORY_CSV} not found")
+    linked = [entry for entry in load_crosswalk().values() if entry['Facility ID'] == FACILITY_ID]
+    if len(linked) != 1:
+        pytest.skip(f"Facility ID {FACILITY_ID} isn't linked to exactly one directory hospital")
+
+    hai = tmp_path / 'nys_hai.csv'
+    store, profiles = str(tmp_path / 'hospitals.sqlite'), str(tmp_path / 'profiles.sqlite')
+    fact_tables = {'hai': (str(hai), 'Facility ID', 'facility_id')}
+
+    _write_hai(hai, '1.25')
+    build_store(store, fact_tables)
+    first = materialize(store, profiles)
+    assert first['unchanged'] == 0 and first['datasets_changed'] == ['hai']
+
+    build_store(store, fact_tables)
+    assert materialize(store, profiles)['built'] == 0
+
+    _write_hai(hai, '0.75')
+    build_store(store, fact_tables)
+    result = materialize(store, profiles)
+    assert result['built'] == 1
+    assert result['datasets_changed'] == ['hai']
+    assert result['removed'] == 0
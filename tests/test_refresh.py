@@ -0,0 +1,86 @@
+"""
+The refresh runner (nys_refresh.py) on a small synthetic pipeline in a temp
+directory: which stages run, are skipped, adopted or reported stale.
+
+Run:
+  python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import nys_refresh  # noqa: E402
+from nys_refresh import refresh  # noqa: E402
+
+# source.txt -> upper -> upper.txt -> count -> count.txt; side reads
+# upper.txt only if it's there
+SCRIPTS = {
+    'upper.py': "open('upper.txt', 'w').write(open('source.txt').read().upper())\n",
+    'count.py': "open('count.txt', 'w').write(str(len(open('upper.txt').read())))\n",
+    'side.py': "open('side.txt', 'w').write('side')\n",
+    'fail.py': "raise SystemExit(1)\n",
+}
+
+STAGES = {
+    'upper': {'script': 'upper.py', 'inputs': ['source.txt'], 'outputs': ['upper.txt']},
+    'count': {'script': 'count.py', 'inputs': ['upper.txt'], 'outputs': ['count.txt']},
+    'side': {'script': 'side.py', 'inputs': [], 'optional': ['upper.txt'], 'outputs': ['side.txt']},
+}
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(nys_refresh, 'LOG_DIR', 'logs')
+    for name, code in SCRIPTS.items():
+        (tmp_path / name).write_text(code)
+    (tmp_path / 'source.txt').write_text('abc')
+
+    def run(stages=STAGES, **kwargs):
+        results = refresh(stages=stages, state_path='state.json', jobs=1, **kwargs)
+        return {name: status for name, (status, _, _) in results.items()}, results
+    return tmp_path, run
+
+
+def test_failed_stage_skips_only_required_inputs(pipeline):
+    _, run = pipeline
+    stages = dict(STAGES, upper=dict(STAGES['upper'], script='fail.py'))
+    statuses, results = run(stages)
+    assert statuses == {'upper': 'failed', 'count': 'skipped', 'side': 'ran'}
+    assert results['count'][1] == "upstream stage upper failed"
+
+
+def test_existing_remote_outputs_are_adopted(pipeline):
+    tmp_path, run = pipeline
+    (tmp_path / 'upper.txt').write_text('scraped')
+    stages = dict(STAGES, upper=dict(STAGES['upper'], script='fail.py', remote=True))
+    statuses, results = run(stages)
+    assert statuses == {'upper': 'fresh', 'count': 'ran', 'side': 'ran'}
+    assert results['upper'][1] == "existing outputs adopted"
+    assert (tmp_path / 'upper.txt').read_text() == 'scraped'
+    assert run(stages, remote=True)[0]['upper'] == 'failed'
+
+
+def test_dry_run_marks_downstream_stale(pipeline):
+    tmp_path, run = pipeline
+    assert set(run()[0].values()) == {'ran'}
+    (tmp_path / 'source.txt').write_text('abcd')
+    statuses, results = run(dry_run=True)
+    assert statuses == {'upper': 'stale', 'count': 'stale', 'side': 'stale'}
+    assert results['upper'][1] == "source.txt changed"
+    assert results['count'][1] == results['side'][1] == "after upper"
+    assert (tmp_path / 'upper.txt').read_text() == 'ABC'
+
+
+def test_identical_upstream_output_skips_downstream(pipeline):
+    tmp_path, run = pipeline
+    assert set(run()[0].values()) == {'ran'}
+    (tmp_path / 'upper.py').write_text("# same output\n" + SCRIPTS['upper.py'])
+    assert run()[0] == {'upper': 'ran', 'count': 'fresh', 'side': 'fresh'}
+    (tmp_path / 'source.txt').write_text('abcd')
+    assert run()[0] == {'upper': 'ran', 'count': 'ran', 'side': 'ran'}
@@ -0,0 +1,76 @@
+"""
+BatchMatcher.best_matches (hospital_similarity.py) against find_match, for
+both scoring profiles, on the repo's directory and CMS/staffing files and on
+hand-made cases; and BatchMatcher.top_k's ranking and ties.
+
+Run:
+  python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+
+pytest.importorskip('numpy')
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hospital_linkage import DIRECTORY_CSV, build_match_index, find_match, match_all  # noqa: E402
+from hospital_similarity import BatchMatcher  # noqa: E402
+from test_linkage import HAND_MADE, repo_cases  # noqa: E402
+
+
+@pytest.mark.parametrize('hospital, candidates, profile', HAND_MADE)
+def test_best_matches_hand_made(hospital, candidates, profile):
+    index = build_match_index(candidates, profile)
+    assert BatchMatcher(candidates, profile).best_matches([hospital]) == [find_match(hospital, index)]
+
+
+@pytest.mark.parametrize('case', range(3))
+def test_best_matches_equals_find_match(case):
+    cases = repo_cases()
+    if not cases:
+        pytest.skip(f"{DIRECTORY_CSV} not found")
+    hospitals, candidates, profile = cases[case]
+    index = build_match_index(candidates, profile)
+    expected = [find_match(hospital, index) for hospital in hospitals]
+    assert BatchMatcher.from_index(index).best_matches(hospitals) == expected
+    assert match_all(hospitals, index) == expected
+
+
+TIED = {'SAINT MARY NORTH': {}, 'OTHER PLACE': {}, 'SAINT MARY SOUTH': {}, 'SAINT MARY HOSPITAL': {}}
+
+
+def test_top_k_order_and_ties():
+    hospitals = [{'name': 'Saint Mary Hospital'}, {'name': 'Other Place'}]
+    assert BatchMatcher(TIED, 'name_only').top_k(hospitals, k=2) == [
+        [('SAINT MARY HOSPITAL', 10, 1.0), ('SAINT MARY NORTH', 5, 0.3646)],
+        [('OTHER PLACE', 10, 1.0), ('SAINT MARY NORTH', 0, 0.0)],
+    ]
+    # Equal ranks keep candidate order, whichever way round the candidates come
+    reversed_tied = dict(reversed(list(TIED.items())))
+    top = BatchMatcher(reversed_tied, 'name_only').top_k(hospitals[:1], k=3)
+    assert [name for name, _, _ in top[0]] == ['SAINT MARY HOSPITAL', 'SAINT MARY SOUTH', 'SAINT MARY NORTH']
+
+
+def test_top_k_more_than_candidates():
+    top = BatchMatcher(TIED, 'name_only').top_k([{'name': 'Other Place'}], k=10, similarity_weight=0)
+    assert top == [[('OTHER PLACE', 10, 1.0), ('SAINT MARY NORTH', 0, 0.0), ('SAINT MARY SOUTH', 0, 0.0),
+                    ('SAINT MARY HOSPITAL', 0, 0.0)]]
+
+
+@pytest.mark.parametrize('case', range(3))
+def test_top_k_equals_full_ranking(case):
+    cases = repo_cases()
+    if not cases:
+        pytest.skip(f"{DIRECTORY_CSV} not found")
+    hospitals, candidates, profile = cases[case]
+    matcher = BatchMatcher(candidates, profile)
+    score, similarity = matcher.scores(hospitals)
+    rank = score + similarity
+    for i, (hospital, top) in enumerate(zip(hospitals, matcher.top_k(hospitals, k=5))):
+        expected = sorted(range(len(candidates)), key=lambda position: (-rank[i, position], position))[:5]
+        assert [name for name, _, _ in top] == [matcher.facility_names[p] for p in expected], hospital['name']
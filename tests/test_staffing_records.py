@@ -0,0 +1,37 @@
+"""
+UnitRecord (staffing_records.py): numbers for the metrics, the table's own
+text in the CSV rows.
+
+Run:
+  python -m pytest tests
+"""
+
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from staffing_records import UnitLayout, UnitRecord, to_columns  # noqa: E402
+
+LAYOUT = UnitLayout(['day'], {1: 'rn_count', 2: 'rn_hours_per_pt', 3: 'avg_patients', 4: 'note', 5: 'blank'})
+
+
+def test_to_row_keeps_cell_text():
+    record = UnitRecord(LAYOUT, 'ICU', 'ICU A')
+    record.set_shift('day', ['ICU', ' 2.00 ', '5.80', '1,200', 'n/a', ''])
+    assert record.to_row() == {
+        'unit_name': 'ICU', 'unit_description': 'ICU A',
+        'day_rn_count': '2.00', 'day_rn_hours_per_pt': '5.80', 'day_avg_patients': '1,200',
+        'day_note': 'n/a', 'day_blank': None,
+    }
+    assert [record.value('day', name) for name in LAYOUT.columns.values()] == [2.0, 5.8, 1200.0, 'n/a', None]
+    assert list(to_columns([record])['day_avg_patients']) == [1200.0]
+
+
+def test_set_replaces_kept_text():
+    record = UnitRecord(LAYOUT, 'ICU')
+    record.set('day', 'rn_count', '5.80')
+    record.set('day', 'rn_count', '6')
+    assert record.to_row()['day_rn_count'] == '6'
+    assert record.value('day', 'rn_count') == 6.0